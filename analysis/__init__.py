@@ -0,0 +1,30 @@
+"""
+Trend analysis helpers: lifecycle stages, forecasts, source fusion and dashboard snapshots.
+
+None of it depends on Streamlit, so the collector and command-line tools reuse it headlessly.
+Importing the package is cheap: each name below is imported from its module on first access.
+"""
+import importlib
+
+_EXPORTS = {
+    'LifecycleStage': 'analysis.lifecycle',
+    'get_lifecycle_stage': 'analysis.lifecycle',
+    'classify_lifecycle_bulk': 'analysis.lifecycle',
+    'generate_forecast': 'analysis.forecast',
+    'forecast_batch': 'analysis.forecast',
+    'fuse_sources': 'analysis.fusion',
+    'to_interest_frame': 'analysis.fusion',
+    'to_wide_panel': 'analysis.panel',
+    'downsample_series': 'analysis.downsample',
+    'SnapshotStore': 'analysis.snapshots',
+    'build_snapshot': 'analysis.snapshots',
+    'prepare_frames': 'analysis.snapshots',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'analysis' has no attribute '{name}'")
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
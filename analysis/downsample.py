@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+# Charts with more points than this per trace are downsampled before they reach the browser.
+DEFAULT_MAX_POINTS = 1000
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int):
+    """
+    Picks `threshold` points of a series with Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. The points in between are split into
+    `threshold - 2` equal buckets, and from each bucket the point is kept that forms the
+    largest triangle with the point kept from the previous bucket and the average of the
+    next bucket. Peaks and dips survive, which plain striding would skip.
+
+    Args:
+        x (numpy.ndarray): The x values as floats, increasing.
+        y (numpy.ndarray): The y values as floats, without NaN.
+        threshold (int): How many points to keep.
+
+    Returns:
+        numpy.ndarray: The positions of the kept points, in order.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Bucket edges over the interior points 1..n-2
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # The next bucket's average; the last bucket looks ahead to the final point
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+
+        area = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        kept[i + 1] = previous
+    return kept
+
+
+def downsample_series(series: pd.Series, max_points: int = DEFAULT_MAX_POINTS):
+    """
+    Returns a date-indexed series cut down to at most `max_points` points with LTTB.
+
+    Missing values are dropped first. Series that are already short enough come back unchanged.
+    """
+    series = series.dropna()
+    if len(series) <= max_points:
+        return series
+    x = series.index.to_numpy(dtype='datetime64[ns]').astype('int64').astype(float)
+    return series.iloc[lttb(x, series.to_numpy(dtype=float), max_points)]
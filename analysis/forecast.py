@@ -0,0 +1,141 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analysis.panel import to_wide_panel
+from data_collection.metrics import get_metrics
+
+MIN_POINTS = 10
+# The smoothing levels the vectorized path tries for every series.
+DEFAULT_ALPHAS = np.round(np.linspace(0.05, 1.0, 20), 2)
+# Below this many series a process pool costs more to start than it saves.
+MIN_SERIES_FOR_POOL = 8
+
+
+def generate_forecast(data: pd.DataFrame, horizon: int = 4, freq: str = 'W'):
+    if data.empty or len(data) < MIN_POINTS: return None
+    # statsmodels pulls in scipy, which dominates a cold start; only load it once a fit is needed
+    from statsmodels.tsa.holtwinters import SimpleExpSmoothing
+    with get_metrics().span('forecast_fit', method='statsmodels-ses'):
+        model = SimpleExpSmoothing(data['interest'], initialization_method="estimated").fit()
+    forecast = model.forecast(horizon)
+    last_date = data.index[-1]
+    forecast_dates = pd.date_range(start=last_date, periods=horizon + 1, freq=freq)[1:]
+    forecast_df = pd.DataFrame({'date': forecast_dates, 'forecast': np.asarray(forecast)}).set_index('date')
+    return forecast_df
+
+
+def _ses_grid_search(values: np.ndarray, alphas: np.ndarray):
+    """
+    Runs simple exponential smoothing for every (alpha, series) pair at once.
+
+    The level starts at each series' first observation and missing points leave it unchanged.
+    For each series the alpha with the lowest sum of squared one-step errors wins.
+
+    Args:
+        values (numpy.ndarray): A (time x series) array, NaN where a series has no data.
+        alphas (numpy.ndarray): The candidate smoothing levels.
+
+    Returns:
+        tuple: The best alpha and the final level for every series.
+    """
+    n_series = values.shape[1]
+    level = np.full((len(alphas), n_series), np.nan)
+    sse = np.zeros((len(alphas), n_series))
+    weights = alphas[:, None]
+
+    for row in values:
+        valid = ~np.isnan(row)
+        starting = valid & np.isnan(level)
+        level = np.where(starting, row, level)
+        error = np.where(valid & ~starting, row - level, 0.0)
+        sse += error ** 2
+        level = level + weights * error
+
+    best = np.argmin(sse, axis=0)
+    return alphas[best], level[best, np.arange(n_series)]
+
+
+def _forecast_dates(last_dates: pd.Series, horizon: int, freq: str):
+    """Returns the forecast dates for each series, building each distinct date range only once."""
+    ranges = {date: pd.date_range(start=date, periods=horizon + 1, freq=freq)[1:] for date in last_dates.unique()}
+    return np.concatenate([ranges[date].values for date in last_dates])
+
+
+def _fit_statsmodels(job):
+    """Fits one statsmodels model; runs inside the process pool, so it only takes plain data."""
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing, SimpleExpSmoothing
+    keyword, series, horizon, freq, model = job
+    if model == 'holt':
+        fitted = ExponentialSmoothing(series, trend='add', initialization_method="estimated").fit()
+    else:
+        fitted = SimpleExpSmoothing(series, initialization_method="estimated").fit()
+    dates = pd.date_range(start=series.index[-1], periods=horizon + 1, freq=freq)[1:]
+    return pd.DataFrame({
+        'trend_keyword': keyword,
+        'date': dates,
+        'forecast': np.asarray(fitted.forecast(horizon)),
+        'alpha': fitted.params['smoothing_level'],
+        'method': f'statsmodels-{model}',
+    })
+
+
+@get_metrics().span('forecast_batch')
+def forecast_batch(data: pd.DataFrame, horizon: int = 4, freq: str = 'W', method: str = 'vectorized',
+                   model: str = 'ses', alphas: np.ndarray = None, max_workers: int = None,
+                   metric_type: str = 'search_interest'):
+    """
+    Forecasts many keyword series at once and returns one tidy forecast table.
+
+    The default 'vectorized' method runs simple exponential smoothing for every series and
+    every candidate alpha in a single NumPy pass and keeps the alpha with the lowest one-step
+    error per series. No optimizer runs, so thousands of series take well under a second.
+    The 'statsmodels' method fits each series with statsmodels ('ses' or additive-trend
+    'holt') across a process pool instead.
+
+    Args:
+        data (pandas.DataFrame): A wide (dates x keywords) panel, or the long-format table
+                                 from `fetch_google_trends_data`.
+        horizon (int): How many periods to forecast.
+        freq (str): The pandas frequency of the forecast dates (e.g. 'W' or 'D').
+        method (str): 'vectorized' or 'statsmodels'.
+        model (str): The statsmodels model to fit ('ses' or 'holt').
+        alphas (numpy.ndarray, optional): Candidate smoothing levels for the vectorized path.
+        max_workers (int, optional): Process pool size for the statsmodels path.
+        metric_type (str, optional): For long-format input, the metric type to forecast. Defaults
+                                     to Google search interest; pass None to use every metric type.
+
+    Returns:
+        pandas.DataFrame: The columns `trend_keyword, date, forecast, alpha, method`, with
+                          `horizon` rows per keyword. Series shorter than 10 points are skipped.
+    """
+    panel = to_wide_panel(data, metric_type=metric_type)
+    panel = panel.loc[:, panel.notna().sum() >= MIN_POINTS]
+    columns = ['trend_keyword', 'date', 'forecast', 'alpha', 'method']
+    if panel.empty:
+        return pd.DataFrame(columns=columns)
+
+    if method == 'statsmodels':
+        jobs = [(keyword, panel[keyword].dropna(), horizon, freq, model) for keyword in panel.columns]
+        if len(jobs) < MIN_SERIES_FOR_POOL:
+            frames = [_fit_statsmodels(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                frames = list(pool.map(_fit_statsmodels, jobs, chunksize=max(1, len(jobs) // 64)))
+        return pd.concat(frames, ignore_index=True)[columns]
+
+    if method != 'vectorized':
+        raise ValueError(f"Unknown forecast method '{method}'. Use 'vectorized' or 'statsmodels'.")
+
+    alphas = DEFAULT_ALPHAS if alphas is None else np.asarray(alphas, dtype=float)
+    best_alpha, level = _ses_grid_search(panel.to_numpy(dtype=float), alphas)
+    last_dates = panel.apply(pd.Series.last_valid_index)
+
+    return pd.DataFrame({
+        'trend_keyword': np.repeat(panel.columns.to_numpy(dtype=object), horizon),
+        'date': _forecast_dates(last_dates, horizon, freq),
+        'forecast': np.repeat(level, horizon),
+        'alpha': np.repeat(best_alpha, horizon),
+        'method': 'vectorized-ses',
+    })
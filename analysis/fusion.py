@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+# How much each (source, metric_type) series contributes to the composite score.
+DEFAULT_WEIGHTS = {
+    ('Google Trends', 'search_interest'): 0.6,
+    ('Reddit', 'mentions'): 0.25,
+    ('Reddit', 'engagement'): 0.15,
+}
+# Counts add up when resampled to a coarser calendar; indexes like search interest are averaged.
+SUM_METRICS = {'mentions', 'engagement'}
+# Google's weekly points are dated on Sundays, so weeks end on Saturday. Plain 'W' periods end
+# on Sunday and would put each Google point in the week before the Reddit days it covers.
+WEEKLY = 'W-SAT'
+COLUMNS = ['id', 'date', 'trend_keyword', 'source', 'metric_type', 'value', 'region']
+
+
+def _resample(rows: pd.DataFrame, freq: str):
+    """Puts every (keyword, source, metric) series on a common calendar of `freq` periods."""
+    periods = rows['date'].dt.to_period(freq).dt.start_time
+    grouped = rows.groupby(['trend_keyword', periods, 'source', 'metric_type'], sort=False)['value']
+    resampled = grouped.agg(['sum', 'mean'])
+    is_count = resampled.index.get_level_values('metric_type').isin(list(SUM_METRICS))
+    values = pd.Series(np.where(is_count, resampled['sum'], resampled['mean']), index=resampled.index)
+    wide = values.unstack(['source', 'metric_type'])
+
+    # No Reddit row for a period means nobody mentioned the term, so counts fall back to 0,
+    # but only inside the span where that series was being collected at all
+    dates = wide.index.get_level_values('date')
+    for column in wide.columns:
+        if column[1] in SUM_METRICS:
+            observed = dates[wide[column].notna().to_numpy()]
+            if len(observed):
+                in_span = (dates >= observed.min()) & (dates <= observed.max())
+                wide.loc[in_span, column] = wide.loc[in_span, column].fillna(0.0)
+    return wide
+
+
+def _normalize(wide: pd.DataFrame, method: str):
+    """Normalizes each keyword's series so sources on different scales can be combined."""
+    by_keyword = wide.groupby(level='trend_keyword')
+    if method == 'rank':
+        return by_keyword.rank(pct=True)
+    if method != 'zscore':
+        raise ValueError(f"Unknown normalization '{method}'. Use 'zscore' or 'rank'.")
+    std = by_keyword.transform('std').replace(0.0, np.nan)
+    return (wide - by_keyword.transform('mean')) / std
+
+
+def _fuse_chunk(rows: pd.DataFrame, weights: dict, freq: str, method: str):
+    wide = _resample(rows, freq)
+    normalized = _normalize(wide, method)
+    weight_row = np.array([weights[column] for column in normalized.columns])
+
+    # A weighted average over whichever sources have a value in that period
+    values = normalized.to_numpy(dtype=float)
+    present = ~np.isnan(values)
+    total_weight = (present * weight_row).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        score = np.nansum(values * weight_row, axis=1) / total_weight
+    score = pd.Series(score, index=normalized.index).dropna()
+
+    # Rescale each keyword to 0-100 so lifecycle thresholds and charts work as on raw interest
+    by_keyword = score.groupby(level='trend_keyword')
+    low, high = by_keyword.transform('min'), by_keyword.transform('max')
+    scaled = ((score - low) / (high - low).replace(0.0, np.nan) * 100).fillna(50.0).round(2)
+    return scaled.rename('value').reset_index()
+
+
+def fuse_sources(data: pd.DataFrame, weights: dict = None, freq: str = WEEKLY, method: str = 'zscore',
+                 chunk_size: int = 2000):
+    """
+    Combines every source's series for each keyword into one composite trend score.
+
+    Google search interest and Reddit counts come on different calendars and scales. Each
+    (keyword, source, metric_type) series is resampled to a shared `freq` calendar (counts
+    summed, indexes averaged), normalized within its keyword (z-score or percentile rank),
+    and combined as a weighted average of the sources present in each period. The result is
+    rescaled to 0-100 per keyword.
+
+    All of this runs as grouped pandas/NumPy operations over the whole table, `chunk_size`
+    keywords at a time, so memory stays bounded however many keywords come in.
+
+    Args:
+        data (pandas.DataFrame): Long-format rows from any of our fetchers.
+        weights (dict, optional): Maps (source, metric_type) to its weight. Series not listed
+                                  are ignored. Defaults to DEFAULT_WEIGHTS.
+        freq (str): The pandas period frequency of the shared calendar: WEEKLY (Sunday-start
+                    weeks, dated on the Sunday like Google's) or 'D'.
+        method (str): 'zscore' or 'rank'.
+        chunk_size (int): How many keywords are fused at a time.
+
+    Returns:
+        pandas.DataFrame: Long-format rows with `source='Composite'` and `metric_type='trend_score'`.
+    """
+    weights = weights or DEFAULT_WEIGHTS
+    rows = data[data['region'] == 'global'] if 'region' in data.columns else data
+    selected = np.zeros(len(rows), dtype=bool)
+    for source, metric_type in weights:
+        selected |= ((rows['source'] == source) & (rows['metric_type'] == metric_type)).to_numpy()
+    rows = rows.loc[selected, ['date', 'trend_keyword', 'source', 'metric_type', 'value']]
+    if rows.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    rows = rows.assign(date=pd.to_datetime(rows['date']), value=rows['value'].astype(float))
+
+    # Number the keywords once, then fuse them `chunk_size` at a time
+    keyword_codes, _ = pd.factorize(rows['trend_keyword'])
+    chunks = [_fuse_chunk(chunk_rows, weights, freq, method)
+              for _, chunk_rows in rows.groupby(keyword_codes // chunk_size, sort=False)]
+
+    fused = pd.concat(chunks, ignore_index=True)
+    fused['source'] = 'Composite'
+    fused['metric_type'] = 'trend_score'
+    fused['region'] = 'global'
+    fused = fused.sort_values(['trend_keyword', 'date'], ignore_index=True)
+    fused.insert(0, 'id', range(len(fused)))
+    return fused[COLUMNS]
+
+
+def to_interest_frame(fused: pd.DataFrame, keyword: str):
+    """Returns one keyword's composite score as the date-indexed 'interest' frame the analysis helpers expect."""
+    rows = fused[fused['trend_keyword'] == keyword]
+    return rows.set_index('date')[['value']].rename(columns={'value': 'interest'}).sort_index()
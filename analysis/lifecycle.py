@@ -0,0 +1,109 @@
+import warnings
+from enum import Enum
+
+import numpy as np
+import pandas as pd
+
+from analysis.panel import right_align, to_wide_panel
+
+# --- Lifecycle thresholds (share of the series' peak) ---
+FADING_THRESHOLD = 0.4
+PEAKING_THRESHOLD = 0.85
+MIN_POINTS = 30
+FULL_POINTS = 90
+
+
+class LifecycleStage(str, Enum):
+    """The lifecycle stages a trend can be in."""
+    RISING = "Rising"
+    PEAKING = "Peaking"
+    STABLE = "Stable"
+    FADING = "Fading"
+    NOT_ENOUGH_DATA = "Not Enough Data"
+
+    def __str__(self):
+        return self.value
+
+    @property
+    def emoji(self):
+        return {"Rising": "📈", "Peaking": "🏔️", "Stable": "📊", "Fading": "📉"}.get(self.value, "")
+
+
+def get_lifecycle_stage(data: pd.DataFrame, fading_threshold: float = FADING_THRESHOLD,
+                        peaking_threshold: float = PEAKING_THRESHOLD):
+    if data.empty or len(data) < MIN_POINTS:
+        return LifecycleStage.NOT_ENOUGH_DATA.value, "Need at least 30 days of data to analyze."
+
+    analysis_period = data.tail(FULL_POINTS) if len(data) >= FULL_POINTS else data
+    last_30_days = data.tail(MIN_POINTS)
+    peak_value = data['interest'].max()
+    current_value = last_30_days['interest'].mean()
+    
+    if current_value < peak_value * fading_threshold: stage = LifecycleStage.FADING
+    elif current_value >= peak_value * peaking_threshold: stage = LifecycleStage.PEAKING
+    elif current_value > analysis_period['interest'].mean(): stage = LifecycleStage.RISING
+    else: stage = LifecycleStage.STABLE
+    
+    provisional_note = " (Provisional)" if len(data) < FULL_POINTS else ""
+    return f"{stage.emoji} {stage.value}{provisional_note}", f"Interest is {stage.value.lower()}."
+
+
+def classify_lifecycle_bulk(data: pd.DataFrame, fading_threshold: float = FADING_THRESHOLD,
+                            peaking_threshold: float = PEAKING_THRESHOLD, metric_type: str = 'search_interest'):
+    """
+    Classifies the lifecycle stage of every keyword in a panel in one vectorized pass.
+
+    Applies the same rules as `get_lifecycle_stage` to each column: the mean of the last 30
+    points is compared to the all-time peak (fading / peaking thresholds) and then to the
+    mean of the last 90 points (rising vs. stable).
+
+    Args:
+        data (pandas.DataFrame): A wide (dates x keywords) panel, or the long-format table
+                                 from `fetch_google_trends_data`.
+        fading_threshold (float): Below this share of the peak a trend is fading.
+        peaking_threshold (float): At or above this share of the peak a trend is peaking.
+        metric_type (str, optional): For long-format input, the metric type to classify. Defaults
+                                     to Google search interest so Reddit counts are not averaged
+                                     into it; pass None to use every metric type.
+
+    Returns:
+        pandas.DataFrame: One row per keyword with the columns `stage` (LifecycleStage),
+                          `provisional`, `n_points`, `peak`, `mean_30`, `mean_90`,
+                          `current_to_peak` and `current_to_baseline`.
+    """
+    panel = to_wide_panel(data, metric_type=metric_type)
+    values = right_align(panel.to_numpy(dtype=float))
+    n_points = (~np.isnan(values)).sum(axis=0)
+
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        # All-NaN columns are expected for keywords without data
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        peak = np.nanmax(values, axis=0) if len(values) else np.full(values.shape[1], np.nan)
+        mean_30 = np.nanmean(values[-MIN_POINTS:], axis=0)
+        mean_90 = np.nanmean(values[-FULL_POINTS:], axis=0)
+        current_to_peak = mean_30 / peak
+        current_to_baseline = mean_30 / mean_90
+
+    enough = n_points >= MIN_POINTS
+    conditions = [
+        ~enough,
+        mean_30 < peak * fading_threshold,
+        mean_30 >= peak * peaking_threshold,
+        mean_30 > mean_90,
+    ]
+    choices = np.array([LifecycleStage.NOT_ENOUGH_DATA, LifecycleStage.FADING, LifecycleStage.PEAKING,
+                        LifecycleStage.RISING, LifecycleStage.STABLE], dtype=object)
+    # np.select would coerce the str-based enum to plain strings, so we select indexes instead
+    stage = choices[np.select(conditions, np.arange(len(conditions)), default=len(conditions))]
+
+    result = pd.DataFrame({
+        'stage': pd.Series(stage, index=panel.columns, dtype=object),
+        'provisional': enough & (n_points < FULL_POINTS),
+        'n_points': n_points,
+        'peak': peak,
+        'mean_30': mean_30,
+        'mean_90': mean_90,
+        'current_to_peak': current_to_peak,
+        'current_to_baseline': current_to_baseline,
+    }, index=panel.columns)
+    return result.rename_axis('trend_keyword')
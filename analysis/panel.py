@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+
+def to_wide_panel(data: pd.DataFrame, value_col: str = 'value', metric_type: str = None):
+    """
+    Returns a (dates x keywords) panel from either a wide panel or our long-format table.
+
+    Long-format input is the table `fetch_google_trends_data` produces
+    (`id, date, trend_keyword, source, metric_type, value, region`). Only global rows are
+    used, optionally filtered to one metric type; duplicate points are averaged.
+
+    Args:
+        data (pandas.DataFrame): A wide panel or a long-format table.
+        value_col (str): The value column of a long-format table.
+        metric_type (str, optional): Keep only rows of this metric type.
+
+    Returns:
+        pandas.DataFrame: Dates as the index and one float column per keyword.
+    """
+    if 'trend_keyword' not in data.columns:
+        return data.astype(float)
+
+    rows = data
+    if 'region' in rows.columns:
+        rows = rows[rows['region'] == 'global']
+    if metric_type is not None:
+        rows = rows[rows['metric_type'] == metric_type]
+    panel = rows.pivot_table(index='date', columns='trend_keyword', values=value_col, aggfunc='mean')
+    panel.columns.name = None
+    return panel.sort_index().astype(float)
+
+
+def right_align(values: np.ndarray):
+    """
+    Moves each column's non-missing values to the bottom rows, keeping their order.
+
+    Series in a panel can start and end on different dates. After alignment the last row
+    holds every column's latest point, so `aligned[-n:]` is each column's last n values
+    (padded with NaN at the top for short columns).
+    """
+    order = np.argsort(~np.isnan(values), axis=0, kind='stable')
+    return np.take_along_axis(values, order, axis=0)
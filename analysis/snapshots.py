@@ -0,0 +1,144 @@
+import io
+import json
+import os
+import time
+
+import pandas as pd
+
+from analysis.forecast import generate_forecast
+from analysis.lifecycle import get_lifecycle_stage
+from data_collection.metrics import get_metrics
+from data_collection.trend_cache import DEFAULT_CACHE_PATH, DEFAULT_TTL_SECONDS, connect
+
+# Bump this when the snapshot contents change, so snapshots written by older code count as misses.
+SNAPSHOT_VERSION = 1
+# How many regions a snapshot keeps; the dashboard shows the top 5.
+TOP_REGIONS = 10
+
+
+def prepare_frames(keyword: str, interest_df: pd.DataFrame, region_df: pd.DataFrame):
+    """
+    Shapes fetched frames the way the dashboard analyzes them.
+
+    The series gets an 'interest' column and is cut to its last 12 months (the stored history
+    can reach further back), and regions are sorted by interest, highest first.
+    """
+    interest_df = interest_df.rename(columns={keyword: 'interest'})
+    interest_df = interest_df[interest_df.index > interest_df.index[-1] - pd.DateOffset(months=12)]
+    if region_df is not None and not region_df.empty:
+        region_df = region_df.sort_values(by=keyword, ascending=False)
+    return interest_df, region_df
+
+
+def build_snapshot(keyword: str, interest_df: pd.DataFrame, region_df: pd.DataFrame = None):
+    """
+    Runs the dashboard's analysis for one keyword and returns it as a snapshot dict.
+
+    Args:
+        keyword (str): The keyword.
+        interest_df (pandas.DataFrame): The date-indexed series with an 'interest' column.
+        region_df (pandas.DataFrame, optional): Regional interest sorted highest first.
+
+    Returns:
+        dict: 'keyword', 'history', 'forecast' (None with too little data), 'stage',
+              'stage_desc', 'top_regions', 'version' and 'built_at'.
+    """
+    metrics = get_metrics()
+    with metrics.span('analysis', stage='lifecycle'):
+        stage, stage_desc = get_lifecycle_stage(interest_df)
+    with metrics.span('analysis', stage='forecast'):
+        forecast_df = generate_forecast(interest_df)
+    top_regions = region_df.head(TOP_REGIONS) if region_df is not None else pd.DataFrame()
+    return {
+        'keyword': keyword,
+        'history': interest_df[['interest']],
+        'forecast': forecast_df,
+        'stage': stage,
+        'stage_desc': stage_desc,
+        'top_regions': top_regions,
+        'version': SNAPSHOT_VERSION,
+        'built_at': time.time(),
+    }
+
+
+def _frame_to_json(frame):
+    return None if frame is None else frame.to_json(orient='table', date_format='iso')
+
+
+def _frame_from_json(payload):
+    return None if payload is None else pd.read_json(io.StringIO(payload), orient='table')
+
+
+class SnapshotStore:
+    """
+    Materialized per-keyword analysis results, kept next to the trend cache in SQLite.
+
+    The collector writes a snapshot whenever it refreshes a keyword, and the dashboard
+    renders from it with a single keyed read. A snapshot expires together with the cache
+    entries it was built from, and snapshots from an older SNAPSHOT_VERSION are ignored.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, default_ttl: int = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.default_ttl = default_ttl
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_snapshots (
+                    keyword TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    built_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        return connect(self.path)
+
+    def get(self, keyword: str, allow_stale: bool = False):
+        """
+        Returns the keyword's snapshot, or None if it is missing, expired or from an older version.
+
+        Args:
+            allow_stale (bool): Return an expired snapshot instead of None.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT payload, expires_at FROM analysis_snapshots WHERE keyword = ? AND version = ?',
+                (keyword, SNAPSHOT_VERSION)
+            ).fetchone()
+        if row is None or (row[1] <= time.time() and not allow_stale):
+            get_metrics().inc('cache_requests_total', cache='snapshots', result='miss' if row is None else 'expired')
+            return None
+        get_metrics().inc('cache_requests_total', cache='snapshots', result='hit')
+
+        snapshot = json.loads(row[0])
+        for name in ('history', 'forecast', 'top_regions'):
+            snapshot[name] = _frame_from_json(snapshot[name])
+        snapshot['expires_at'] = row[1]
+        return snapshot
+
+    def put(self, snapshot: dict, expires_at: float = None):
+        """Stores a snapshot from `build_snapshot`, replacing the keyword's previous one."""
+        expires_at = expires_at or snapshot['built_at'] + self.default_ttl
+        payload = dict(snapshot)
+        for name in ('history', 'forecast', 'top_regions'):
+            payload[name] = _frame_to_json(snapshot[name])
+        payload.pop('expires_at', None)
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO analysis_snapshots VALUES (?, ?, ?, ?, ?)',
+                (snapshot['keyword'], snapshot['version'], json.dumps(payload), snapshot['built_at'], expires_at)
+            )
+
+    def expiry(self, keyword: str):
+        """Returns when the keyword's current-version snapshot expires, or None if there is none."""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT expires_at FROM analysis_snapshots WHERE keyword = ? AND version = ?',
+                (keyword, SNAPSHOT_VERSION)
+            ).fetchone()
+        return row[0] if row else None
@@ -0,0 +1,173 @@
+import asyncio
+import random
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+US_STATES = [
+    "Alabama", "Alaska", "Arizona", "Arkansas", "California", "Colorado", "Connecticut", "Delaware",
+    "District of Columbia", "Florida", "Georgia", "Hawaii", "Idaho", "Illinois", "Indiana", "Iowa", "Kansas",
+    "Kentucky", "Louisiana", "Maine", "Maryland", "Massachusetts", "Michigan", "Minnesota", "Mississippi",
+    "Missouri", "Montana", "Nebraska", "Nevada", "New Hampshire", "New Jersey", "New Mexico", "New York",
+    "North Carolina", "North Dakota", "Ohio", "Oklahoma", "Oregon", "Pennsylvania", "Rhode Island",
+    "South Carolina", "South Dakota", "Tennessee", "Texas", "Utah", "Vermont", "Virginia", "Washington",
+    "West Virginia", "Wisconsin", "Wyoming",
+]
+US_STATE_CODES = [
+    "AL", "AK", "AZ", "AR", "CA", "CO", "CT", "DE", "DC", "FL", "GA", "HI", "ID", "IL", "IN", "IA", "KS", "KY",
+    "LA", "ME", "MD", "MA", "MI", "MN", "MS", "MO", "MT", "NE", "NV", "NH", "NJ", "NM", "NY", "NC", "ND", "OH",
+    "OK", "OR", "PA", "RI", "SC", "SD", "TN", "TX", "UT", "VT", "VA", "WA", "WV", "WI", "WY",
+]
+
+
+def _seed(text: str):
+    return zlib.crc32(text.encode('utf-8'))
+
+
+def synthetic_dates(timeframe: str = 'today 12-m', end: str = '2025-06-29'):
+    """The dates Google would return for a timeframe: weekly for 12 months, daily for a month or an explicit range."""
+    end = pd.Timestamp(end)
+    if timeframe == 'today 12-m':
+        return pd.date_range(end=end, periods=52, freq='W-SUN', name='date')
+    if timeframe == 'today 5-y':
+        return pd.date_range(end=end, periods=260, freq='W-SUN', name='date')
+    if ' ' in timeframe and timeframe[0].isdigit():
+        start, stop = timeframe.split()
+        return pd.date_range(start, stop, freq='D', name='date')
+    return pd.date_range(end=end, periods=30, freq='D', name='date')
+
+
+def synthetic_panel(keywords: list, dates: pd.DatetimeIndex):
+    """
+    Returns a deterministic (dates x keywords) panel of raw interest, built in one NumPy pass.
+
+    Each keyword gets its own level, trend, seasonality and noise, all derived from a hash
+    of the keyword, so the same keyword always produces the same series.
+    """
+    seeds = np.array([_seed(keyword) for keyword in keywords], dtype=np.uint64)
+    t = np.arange(len(dates), dtype=float)[:, None]
+    level = 20 + (seeds % 80).astype(float)
+    trend = ((seeds // 80) % 21).astype(float) / 10 - 1.0
+    phase = ((seeds // 1680) % 628).astype(float) / 100
+    rng = np.random.default_rng(int(seeds.sum() % 2 ** 32))
+    values = level * (1 + 0.5 * np.sin(t / 8 + phase)) + trend * t + rng.normal(0, 3, (len(dates), len(keywords)))
+    return pd.DataFrame(np.clip(values, 0, None), index=dates, columns=keywords)
+
+
+class FakeTooManyRequests(Exception):
+    """Looks like the pytrends error for an HTTP 429, so the scheduler treats it as one."""
+
+    def __init__(self):
+        super().__init__("The request failed: Google returned a response with code 429")
+        self.response = type('Response', (), {'status_code': 429})()
+
+
+class FakeTrendReq:
+    """
+    An offline stand-in for pytrends' TrendReq with synthetic, deterministic results.
+
+    Every request (building a payload, then the query) sleeps for `latency` seconds, and with
+    probability `error_rate` fails with a 429 instead. The failures come from a seeded random
+    generator, so a run with the same calls fails at the same places.
+
+    Args:
+        latency (float): Seconds each request takes.
+        error_rate (float): The share of requests that fail with a 429.
+        seed (int): Seeds the 429 injection.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.throttled = 0
+        self.kw_list, self.timeframe, self.geo = [], 'today 12-m', ''
+
+    def _request(self):
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.throttled += 1
+            raise FakeTooManyRequests()
+
+    def build_payload(self, kw_list, cat=0, timeframe='today 12-m', geo='', gprop=''):
+        self._request()
+        self.kw_list, self.timeframe, self.geo = list(kw_list), timeframe, geo
+
+    def interest_over_time(self):
+        self._request()
+        panel = synthetic_panel(self.kw_list, synthetic_dates(self.timeframe))
+        # Google scales each payload so its highest point is 100
+        panel = (panel / panel.to_numpy().max() * 100).round().astype(int)
+        panel['isPartial'] = False
+        return panel
+
+    def interest_by_region(self, resolution='REGION', inc_low_vol=True, inc_geo_code=False):
+        self._request()
+        values = np.array([[_seed(keyword + state) % 101 for keyword in self.kw_list] for state in US_STATES])
+        frame = pd.DataFrame(values, index=pd.Index(US_STATES, name='geoName'), columns=self.kw_list)
+        if inc_geo_code:
+            frame.insert(0, 'geoCode', [f'US-{code}' for code in US_STATE_CODES])
+        return frame
+
+    def related_queries(self):
+        self._request()
+        related = {}
+        for keyword in self.kw_list:
+            seed = _seed(keyword)
+            related[keyword] = {
+                'top': pd.DataFrame({'query': [f'{keyword} outfit', f'{keyword} men'], 'value': [100, 60]}),
+                'rising': pd.DataFrame({'query': [f'{keyword} dupe', f'trend {seed % 50}'],
+                                        'value': [250, 5000 if seed % 3 == 0 else 400]}),
+            }
+        return related
+
+
+class FakeRedditClient:
+    """
+    An offline stand-in for AsyncPrawClient that serves synthetic subreddit listings.
+
+    Each listing holds `limit` items whose text mentions a few of `keywords`, chosen by a
+    seeded generator. Every listing call awaits `latency` seconds, and pays through its
+    `pay` callback (and counts in `requests`) once per page of a hundred items.
+
+    Args:
+        keywords (list): The terms the synthetic posts mention.
+        latency (float): Seconds each listing call takes.
+        seed (int): Seeds the generated posts.
+    """
+
+    def __init__(self, keywords: list, latency: float = 0.0, seed: int = 0):
+        self.keywords = list(keywords)
+        self.latency = latency
+        self.seed = seed
+        self.requests = 0
+
+    async def listing(self, subreddit: str, kind: str, after_utc: float, limit: int, pay=None):
+        # Every page of a hundred items is one paced request
+        for _ in range(max(1, -(-limit // 100))):
+            self.requests += 1
+            if pay is not None:
+                await pay()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        rng = random.Random(f'{self.seed}/{subreddit}/{kind}')
+        now = 1_750_000_000.0
+        items = []
+        for i in range(limit):
+            mentioned = rng.sample(self.keywords, k=min(3, len(self.keywords)))
+            items.append({
+                'id': f'{subreddit}-{kind}-{i}',
+                'created_utc': now - i * 60,
+                'text': f"Thoughts on {', '.join(mentioned)}? Seen a lot of it lately.",
+                'score': rng.randint(-5, 500),
+            })
+        # Oldest first, like the real clients
+        return [item for item in reversed(items) if item['created_utc'] > after_utc]
+
+    async def close(self):
+        pass
@@ -0,0 +1,273 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# Keep every cache and store the pipeline opens out of the project's data directory
+_SCRATCH = tempfile.mkdtemp(prefix='trend-bench-')
+os.environ.setdefault('TREND_CACHE_PATH', os.path.join(_SCRATCH, 'trend_cache.sqlite'))
+
+from analysis.forecast import forecast_batch, generate_forecast
+from analysis.lifecycle import classify_lifecycle_bulk, get_lifecycle_stage
+from benchmarks.fakes import FakeRedditClient, FakeTrendReq, synthetic_dates, synthetic_panel
+from data_collection.fetch_google import fetch_google_trends_data
+from data_collection.fetch_reddit import CursorStore, fetch_reddit_data_async
+from data_collection.scheduler import RequestScheduler, set_scheduler
+
+# --- CONFIGURATION ---
+DEFAULT_SIZES = [10, 1000, 100000]
+# Per-keyword cases (and the fetch) cover at most this many keywords per size (0 runs every size in full).
+# Capped records say so with `extrapolated`, and project their full-size time from the keywords covered.
+DEFAULT_MAX_CALLS = 1000
+# Whole-table cases run this many times, so their percentiles are over repeats.
+DEFAULT_REPEATS = 3
+# Keywords per fetch_google_trends_data call, as the collector batches them.
+FETCH_BATCH_SIZE = 10
+
+
+def keywords_for(size: int):
+    return [f'term {i:06d}' for i in range(size)]
+
+
+def _covered(size, options):
+    """How many of `size` keywords a per-keyword case runs, given the --max-calls cap."""
+    return min(size, options.max_calls) if options.max_calls else size
+
+
+# --- Cases ---
+# Each case takes (size, options) and returns (ops, units, covered): `ops` are zero-argument
+# callables timed one by one, `units` is how many keywords they process in total, and
+# `covered` is how many distinct keywords of the size they actually ran.
+
+def case_fetch_google(size, options):
+    keywords = keywords_for(_covered(size, options))
+    fake = FakeTrendReq(latency=options.latency, error_rate=options.error_rate, seed=options.seed)
+    options.fakes.append(fake)
+    batches = [keywords[i:i + FETCH_BATCH_SIZE] for i in range(0, len(keywords), FETCH_BATCH_SIZE)]
+    ops = [lambda batch=batch: fetch_google_trends_data(batch, timeframe='today 12-m', use_cache=False,
+                                                        pytrends=fake)
+           for batch in batches]
+    return ops, len(keywords), len(keywords)
+
+
+def _interest_frames(size, options):
+    keywords = keywords_for(_covered(size, options))
+    panel = synthetic_panel(keywords, synthetic_dates('today 12-m'))
+    return [panel[[keyword]].rename(columns={keyword: 'interest'}) for keyword in keywords]
+
+
+def case_lifecycle(size, options):
+    frames = _interest_frames(size, options)
+    return [lambda frame=frame: get_lifecycle_stage(frame) for frame in frames], len(frames), len(frames)
+
+
+def case_forecast(size, options):
+    frames = _interest_frames(size, options)
+    return [lambda frame=frame: generate_forecast(frame) for frame in frames], len(frames), len(frames)
+
+
+def case_region_sort(size, options):
+    keywords = keywords_for(_covered(size, options))
+    fake = FakeTrendReq()
+    frames = []
+    for keyword in keywords:
+        fake.kw_list = [keyword]
+        frames.append((keyword, fake.interest_by_region()))
+    # The dashboard sorts each keyword's states and shows the top five
+    return [lambda keyword=keyword, frame=frame: frame.sort_values(by=keyword, ascending=False).head(5)
+            for keyword, frame in frames], len(frames), len(frames)
+
+
+def case_lifecycle_bulk(size, options):
+    panel = synthetic_panel(keywords_for(size), synthetic_dates('today 12-m'))
+    return [lambda: classify_lifecycle_bulk(panel)] * options.repeats, size * options.repeats, size
+
+
+def case_forecast_batch(size, options):
+    panel = synthetic_panel(keywords_for(size), synthetic_dates('today 12-m'))
+    return [lambda: forecast_batch(panel)] * options.repeats, size * options.repeats, size
+
+
+def case_fetch_reddit(size, options):
+    keywords = keywords_for(size)
+    client = FakeRedditClient(keywords, latency=options.latency, seed=options.seed)
+
+    def op():
+        # A fresh cursor file each time, so every run reads the full listings
+        cursors = CursorStore(os.path.join(tempfile.mkdtemp(dir=_SCRATCH), 'cursors.json'))
+        return asyncio.run(fetch_reddit_data_async(keywords, client=client, cursors=cursors, limit=500,
+                                                   requests_per_minute=1e9))
+    return [op] * options.repeats, size * options.repeats, size
+
+
+CASES = {
+    'fetch_google_trends_data': case_fetch_google,
+    'get_lifecycle_stage': case_lifecycle,
+    'generate_forecast': case_forecast,
+    'region_sort': case_region_sort,
+    'classify_lifecycle_bulk': case_lifecycle_bulk,
+    'forecast_batch': case_forecast_batch,
+    'fetch_reddit_data': case_fetch_reddit,
+}
+
+
+# --- Measurement ---
+
+def _time_ops(ops):
+    latencies = np.empty(len(ops))
+    start = time.perf_counter()
+    for i, op in enumerate(ops):
+        op_start = time.perf_counter()
+        op()
+        latencies[i] = time.perf_counter() - op_start
+    return time.perf_counter() - start, latencies
+
+
+def _peak_memory(ops):
+    """Runs the ops again under tracemalloc and returns the peak traced allocation in bytes."""
+    tracemalloc.start()
+    try:
+        for op in ops:
+            op()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(name, size, options):
+    """
+    Times one case at one size and returns its result record.
+
+    A record whose case covered fewer keywords than `size` (see --max-calls) is marked
+    `extrapolated`; its `seconds` are for the covered keywords and `projected_seconds`
+    scales them to the full size. Upstream counters are from the timed pass only.
+    """
+    options.fakes = []
+    ops, units, covered = CASES[name](size, options)
+    # The pipeline prints progress per keyword; keep it out of the measurements and the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        seconds, latencies = _time_ops(ops)
+        upstream = {'upstream_requests': sum(fake.requests for fake in options.fakes),
+                    'throttled': sum(fake.throttled for fake in options.fakes)}
+        peak = _peak_memory(ops) if options.memory else None
+
+    extrapolated = covered < size
+    record = {
+        'case': name,
+        'keywords': size,
+        'covered_keywords': covered,
+        'extrapolated': extrapolated,
+        'calls': len(ops),
+        'units': units,
+        'seconds': round(seconds, 4),
+        'projected_seconds': round(seconds * size / covered, 4) if extrapolated and covered else None,
+        'throughput_per_s': round(units / seconds, 2) if seconds else None,
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 4),
+        'p99_ms': round(float(np.percentile(latencies, 99)) * 1000, 4),
+        'peak_memory_mb': round(peak / 2 ** 20, 3) if peak is not None else None,
+    }
+    if options.fakes:
+        record.update(upstream)
+    return record
+
+
+def _metadata(options):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'latency_s': options.latency,
+        'error_rate': options.error_rate,
+        'max_calls': options.max_calls,
+        'repeats': options.repeats,
+        'memory_pass': options.memory,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float):
+    """Returns a line for every case that got slower or bigger than the baseline by more than `tolerance`."""
+    previous = {(record['case'], record['keywords']): record for record in baseline['results']}
+    regressions = []
+    for record in report['results']:
+        before = previous.get((record['case'], record['keywords']))
+        # A capped run is not comparable with one that covered a different number of keywords
+        if before is None or before.get('covered_keywords', record['covered_keywords']) != record['covered_keywords']:
+            continue
+        if before['throughput_per_s'] and record['throughput_per_s'] < before['throughput_per_s'] * (1 - tolerance):
+            regressions.append(f"{record['case']} @ {record['keywords']}: throughput "
+                               f"{before['throughput_per_s']} -> {record['throughput_per_s']}/s")
+        if before.get('peak_memory_mb') and record.get('peak_memory_mb') and \
+                record['peak_memory_mb'] > before['peak_memory_mb'] * (1 + tolerance):
+            regressions.append(f"{record['case']} @ {record['keywords']}: peak memory "
+                               f"{before['peak_memory_mb']} -> {record['peak_memory_mb']} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the fetch, analysis and forecast hot paths.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Keyword counts to run at.")
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES), help="Cases to run.")
+    parser.add_argument('--max-calls', type=int, default=DEFAULT_MAX_CALLS,
+                        help="Most keywords covered per size by the per-keyword and fetch cases (0 for no cap).")
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help="Runs of each whole-table case.")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds each fake upstream request takes.")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of fake requests that fail with a 429.")
+    parser.add_argument('--seed', type=int, default=0, help="Seeds the fakes.")
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help="Skip the second, tracemalloc-instrumented pass.")
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+    parser.add_argument('--compare', help="A previous JSON report; exit with status 1 on regressions.")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown or growth for --compare.")
+    options = parser.parse_args()
+
+    # No rate limit, and short backoffs so injected 429s cost retries rather than wall time
+    set_scheduler(RequestScheduler(rate=1e9, burst=10 ** 6, base_delay=0.01, max_delay=0.1,
+                                   retry_budget=10 ** 6))
+
+    results = []
+    for size in options.sizes:
+        for name in options.cases:
+            record = run_case(name, size, options)
+            label = f"{size} (extrapolated from {record['covered_keywords']})" if record['extrapolated'] else size
+            print(f"{name} @ {label}: {record['throughput_per_s']}/s, p50 {record['p50_ms']} ms, "
+                  f"p99 {record['p99_ms']} ms, peak {record['peak_memory_mb']} MB", file=sys.stderr)
+            results.append(record)
+
+    report = {'meta': _metadata(options), 'results': results}
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if options.compare:
+        with open(options.compare, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), options.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+# Run from the project root with: python -m benchmarks.run_benchmarks --output baseline.json
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# --- CONFIGURATION ---
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ['google_trends_dashboard', 'analysis', 'data_collection.prewarm']
+DEFAULT_REPEATS = 5
+# Dependencies that should only load on the code paths that use them.
+HEAVY_MODULES = ['statsmodels', 'pytrends', 'plotly.graph_objects', 'requests']
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, [name for name in {heavy!r} if name in sys.modules]]))
+"""
+
+
+def _run(args, env):
+    return subprocess.run([sys.executable] + args, capture_output=True, text=True, cwd=PROJECT_ROOT, env=env)
+
+
+def _import_profile(module: str, env: dict, top: int):
+    """Returns the `top` slowest top-level packages, summing the `-X importtime` self time of their modules."""
+    stderr = _run(['-X', 'importtime', '-c', f'import {module}'], env).stderr
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        if own.strip().isdigit():
+            package = name.strip().split('.')[0]
+            totals[package] = totals.get(package, 0) + int(own)
+    return sorted(((name, round(us / 1000, 1)) for name, us in totals.items()), key=lambda item: -item[1])[:top]
+
+
+def measure(module: str, repeats: int, top: int = 8):
+    """
+    Imports `module` in `repeats` fresh interpreters and returns its cold-start timings.
+
+    The Streamlit dashboard runs in bare mode when imported, so its import time is the work
+    done before the first paint. The record also lists which heavy dependencies got loaded.
+    """
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT, PYTHONDONTWRITEBYTECODE='1')
+    import_seconds, wall_seconds, heavy = [], [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = _run(['-c', _PROBE.format(module=module, heavy=HEAVY_MODULES)], env)
+        wall_seconds.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+        elapsed, heavy = json.loads(result.stdout.strip().splitlines()[-1])
+        import_seconds.append(elapsed)
+
+    return {
+        'module': module,
+        'repeats': repeats,
+        'import_p50_ms': round(float(np.percentile(import_seconds, 50)) * 1000, 1),
+        'process_p50_ms': round(float(np.percentile(wall_seconds, 50)) * 1000, 1),
+        'heavy_loaded': heavy,
+        'slowest_packages_ms': _import_profile(module, env, top),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures the cold-start import time of the dashboard and packages.")
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES, help="Modules to import.")
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help="Fresh interpreters per module.")
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+    options = parser.parse_args()
+
+    results = []
+    for module in options.modules:
+        record = measure(module, options.repeats)
+        print(f"{module}: import {record['import_p50_ms']} ms, process {record['process_p50_ms']} ms, "
+              f"heavy loaded: {', '.join(record['heavy_loaded']) or 'none'}", file=sys.stderr)
+        results.append(record)
+
+    report = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()), 'results': results}
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+# Run from the project root with: python -m benchmarks.startup
+if __name__ == '__main__':
+    main()
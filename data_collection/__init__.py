@@ -0,0 +1,33 @@
+"""
+Data collection: the keyword catalog, Google Trends and Reddit fetchers, and their caches and stores.
+
+Importing the package is cheap: each name below is imported from its module on first access,
+and pytrends itself only loads once a request is made.
+"""
+import importlib
+
+_EXPORTS = {
+    'TREND_CATEGORIES': 'data_collection.catalog',
+    'all_terms': 'data_collection.catalog',
+    'fetch_google_trends_data': 'data_collection.fetch_google',
+    'fetch_interest_over_time': 'data_collection.fetch_google',
+    'fetch_interest_by_region': 'data_collection.fetch_google',
+    'fetch_interest_batched': 'data_collection.fetch_google',
+    'fetch_reddit_data': 'data_collection.fetch_reddit',
+    'RegionMatrix': 'data_collection.regions',
+    'refresh_region_matrix': 'data_collection.regions',
+    'RequestScheduler': 'data_collection.scheduler',
+    'get_scheduler': 'data_collection.scheduler',
+    'set_scheduler': 'data_collection.scheduler',
+    'TrendCache': 'data_collection.trend_cache',
+    'TrendStore': 'data_collection.trend_store',
+    'get_metrics': 'data_collection.metrics',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'data_collection' has no attribute '{name}'")
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
@@ -0,0 +1,45 @@
+# --- Keyword Data ---
+# The terms the dashboard offers and the collector keeps warm, grouped the way the sidebar shows them.
+TREND_CATEGORIES = {
+    "Women's Fashion": {
+        "Core Aesthetics": ["Cottagecore", "Quiet Luxury", "Y2K Fashion", "Balletcore", "Old Money Aesthetic"],
+        "Apparel Pieces": ["Cargo Pants", "Wide Leg Jeans", "Blazer", "Slip Dress", "Corset Top"],
+        "Brands": ["Skims", "Reformation", "Ganni", "Aritzia", "With Jean"],
+        "Luxury Brands": ["Gucci", "Chanel", "Dior", "Prada", "Louis Vuitton", "Hermes"],
+        "Accessories": ["Tote Bag", "Ballet Flats", "Statement Necklace", "Chunky Loafers", "Claw Clip"],
+        "Colors": ["Hot Pink", "Lilac", "Chocolate Brown", "Sage Green", "Beige"],
+    },
+    "Men's Fashion": {
+        "Core Aesthetics": ["Gorpcore", "Workwear", "Streetwear", "Classic Menswear", "Minimalism"],
+        "Apparel Pieces": ["Cargo Shorts", "Linen Shirt", "Overshirt", "Pleated Trousers", "Polo Shirt"],
+        "Brands": ["Carhartt", "Aimé Leon Dore", "Patagonia", "Fear of God", "Stone Island"],
+        "Luxury Brands": ["Rolex", "Audemars Piguet", "Patek Philippe", "Gucci", "Louis Vuitton"],
+        "Accessories": ["Tote Bag", "Crossbody Bag", "New Balance 550", "Vintage Watch", "Beanie"],
+        "Colors": ["Olive Green", "Navy Blue", "Cream", "Burnt Orange", "Gray"],
+    }
+}
+# Sub-categories of generic items, whose terms also count when written in the plural ("tote bags").
+# Brands, colors and aesthetics are names; an added 's' there usually makes another word ("With Jean", "jeans").
+PLURAL_SUB_CATEGORIES = ("Apparel Pieces", "Accessories")
+
+
+def all_terms(categories: dict = None):
+    """
+    Returns every term in the catalog once, in catalog order.
+
+    Several terms ("Gucci", "Tote Bag", "Louis Vuitton") appear under more than one
+    sub-category; they are only listed the first time.
+    """
+    categories = categories or TREND_CATEGORIES
+    return list(dict.fromkeys(
+        term for sub_categories in categories.values() for terms in sub_categories.values() for term in terms
+    ))
+
+
+def plural_terms(categories: dict = None):
+    """Returns the catalog terms that also match in the plural, i.e. those listed under PLURAL_SUB_CATEGORIES."""
+    categories = categories or TREND_CATEGORIES
+    return list(dict.fromkeys(
+        term for sub_categories in categories.values() for name, terms in sub_categories.items()
+        if name in PLURAL_SUB_CATEGORIES for term in terms
+    ))
@@ -0,0 +1,326 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_collection.catalog import all_terms
+from data_collection.fetch_google import LazyTrendReq, fetch_interest_over_time, fetch_related_queries
+from data_collection.keyword_matcher import DEFAULT_ALIASES, tokenize
+from data_collection.scheduler import RateLimitedError
+from data_collection.trend_cache import DEFAULT_CACHE_PATH, TrendCache, connect
+
+# --- CONFIGURATION ---
+# Google reports growth above 5000% as "Breakout"; pytrends passes it on as a value at or above this.
+BREAKOUT_VALUE = 5000
+# Sightings older than this no longer count towards a candidate's score.
+WINDOW_DAYS = 28
+# A sighting's weight halves every this many days.
+HALF_LIFE_DAYS = 7
+# Upstream requests one discovery run may make. Each call is a payload request plus the query, more if retried.
+DEFAULT_BUDGET = 40
+REQUESTS_PER_CALL = 2
+DEFAULT_TOP_N = 5
+# A fetched candidate is not fetched again for this long.
+REFETCH_AFTER_SECONDS = 7 * 24 * 3600
+TIMEFRAME = 'today 1-m'
+
+
+def normalize_query(query: str):
+    """Turns a query into its candidate key, so "Mob Wife Aesthetic" and "mob-wife aesthetic" are one candidate."""
+    return ' '.join(tokenize(query))
+
+
+def _known_keys(terms: list, aliases: dict = None):
+    """The candidate keys of every catalog term and alias, which are not new by definition."""
+    aliases = DEFAULT_ALIASES if aliases is None else aliases
+    spellings = list(terms) + [alias for term in terms for alias in aliases.get(term, [])]
+    return {normalize_query(spelling) for spelling in spellings}
+
+
+class _CountingSession:
+    """Wraps a pytrends session and counts the upstream requests made through it, retries included."""
+
+    def __init__(self, session):
+        self._session = session
+        self.requests = 0
+
+    def __getattr__(self, name):
+        attribute = getattr(self._session, name)
+        if not callable(attribute):
+            return attribute
+
+        def counted(*args, **kwargs):
+            # build_payload and every query method are one HTTP request each
+            self.requests += 1
+            return attribute(*args, **kwargs)
+        return counted
+
+
+class DiscoveryStore:
+    """
+    Keeps rising related queries and discovery bookkeeping next to the trend cache in SQLite.
+
+    A sighting is one (candidate, seed, day): a query seen rising for the same seed twice in
+    a day counts once, with its latest growth. The store also remembers when each seed was
+    last crawled and when each candidate's series was last fetched, and keeps the fetched
+    series themselves, which outlive the trend cache's short TTL.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rising_queries (
+                    candidate TEXT NOT NULL,
+                    seed TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    growth REAL NOT NULL,
+                    seen_at REAL NOT NULL,
+                    PRIMARY KEY (candidate, seed, day)
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_rising_queries_seen ON rising_queries (seen_at)')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS discovery_seeds (
+                    seed TEXT PRIMARY KEY,
+                    crawled_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS discovery_candidates (
+                    candidate TEXT PRIMARY KEY,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS candidate_series (
+                    candidate TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    interest REAL NOT NULL,
+                    PRIMARY KEY (candidate, date)
+                )
+            """)
+
+    def _connect(self):
+        return connect(self.path)
+
+    def record(self, related: dict, seen_at: float = None):
+        """
+        Stores the rising queries from `fetch_related_queries` output.
+
+        Returns:
+            int: The number of sightings stored.
+        """
+        seen_at = seen_at or time.time()
+        day = time.strftime('%Y-%m-%d', time.gmtime(seen_at))
+        rows = []
+        for seed, frames in related.items():
+            rising = frames.get('rising')
+            if rising is None:
+                continue
+            for query, growth in zip(rising['query'], rising['value']):
+                candidate = normalize_query(query)
+                if candidate:
+                    rows.append((candidate, seed, day, query, float(growth), seen_at))
+        with self._connect() as conn:
+            conn.executemany('INSERT OR REPLACE INTO rising_queries VALUES (?, ?, ?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def mark_crawled(self, seeds: list, crawled_at: float = None):
+        """Marks seeds as crawled, including ones that came back without related queries (but not failed ones)."""
+        crawled_at = crawled_at or time.time()
+        with self._connect() as conn:
+            conn.executemany('INSERT OR REPLACE INTO discovery_seeds VALUES (?, ?)',
+                             [(seed, crawled_at) for seed in seeds])
+
+    def mark_fetched(self, candidates: list, fetched_at: float = None):
+        fetched_at = fetched_at or time.time()
+        with self._connect() as conn:
+            conn.executemany('INSERT OR REPLACE INTO discovery_candidates VALUES (?, ?)',
+                             [(candidate, fetched_at) for candidate in candidates])
+
+    def save_series(self, candidate: str, interest_df: pd.DataFrame):
+        """Replaces a candidate's stored series with a fetched interest-over-time frame (one value column)."""
+        values = interest_df.iloc[:, 0] if not interest_df.empty else pd.Series(dtype=float)
+        rows = [(candidate, pd.Timestamp(date).isoformat(), float(value)) for date, value in values.items()]
+        with self._connect() as conn:
+            conn.execute('DELETE FROM candidate_series WHERE candidate = ?', (candidate,))
+            conn.executemany('INSERT INTO candidate_series VALUES (?, ?, ?)', rows)
+
+    def series(self, candidate: str):
+        """Returns a candidate's stored series as a date-indexed frame with an 'interest' column."""
+        with self._connect() as conn:
+            frame = pd.read_sql_query('SELECT date, interest FROM candidate_series WHERE candidate = ? ORDER BY date',
+                                      conn, params=(candidate,))
+        frame['date'] = pd.to_datetime(frame['date'])
+        return frame.set_index('date')
+
+    def stalest_seeds(self, seeds: list, limit: int):
+        """Returns up to `limit` seeds, never-crawled ones first, then the longest ago crawled."""
+        with self._connect() as conn:
+            crawled = dict(conn.execute('SELECT seed, crawled_at FROM discovery_seeds').fetchall())
+        return sorted(seeds, key=lambda seed: crawled.get(seed, 0.0))[:limit]
+
+    def sightings(self, since: float):
+        """Returns every sighting since the timestamp, with the candidate's last fetch time (NaN if never)."""
+        with self._connect() as conn:
+            return pd.read_sql_query(
+                'SELECT r.candidate, r.seed, r.day, r.query, r.growth, r.seen_at, c.fetched_at '
+                'FROM rising_queries r LEFT JOIN discovery_candidates c ON c.candidate = r.candidate '
+                'WHERE r.seen_at >= ?', conn, params=(since,)
+            )
+
+
+def score_candidates(store: DiscoveryStore, known: set = frozenset(), window_days: float = WINDOW_DAYS,
+                     half_life_days: float = HALF_LIFE_DAYS, now: float = None):
+    """
+    Scores every candidate seen rising within the window.
+
+    Each sighting contributes `log1p(growth)` (growth capped at the breakout value), halved for
+    every `half_life_days` of age. A candidate's score is the sum over its sightings times
+    `1 + log(distinct seeds)`, so a query that keeps rising, and rises next to several
+    catalog terms, outranks a one-off spike.
+
+    Args:
+        store (DiscoveryStore): Where the sightings live.
+        known (set): Candidate keys to leave out, such as catalog terms.
+        window_days (float): How far back sightings count.
+        half_life_days (float): How fast old sightings fade.
+        now (float, optional): The reference time (defaults to the current time).
+
+    Returns:
+        pandas.DataFrame: One row per candidate, best first, with `candidate`, `query` (the latest
+                          spelling Google used), `score`, `sightings`, `seeds`, `max_growth`,
+                          `breakout`, `last_seen` and `fetched_at`.
+    """
+    now = now or time.time()
+    sightings = store.sightings(now - window_days * 86400)
+    sightings = sightings[~sightings['candidate'].isin(known)]
+    if sightings.empty:
+        return pd.DataFrame(columns=['candidate', 'query', 'score', 'sightings', 'seeds', 'max_growth',
+                                     'breakout', 'last_seen', 'fetched_at'])
+
+    age_days = (now - sightings['seen_at']) / 86400
+    growth = sightings['growth'].clip(lower=0, upper=BREAKOUT_VALUE)
+    sightings = sightings.assign(weight=np.log1p(growth) * 0.5 ** (age_days / half_life_days))
+
+    latest = sightings.sort_values('seen_at').groupby('candidate')['query'].last()
+    scored = sightings.groupby('candidate').agg(
+        weight=('weight', 'sum'),
+        sightings=('weight', 'size'),
+        seeds=('seed', 'nunique'),
+        max_growth=('growth', 'max'),
+        last_seen=('seen_at', 'max'),
+        fetched_at=('fetched_at', 'max'),
+    )
+    scored['score'] = (scored['weight'] * (1 + np.log(scored['seeds']))).round(3)
+    scored['breakout'] = scored['max_growth'] >= BREAKOUT_VALUE
+    scored['query'] = latest
+    scored = scored.reset_index().sort_values(['score', 'last_seen'], ascending=False, ignore_index=True)
+    return scored[['candidate', 'query', 'score', 'sightings', 'seeds', 'max_growth', 'breakout', 'last_seen',
+                   'fetched_at']]
+
+
+def discover(seeds: list = None, budget: int = DEFAULT_BUDGET, top_n: int = DEFAULT_TOP_N,
+             store: DiscoveryStore = None, cache: TrendCache = None, pytrends=None, timeframe: str = TIMEFRAME):
+    """
+    Runs one discovery pass within a fixed budget of upstream requests.
+
+    The budget counts the requests actually sent through the session: each call is a
+    payload request plus the query, and every retry of either counts again. It is split
+    between crawling seeds for rising queries (the seeds crawled longest ago first) and
+    fetching the full series of the best-scoring new candidates (at most `top_n`), which are
+    kept in the discovery store. Candidates already in the catalog, or fetched within the
+    last week, are skipped. A call only starts while the budget still covers it, and the pass
+    stops early if Google rate limits us, so only the retries of a pass's last call can
+    take it past its budget.
+
+    Args:
+        seeds (list, optional): The terms to crawl for rising queries. Defaults to the whole catalog.
+        budget (int): The most upstream requests this pass may make.
+        top_n (int): The most candidates fetched in full.
+        store (DiscoveryStore, optional): Where sightings live. Defaults to the standard cache file.
+        cache (TrendCache, optional): Read through before fetching a candidate. Defaults to the standard cache file.
+        pytrends (TrendReq, optional): An existing session to reuse.
+        timeframe (str): The window rising queries and candidate series are fetched for.
+
+    Returns:
+        pandas.DataFrame: The scored candidates (see `score_candidates`) with a `fetched_now`
+                          column marking the ones whose series this pass fetched.
+    """
+    seeds = seeds or all_terms()
+    store = store or DiscoveryStore()
+    cache = cache or TrendCache()
+    session = _CountingSession(pytrends or LazyTrendReq())
+    known = _known_keys(all_terms()) | _known_keys(seeds)
+
+    # Keep room for the candidate fetches, but always crawl at least one seed
+    fetch_calls = min(top_n, budget // REQUESTS_PER_CALL // 2)
+    crawl_budget = max(REQUESTS_PER_CALL, budget - fetch_calls * REQUESTS_PER_CALL)
+    crawl = store.stalest_seeds(seeds, crawl_budget // REQUESTS_PER_CALL)
+    print(f"Crawling up to {len(crawl)} seeds for rising queries...")
+    related, errors, attempted = {}, {}, []
+    rate_limited = False
+    for seed in crawl:
+        if attempted and session.requests + REQUESTS_PER_CALL > crawl_budget:
+            break
+        attempted.append(seed)
+        related.update(fetch_related_queries([seed], timeframe=timeframe, pytrends=session, errors=errors))
+        if isinstance(errors.get(seed), RateLimitedError):
+            print("    - Stopping discovery early: Google is rate limiting us.")
+            rate_limited = True
+            break
+    print(f"  - Crawled {len(attempted)} seeds in {session.requests} requests; "
+          f"stored {store.record(related)} rising query sightings.")
+    # Failed seeds, and the ones a rate limit cut off, stay stale so the next pass crawls them first
+    store.mark_crawled([seed for seed in attempted if seed not in errors])
+
+    scored = score_candidates(store, known)
+    cutoff = time.time() - REFETCH_AFTER_SECONDS
+    eligible = scored[scored['fetched_at'].isna() | (scored['fetched_at'] < cutoff)]
+    picked = eligible.head(0 if rate_limited else top_n)
+
+    fetched = []
+    for candidate, query in zip(picked['candidate'], picked['query']):
+        if session.requests + REQUESTS_PER_CALL > budget:
+            break
+        print(f"  - Fetching candidate '{query}'")
+        try:
+            interest_df = fetch_interest_over_time(query, timeframe, cache=cache, pytrends=session)
+        except RateLimitedError as e:
+            print(f"    - Stopping discovery early: {e}")
+            break
+        except Exception as e:
+            print(f"    - Could not fetch '{query}'. Error: {e}")
+            continue
+        store.save_series(candidate, interest_df)
+        fetched.append(candidate)
+    store.mark_fetched(fetched)
+    print(f"Discovery used {session.requests} of its {budget} upstream requests.")
+
+    scored['fetched_now'] = scored['candidate'].isin(fetched)
+    return scored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Finds new trend terms among the rising queries of catalog terms.")
+    parser.add_argument('--budget', type=int, default=DEFAULT_BUDGET, help="Most upstream requests this run may make.")
+    parser.add_argument('--top-n', type=int, default=DEFAULT_TOP_N, help="Most candidates fetched in full.")
+    parser.add_argument('--show', type=int, default=20, help="How many scored candidates to print.")
+    parser.add_argument('seeds', nargs='*', help="Terms to crawl (defaults to the whole catalog).")
+    args = parser.parse_args()
+
+    scored = discover(args.seeds or None, budget=args.budget, top_n=args.top_n)
+    if scored.empty:
+        print("No candidates yet.")
+    else:
+        print("\n--- Top Candidates ---")
+        print(scored.head(args.show)[['query', 'score', 'sightings', 'seeds', 'max_growth', 'fetched_now']])
+
+
+# Run from the project root with: python -m data_collection.discovery
+if __name__ == '__main__':
+    main()
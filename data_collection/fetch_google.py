@@ -1,76 +1,400 @@
 import pandas as pd
-from pytrends.request import TrendReq
-import time
 
-def fetch_google_trends_data(keywords: list):
+from data_collection.incremental import SeriesHistory, fetch_incremental
+from data_collection.metrics import get_metrics
+from data_collection.scheduler import BACKGROUND, RateLimitedError, trends_request
+from data_collection.singleflight import SingleFlight
+from data_collection.trend_cache import TrendCache
+
+# Google Trends accepts at most five terms in a single payload.
+MAX_TERMS_PER_PAYLOAD = 5
+# The country whose states `include_regions` breaks interest down by.
+REGION_GEO = 'US'
+
+# Concurrent cache misses for the same entry in this process (dashboard sessions, the compare
+# view, background threads) wait on one upstream fetch instead of each sending their own.
+_request_flight = SingleFlight()
+get_metrics().register_gauges('singleflight', lambda: _request_flight.stats)
+
+
+def _chunk_keywords(keywords: list, anchor: str, size: int = MAX_TERMS_PER_PAYLOAD):
+    """
+    Splits keywords into payload groups that all share the same anchor term.
+
+    Every group starts with the anchor, so each payload carries the anchor plus up to
+    `size - 1` new keywords.
     """
-    Fetches interest over time and related queries from Google Trends for a given list of keywords.
+    others = [keyword for keyword in dict.fromkeys(keywords) if keyword != anchor]
+    step = size - 1
+    groups = [[anchor] + others[i:i + step] for i in range(0, len(others), step)]
+    return groups or [[anchor]]
+
+
+def _to_anchor_units(group_frames: list, anchor: str):
+    """
+    Puts every payload group on one common scale using the shared anchor term.
+
+    Google normalizes each payload to its own maximum, so the same anchor series comes
+    back with a different scale in every group. Each group is divided by the anchor's
+    total in that group, which expresses every keyword in "anchor units" that no longer
+    depend on which other terms shared the payload.
+
+    Args:
+        group_frames (list): One wide DataFrame (date x keyword) per payload group.
+        anchor (str): The keyword shared by every group.
+
+    Returns:
+        pandas.DataFrame: A single wide DataFrame with one column per keyword.
+    """
+    totals = [frame[anchor].sum() for frame in group_frames]
+    reference_total = next((total for total in totals if total > 0), 1.0)
+    scaled_frames = []
+
+    for i, (frame, anchor_total) in enumerate(zip(group_frames, totals)):
+        if anchor_total <= 0:
+            print(f"    - Anchor '{anchor}' has no interest in group {i + 1}; values in that group are not rescaled.")
+            anchor_total = reference_total
+        if i > 0:
+            # The anchor's own series is taken from the first group only
+            frame = frame.drop(columns=[anchor])
+        scaled_frames.append(frame / anchor_total)
+
+    return pd.concat(scaled_frames, axis=1)
+
+
+def _rescale_to_peak(wide_df: pd.DataFrame):
+    """Rescales a wide interest table so its overall maximum is 100."""
+    peak = wide_df.max().max()
+    if peak > 0:
+        wide_df = wide_df * (100.0 / peak)
+    return wide_df.round(2)
+
+
+def _to_long_format(wide_df: pd.DataFrame):
+    """Turns a wide (date x keyword) interest table into our long database format."""
+    long_df = wide_df.rename_axis('date').reset_index().melt(
+        id_vars='date', var_name='trend_keyword', value_name='value'
+    )
+    long_df['source'] = 'Google Trends'
+    long_df['metric_type'] = 'search_interest'
+    long_df['region'] = 'global'  # Google interest is global by default
+    return long_df
+
+
+class LazyTrendReq:
+    """A TrendReq stand-in that only imports pytrends and opens the real session when a request is actually made."""
+
+    def __init__(self):
+        self._session = None
+
+    def __getattr__(self, name):
+        if self._session is None:
+            from pytrends.request import TrendReq
+            self._session = TrendReq(hl='en-US', tz=360)
+        return getattr(self._session, name)
+
+
+def fetch_interest_over_time(keyword: str, timeframe: str = 'today 12-m', geo: str = '',
+                             cache: TrendCache = None, pytrends=None, ttl: int = None,
+                             history: SeriesHistory = None, priority: int = BACKGROUND, refresh: bool = False):
+    """
+    Returns the interest-over-time frame for one keyword, reading through the trend cache.
+
+    With a `history` store, a cache miss only fetches the recent tail of the series and
+    splices it onto the stored history (see `fetch_incremental`), so the returned series
+    can reach further back than `timeframe`. Concurrent misses for the same entry share
+    one upstream fetch.
+
+    Args:
+        keyword (str): The keyword to search.
+        timeframe (str): The Google Trends timeframe to query.
+        geo (str): The Google Trends geo code ('' for worldwide).
+        cache (TrendCache, optional): The cache to read through. No caching if None.
+        pytrends (TrendReq, optional): An existing session to reuse on a cache miss.
+        ttl (int, optional): Freshness of the stored entry in seconds (defaults to the cache's TTL).
+        history (SeriesHistory, optional): Fetch incrementally against this history store.
+        priority (int): The scheduler priority of the upstream requests.
+        refresh (bool): Skip the cache read and always fetch (the result is still cached).
+
+    Returns:
+        pandas.DataFrame: The series indexed by date with one column named after the keyword,
+                          or an empty DataFrame if Google has no data for it.
+    """
+    if cache is not None and not refresh:
+        cached = cache.get(keyword, timeframe, geo, 'TIME')
+        if cached is not None:
+            return cached
+
+    def fetch():
+        session = pytrends or LazyTrendReq()
+        if history is not None:
+            interest_df = fetch_incremental(keyword, timeframe, geo, history=history, pytrends=session,
+                                            priority=priority)
+        else:
+            interest_df = trends_request(session, [keyword], 'interest_over_time', timeframe, geo, priority=priority)
+            interest_df = interest_df.drop(columns=['isPartial'], errors='ignore')
+        if cache is not None:
+            cache.put(keyword, timeframe, geo, 'TIME', interest_df, ttl=ttl)
+        return interest_df
+
+    return _request_flight.do((keyword, timeframe, geo, 'TIME'), fetch)
+
+
+def fetch_interest_by_region(keyword: str, timeframe: str = 'today 12-m', geo: str = 'US',
+                             resolution: str = 'REGION', cache: TrendCache = None, pytrends=None, ttl: int = None,
+                             priority: int = BACKGROUND, refresh: bool = False):
+    """
+    Returns the interest-by-region frame for one keyword, reading through the trend cache.
+
+    Args:
+        keyword (str): The keyword to search.
+        timeframe (str): The Google Trends timeframe to query.
+        geo (str): The country (or region) to break down, e.g. 'US'.
+        resolution (str): The pytrends resolution ('COUNTRY', 'REGION', 'DMA' or 'CITY').
+        cache (TrendCache, optional): The cache to read through. No caching if None.
+        pytrends (TrendReq, optional): An existing session to reuse on a cache miss.
+        ttl (int, optional): Freshness of the stored entry in seconds (defaults to the cache's TTL).
+        priority (int): The scheduler priority of the upstream request.
+        refresh (bool): Skip the cache read and always fetch (the result is still cached).
+
+    Returns:
+        pandas.DataFrame: Regions as the index with one column named after the keyword.
+    """
+    if cache is not None and not refresh:
+        cached = cache.get(keyword, timeframe, geo, resolution)
+        if cached is not None:
+            return cached
+
+    def fetch():
+        region_df = trends_request(pytrends or LazyTrendReq(), [keyword], 'interest_by_region', timeframe, geo,
+                                   priority=priority, resolution=resolution, inc_low_vol=True, inc_geo_code=False)
+        if cache is not None:
+            cache.put(keyword, timeframe, geo, resolution, region_df, ttl=ttl)
+        return region_df
+
+    return _request_flight.do((keyword, timeframe, geo, resolution), fetch)
+
+
+def _region_to_long_format(region_df: pd.DataFrame, keyword: str):
+    """Turns an interest-by-region frame into long-format rows, one per region, dated today."""
+    long_df = pd.DataFrame({
+        'date': pd.Timestamp.today().normalize(),
+        'trend_keyword': keyword,
+        'source': 'Google Trends',
+        'metric_type': 'regional_interest',
+        'value': region_df[keyword].to_numpy(),
+        'region': region_df.index.to_numpy(),
+    })
+    return long_df
+
+
+def fetch_related_queries(keywords: list, timeframe: str = 'today 1-m', geo: str = '', pytrends=None,
+                          errors: dict = None):
+    """
+    Fetches the 'top' and 'rising' related queries for each keyword.
+
+    Related queries are only meaningful for a single-keyword payload, so this runs as a
+    separate pass with one request per keyword.
+
+    Args:
+        keywords (list): A list of strings, where each string is a keyword to search.
+        timeframe (str): The Google Trends timeframe to query.
+        geo (str): The Google Trends geo code ('' for worldwide).
+        pytrends (TrendReq, optional): An existing session to reuse.
+        errors (dict, optional): Filled with the keywords whose request failed, mapped to the
+                                 exception, so callers can tell them apart from keywords
+                                 without related queries.
+
+    Returns:
+        dict: Maps each keyword to a dict with 'top' and 'rising' DataFrames (either may be None).
+    """
+    pytrends = pytrends or LazyTrendReq()
+    errors = {} if errors is None else errors
+    related = {}
+
+    for keyword in keywords:
+        try:
+            related_queries = trends_request(pytrends, [keyword], 'related_queries', timeframe, geo)
+            # Check if the keyword has related queries data
+            if keyword in related_queries and related_queries[keyword]:
+                frames = related_queries[keyword]
+                related[keyword] = {
+                    'top': frames.get('top') if frames.get('top') is not None and not frames['top'].empty else None,
+                    'rising': frames.get('rising') if frames.get('rising') is not None and not frames['rising'].empty else None,
+                }
+        except Exception as e:
+            # If fetching related queries fails, print a warning and continue
+            print(f"    - Could not fetch related queries for '{keyword}'. Error: {e}")
+            errors[keyword] = e
+
+    return related
+
+
+def fetch_interest_batched(keywords: list, anchor: str = None, timeframe: str = 'today 12-m', geo: str = '',
+                           cache: TrendCache = None, pytrends=None, priority: int = BACKGROUND, refresh: bool = False):
+    """
+    Fetches keywords in shared-anchor payloads and returns a wide table on a common 0-100 scale.
+
+    Anchor-unit series are cached per keyword under the resolution 'TIME@<anchor>', so only
+    the keywords without a fresh entry are sent upstream.
+
+    Args:
+        keywords (list): The keywords to compare.
+        anchor (str, optional): The term shared by every payload. Defaults to the first keyword.
+        timeframe (str): The Google Trends timeframe to query.
+        geo (str): The Google Trends geo code ('' for worldwide).
+        cache (TrendCache, optional): The cache to read through. No caching if None.
+        pytrends (TrendReq, optional): An existing session to reuse.
+        priority (int): The scheduler priority of the upstream requests.
+        refresh (bool): Skip the cache reads and fetch every keyword (the results are still cached).
+
+    Returns:
+        pandas.DataFrame: Dates as the index and one column per keyword that had data.
+    """
+    if not keywords:
+        return pd.DataFrame()
+    anchor = anchor or keywords[0]
+    pytrends = pytrends or LazyTrendReq()
+    resolution = f'TIME@{anchor}'
+    series = {}
+    for keyword in dict.fromkeys([anchor] + keywords):
+        cached = cache.get(keyword, timeframe, geo, resolution) if cache is not None and not refresh else None
+        if cached is not None:
+            series[keyword] = cached[keyword]
+
+    def fetch_missing(missing):
+        group_frames = []
+        for group in _chunk_keywords(missing, anchor):
+            print(f"  - Processing batch {group}")
+            try:
+                interest_df = trends_request(pytrends, group, 'interest_over_time', timeframe, geo, priority=priority)
+            except RateLimitedError as e:
+                print(f"    - Skipping batch {group}: {e}")
+                continue
+            if interest_df.empty:
+                print(f"    - No interest data returned for batch {group}")
+            else:
+                group_frames.append(interest_df.drop(columns=['isPartial'], errors='ignore'))
+        if not group_frames:
+            return pd.DataFrame()
+
+        fresh_df = _to_anchor_units(group_frames, anchor)
+        if cache is not None:
+            for keyword in fresh_df.columns:
+                cache.put(keyword, timeframe, geo, resolution, fresh_df[[keyword]])
+        return fresh_df
+
+    missing = [keyword for keyword in keywords if keyword not in series]
+    if missing:
+        fresh_df = _request_flight.do((tuple(missing), timeframe, geo, resolution), fetch_missing, missing)
+        for keyword in fresh_df.columns:
+            series[keyword] = fresh_df[keyword]
+
+    found = [keyword for keyword in keywords if keyword in series]
+    if not found:
+        return pd.DataFrame()
+    return _rescale_to_peak(pd.concat([series[keyword] for keyword in found], axis=1))
+
+
+@get_metrics().span('fetch_google_trends_data')
+def fetch_google_trends_data(keywords: list, timeframe: str = 'today 1-m', geo: str = '',
+                             batched: bool = False, anchor: str = None, include_related: bool = False,
+                             use_cache: bool = True, incremental: bool = False, include_regions: bool = False,
+                             refresh: bool = False, pytrends=None, cache: TrendCache = None):
+    """
+    Fetches interest over time from Google Trends for a given list of keywords.
+
+    By default each keyword gets its own payload. With `batched=True` the keywords are packed
+    into groups of up to five terms per payload, each group sharing one anchor term, and the
+    groups are rescaled through that anchor onto a common 0-100 scale. This needs roughly a
+    quarter of the requests of the per-keyword mode.
+
+    Both modes read through the persistent trend cache that the dashboard also uses, so
+    series that are still fresh there cost no upstream requests. With `incremental=True`
+    the per-keyword mode only fetches each series' recent tail and splices it onto the
+    stored history.
 
     Args:
         keywords (list): A list of strings, where each string is a keyword to search.
+        timeframe (str): The Google Trends timeframe to query.
+        geo (str): The Google Trends geo code ('' for worldwide).
+        batched (bool): Pack keywords into shared-anchor payloads instead of one per keyword.
+        anchor (str, optional): The term shared by every batch. Defaults to the first keyword;
+                                a steadily popular term gives the most stable rescaling.
+        include_related (bool): Also run a second pass that fetches related queries per keyword
+                                and stores the rising ones for trend discovery.
+        use_cache (bool): Read through and populate the persistent trend cache.
+        incremental (bool): Fetch only the tail of each series on top of its stored history.
+                            Per-keyword mode only: anchor-unit batches are always pulled in full.
+        include_regions (bool): Also fetch US state-level interest per keyword, returned as
+                                'regional_interest' rows dated today with the state as `region`.
+        refresh (bool): Ignore fresh cache entries and refetch everything (results are still cached).
+        pytrends (TrendReq, optional): An existing session to reuse.
+        cache (TrendCache, optional): The cache to read through when `use_cache` is set.
+                                      Defaults to the standard cache file.
 
     Returns:
         pandas.DataFrame: A DataFrame containing the cleaned and structured data,
                           ready to be saved to the database. Returns an empty DataFrame if an error occurs.
+
+    Raises:
+        ValueError: If both `batched` and `incremental` are set.
     """
+    if batched and incremental:
+        raise ValueError("Incremental fetches need one payload per keyword; use batched=False with incremental=True.")
     print(f"Fetching Google Trends data for keywords: {keywords}...")
-    
+
     # Create a list to hold all the data we collect
     all_trends_data = []
-    
+
     try:
-        pytrends = TrendReq(hl='en-US', tz=360)
-
-        # We process one keyword at a time to get its related queries accurately
-        for keyword in keywords:
-            print(f"  - Processing '{keyword}'")
-            
-            # Build the payload for this specific keyword
-            pytrends.build_payload([keyword], cat=0, timeframe='today 1-m', geo='', gprop='')
-            
-            # --- 1. Get Interest Over Time ---
-            interest_df = pytrends.interest_over_time()
-            if not interest_df.empty:
-                # The 'isPartial' column is not needed, so we drop it
-                if 'isPartial' in interest_df.columns:
-                    interest_df = interest_df.drop(columns=['isPartial'])
-                # Rename the column from the keyword to a generic 'value'
-                interest_df = interest_df.rename(columns={keyword: 'value'})
-                
-                # Add the columns needed for our database
-                interest_df['trend_keyword'] = keyword
-                interest_df['source'] = 'Google Trends'
-                interest_df['metric_type'] = 'search_interest'
-                interest_df['region'] = 'global' # Google interest is global by default
-                
-                # Reset the index to turn the 'date' from an index into a column
-                interest_df = interest_df.reset_index()
-                
-                all_trends_data.append(interest_df)
-
-            # --- 2. Get Related Queries (with improved error handling) ---
-            try:
-                related_queries = pytrends.related_queries()
-                # Check if the keyword has related queries data
-                if keyword in related_queries and related_queries[keyword]:
-                    # Check for 'top' queries
-                    if 'top' in related_queries[keyword] and not related_queries[keyword]['top'].empty:
-                        top_df = related_queries[keyword]['top']
-                        # Process this data if needed... for now, we'll just print it
-                        # print(f"    Top related queries for {keyword}:\n{top_df}")
-                    
-                    # Check for 'rising' queries
-                    if 'rising' in related_queries[keyword] and not related_queries[keyword]['rising'].empty:
-                        rising_df = related_queries[keyword]['rising']
-                        # print(f"    Rising related queries for {keyword}:\n{rising_df}")
-            except Exception as e:
-                # If fetching related queries fails, print a warning and continue
-                print(f"    - Could not fetch related queries for '{keyword}'. Error: {e}")
-                pass
-
-
-            # It's good practice to wait a moment between requests to avoid getting blocked
-            time.sleep(1) 
+        pytrends = pytrends or LazyTrendReq()
+        cache = (cache or TrendCache()) if use_cache else None
+        history = SeriesHistory() if incremental else None
+
+        if batched and keywords:
+            wide_df = fetch_interest_batched(keywords, anchor, timeframe, geo, cache=cache, pytrends=pytrends,
+                                             refresh=refresh)
+            if not wide_df.empty:
+                all_trends_data.append(_to_long_format(wide_df))
+        else:
+            # We process one keyword at a time so each series is normalized on its own
+            for keyword in keywords:
+                print(f"  - Processing '{keyword}'")
+
+                try:
+                    interest_df = fetch_interest_over_time(keyword, timeframe, geo, cache=cache, pytrends=pytrends,
+                                                           history=history, refresh=refresh)
+                except RateLimitedError as e:
+                    # Keep what we have so far; the scheduler already retried this keyword
+                    print(f"    - Skipping '{keyword}': {e}")
+                    continue
+                if not interest_df.empty:
+                    all_trends_data.append(_to_long_format(interest_df))
+
+        # --- Optional pass: regional interest ---
+        if include_regions:
+            for keyword in keywords:
+                try:
+                    region_df = fetch_interest_by_region(keyword, timeframe, REGION_GEO, cache=cache,
+                                                         pytrends=pytrends, refresh=refresh)
+                except RateLimitedError as e:
+                    print(f"    - Skipping regions for '{keyword}': {e}")
+                    continue
+                if not region_df.empty:
+                    all_trends_data.append(_region_to_long_format(region_df, keyword))
+
+        # --- Optional second pass: related queries ---
+        if include_related:
+            # Imported here because the discovery module builds on this one
+            from data_collection.discovery import DiscoveryStore
+
+            errors = {}
+            related = fetch_related_queries(keywords, timeframe=timeframe, geo=geo, pytrends=pytrends, errors=errors)
+            # Rising queries feed the candidate queue (see data_collection/discovery.py)
+            discovery = DiscoveryStore()
+            discovery.record(related)
+            discovery.mark_crawled([keyword for keyword in keywords if keyword not in errors])
 
         if not all_trends_data:
             print("No data was collected from Google Trends.")
@@ -78,28 +402,31 @@ def fetch_google_trends_data(keywords: list):
 
         # Combine all the dataframes from the list into one big dataframe
         final_df = pd.concat(all_trends_data, ignore_index=True)
-        
+
         # Add a unique ID for each row
         final_df.insert(0, 'id', range(len(final_df)))
-        
+
         # Reorder columns to match our database schema
         final_df = final_df[['id', 'date', 'trend_keyword', 'source', 'metric_type', 'value', 'region']]
-        
+        get_metrics().inc('rows_ingested_total', len(final_df), source='Google Trends')
+
         print("\nSuccessfully fetched and structured Google Trends data.")
         return final_df
 
     except Exception as e:
         print(f"An error occurred while fetching Google Trends data: {e}")
+        get_metrics().inc('errors_total', stage='fetch_google_trends_data', error=type(e).__name__)
         return pd.DataFrame() # Return an empty dataframe on error
 
 
 # --- Example of how to use this function ---
+# Run from the project root with: python -m data_collection.fetch_google
 if __name__ == '__main__':
     fashion_keywords = ["quiet luxury", "gorpcore", "y2k fashion"]
     google_data = fetch_google_trends_data(fashion_keywords)
-    
+
     if not google_data.empty:
         print("\n--- Sample of Final Structured Data ---")
         print(google_data.head()) # Print the first 5 rows
         print("\n--- Data Info ---")
-        google_data.info()
\ No newline at end of file
+        google_data.info()
@@ -0,0 +1,287 @@
+import asyncio
+import json
+import math
+import os
+
+import pandas as pd
+
+from data_collection.keyword_matcher import KeywordMatcher
+from data_collection.metrics import get_metrics
+from data_collection.scheduler import TokenBucket
+
+# --- CONFIGURATION ---
+FASHION_SUBREDDITS = [
+    "fashion", "femalefashionadvice", "malefashionadvice", "streetwear", "OUTFITS",
+    "frugalmalefashion", "goodyearwelt", "rawdenim", "Sneakers", "handbags",
+]
+DEFAULT_CURSOR_PATH = os.environ.get(
+    'REDDIT_CURSOR_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'reddit_cursors.json')
+)
+# Reddit allows 100 OAuth requests per minute; a listing page holds up to 100 items.
+REQUESTS_PER_MINUTE = 100
+PAGE_SIZE = 100
+# Reddit serves at most this many items of a listing, however far back it is paged.
+LISTING_CAP = 1000
+LISTING_KINDS = ('submissions', 'comments')
+
+
+def _oldest_window(items: list, after_utc: float, limit: int):
+    """
+    Returns up to `limit` of the oldest items posted after `after_utc`, oldest first.
+
+    A cut never splits items that share a timestamp (unless they alone fill the window),
+    so a cursor set to the newest returned item never skips a same-second neighbour.
+    """
+    newer = sorted((item for item in items if item['created_utc'] > after_utc), key=lambda item: item['created_utc'])
+    if len(newer) <= limit:
+        return newer
+    cut = limit
+    while cut > 0 and newer[cut - 1]['created_utc'] == newer[cut]['created_utc']:
+        cut -= 1
+    return newer[:cut or limit]
+
+
+def _pages_read(items: list, after_utc: float):
+    """How many listing pages paging back to the cursor takes, including the page that reaches it."""
+    newer = sum(1 for item in items if item['created_utc'] > after_utc)
+    read = min(LISTING_CAP, newer + (1 if newer < len(items) else 0))
+    return max(1, math.ceil(read / PAGE_SIZE))
+
+
+async def _no_pacing():
+    pass
+
+
+class AsyncPrawClient:
+    """
+    Reads subreddit listings through asyncpraw.
+
+    Credentials come from the REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET and REDDIT_USER_AGENT
+    environment variables, so they never have to live in the code.
+    """
+
+    def __init__(self, client_id: str = None, client_secret: str = None, user_agent: str = None):
+        import asyncpraw  # Only needed when talking to the real API
+
+        self.reddit = asyncpraw.Reddit(
+            client_id=client_id or os.environ['REDDIT_CLIENT_ID'],
+            client_secret=client_secret or os.environ['REDDIT_CLIENT_SECRET'],
+            user_agent=user_agent or os.environ.get('REDDIT_USER_AGENT', 'TrendAnalyzer'),
+        )
+
+    async def listing(self, subreddit: str, kind: str, after_utc: float, limit: int, pay=None):
+        """
+        Returns up to `limit` of the oldest submissions or comments posted after `after_utc`, oldest first.
+
+        Reddit lists newest first, so this pages back to the cursor (at most LISTING_CAP
+        items) and keeps the oldest ones; the rest are picked up by the next pull. `pay` is
+        awaited before every page request, so a quiet listing costs one request and a busy
+        one pays for every page it reads.
+        """
+        pay = pay or _no_pacing
+        sub = await self.reddit.subreddit(subreddit)
+        stream = sub.new(limit=LISTING_CAP) if kind == 'submissions' else sub.comments(limit=LISTING_CAP)
+        items = []
+        read = 0
+        while read < LISTING_CAP:
+            if read % PAGE_SIZE == 0:
+                # The listing fetches its next page of PAGE_SIZE items on this step
+                await pay()
+            try:
+                item = await stream.__anext__()
+            except StopAsyncIteration:
+                break
+            read += 1
+            if item.created_utc <= after_utc:
+                break
+            text = f"{item.title} {item.selftext}" if kind == 'submissions' else item.body
+            items.append({'id': item.id, 'created_utc': item.created_utc, 'text': text, 'score': item.score})
+        return _oldest_window(items, after_utc, limit)
+
+    async def close(self):
+        await self.reddit.close()
+
+
+class RecordedRedditClient:
+    """
+    Replays recorded subreddit listings from a JSON file instead of calling Reddit.
+
+    The file maps each subreddit to its 'submissions' and 'comments' lists, and every item
+    has 'id', 'created_utc', 'text' and 'score'. This lets the pipeline run offline and
+    deterministically.
+    """
+
+    def __init__(self, path: str):
+        with open(path, encoding='utf-8') as f:
+            self.recordings = json.load(f)
+        self.requests = 0
+
+    async def listing(self, subreddit: str, kind: str, after_utc: float, limit: int, pay=None):
+        """Serves a recorded listing, paying through `pay` for the pages Reddit would have sent."""
+        items = self.recordings.get(subreddit, {}).get(kind, [])
+        for _ in range(_pages_read(items, after_utc)):
+            self.requests += 1
+            await (pay or _no_pacing)()
+        return _oldest_window(items, after_utc, limit)
+
+    async def close(self):
+        pass
+
+
+class CursorStore:
+    """Remembers the newest item seen per (subreddit, listing kind) in a small JSON file."""
+
+    def __init__(self, path: str = DEFAULT_CURSOR_PATH):
+        self.path = path
+        self.cursors = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.cursors = json.load(f)
+
+    def get(self, subreddit: str, kind: str):
+        return self.cursors.get(f'{subreddit}/{kind}', 0.0)
+
+    def set(self, subreddit: str, kind: str, created_utc: float):
+        self.cursors[f'{subreddit}/{kind}'] = max(created_utc, self.get(subreddit, kind))
+
+    def save(self):
+        """Writes the cursors through a temporary file so a crash never leaves a half-written file."""
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.cursors, f, indent=2)
+        os.replace(temp_path, self.path)
+
+
+async def _acquire(bucket: TokenBucket, cost: float):
+    while not bucket.try_acquire(cost):
+        await asyncio.sleep(bucket.wait_time(cost))
+
+
+async def _collect(client, subreddits: list, cursors: CursorStore, limit: int, max_concurrency: int,
+                   bucket: TokenBucket):
+    """Pulls every (subreddit, kind) listing concurrently and returns all new items."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def pay():
+        # One token per page request, taken as the client pages through a listing
+        await _acquire(bucket, 1)
+
+    async def pull(subreddit, kind):
+        async with semaphore:
+            try:
+                items = await client.listing(subreddit, kind, cursors.get(subreddit, kind), limit, pay)
+            except Exception as e:
+                print(f"    - Could not read r/{subreddit} {kind}. Error: {e}")
+                get_metrics().inc('errors_total', stage='reddit_listing', error=type(e).__name__)
+                return []
+            get_metrics().inc('reddit_items_total', len(items), kind=kind)
+            if items:
+                # Listings hold the oldest new items, so this never moves past one that was not read
+                cursors.set(subreddit, kind, max(item['created_utc'] for item in items))
+            if len(items) >= limit:
+                print(f"    - r/{subreddit} {kind} hit the {limit}-item limit; newer items wait for the next pull.")
+            print(f"  - r/{subreddit}: {len(items)} new {kind}")
+            return items
+
+    results = await asyncio.gather(*(pull(subreddit, kind) for subreddit in subreddits for kind in LISTING_KINDS))
+    return [item for items in results for item in items]
+
+
+def aggregate_mentions(items: list, keywords: list, aliases: dict = None):
+    """
+    Counts keyword mentions and score-weighted engagement per day.
+
+    Mentions are found with a KeywordMatcher, so accents, case, aliases ("Y2K" for
+    "Y2K Fashion") and plurals of generic items ("tote bags") are all counted towards the
+    catalog term.
+
+    Each item mentioning a keyword adds one mention, and adds `1 + max(score, 0)` to that
+    keyword's engagement for the day, so upvoted discussion counts for more.
+
+    Returns:
+        pandas.DataFrame: Long-format rows with `source='Reddit'` and `metric_type` of
+                          'mentions' or 'engagement'.
+    """
+    matcher = KeywordMatcher(keywords, aliases)
+    hits = []
+    for item, matched in zip(items, matcher.tag(item['text'] for item in items)):
+        for keyword in matched:
+            hits.append((item['created_utc'], keyword, 1 + max(item['score'], 0)))
+
+    columns = ['id', 'date', 'trend_keyword', 'source', 'metric_type', 'value', 'region']
+    if not hits:
+        return pd.DataFrame(columns=columns)
+
+    hits_df = pd.DataFrame(hits, columns=['created_utc', 'trend_keyword', 'engagement'])
+    hits_df['date'] = pd.to_datetime(hits_df['created_utc'], unit='s').dt.normalize()
+    daily = hits_df.groupby(['date', 'trend_keyword']).agg(
+        mentions=('engagement', 'size'), engagement=('engagement', 'sum')
+    ).reset_index()
+
+    long_df = daily.melt(id_vars=['date', 'trend_keyword'], var_name='metric_type', value_name='value')
+    long_df['value'] = long_df['value'].astype(float)
+    long_df['source'] = 'Reddit'
+    long_df['region'] = 'global'
+    long_df.insert(0, 'id', range(len(long_df)))
+    return long_df[columns]
+
+
+async def fetch_reddit_data_async(keywords: list, subreddits: list = None, client=None, cursors: CursorStore = None,
+                                  limit: int = 500, max_concurrency: int = 8,
+                                  requests_per_minute: float = REQUESTS_PER_MINUTE):
+    """
+    Pulls new submissions and comments from many subreddits at once and counts keyword mentions.
+
+    Each subreddit's submission and comment listings are read concurrently (at most
+    `max_concurrency` at a time), paced by a token bucket that stays inside Reddit's rate
+    limit. Only items newer than the stored per-subreddit cursors are read, and the cursors
+    are saved once the pull is done, so repeated runs are incremental.
+
+    Args:
+        keywords (list): The keywords to count.
+        subreddits (list, optional): The subreddits to read. Defaults to FASHION_SUBREDDITS.
+        client (optional): An AsyncPrawClient or RecordedRedditClient. Defaults to AsyncPrawClient().
+        cursors (CursorStore, optional): Where the per-subreddit cursors live.
+        limit (int): The most items read per listing. A busier listing is caught up over the next pulls.
+        max_concurrency (int): How many listings are read at the same time.
+        requests_per_minute (float): The Reddit request budget.
+
+    Returns:
+        pandas.DataFrame: Long-format rows (`id, date, trend_keyword, source, metric_type, value, region`).
+    """
+    subreddits = subreddits or FASHION_SUBREDDITS
+    client = client or AsyncPrawClient()
+    cursors = cursors or CursorStore()
+    bucket = TokenBucket(requests_per_minute / 60.0, max(1, math.ceil(limit / PAGE_SIZE)))
+
+    print(f"Fetching Reddit data from {len(subreddits)} subreddits...")
+    try:
+        items = await _collect(client, subreddits, cursors, limit, max_concurrency, bucket)
+    finally:
+        await client.close()
+    cursors.save()
+
+    with get_metrics().span('reddit_aggregate'):
+        reddit_df = aggregate_mentions(items, keywords)
+    get_metrics().inc('rows_ingested_total', len(reddit_df), source='Reddit')
+    return reddit_df
+
+
+def fetch_reddit_data(keywords: list, subreddits: list = None, client=None, cursors: CursorStore = None, **kwargs):
+    """Synchronous wrapper around `fetch_reddit_data_async` for scripts and the collector."""
+    return asyncio.run(fetch_reddit_data_async(keywords, subreddits, client, cursors, **kwargs))
+
+
+# --- Example of how to use this function ---
+# Run from the project root with: python -m data_collection.fetch_reddit
+if __name__ == '__main__':
+    from data_collection.catalog import all_terms
+
+    reddit_data = fetch_reddit_data(all_terms())
+
+    if not reddit_data.empty:
+        print("\n--- Sample of Final Structured Data ---")
+        print(reddit_data.head())
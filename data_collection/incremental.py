@@ -0,0 +1,181 @@
+import math
+import time
+
+import pandas as pd
+
+from data_collection.scheduler import BACKGROUND, trends_request
+from data_collection.trend_cache import DEFAULT_CACHE_PATH, connect
+
+# How much already-stored history each tail request re-fetches to calibrate the new values.
+DEFAULT_OVERLAP_DAYS = 28
+# Past this gap a tail request would come back at a coarser resolution, so we re-pull the full window.
+MAX_TAIL_DAYS = 180
+
+
+class SeriesHistory:
+    """
+    Stores the full interest history of each keyword, plus its high-water mark, in SQLite.
+
+    A series is keyed by (keyword, geo, timeframe), where `timeframe` is the window that was
+    used for the first full pull. That window fixes the series' resolution (daily for
+    'today 1-m', weekly for 'today 12-m'), and every later tail is folded into that resolution.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS series_history (
+                    keyword TEXT NOT NULL,
+                    geo TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (keyword, geo, timeframe, date)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS series_watermark (
+                    keyword TEXT NOT NULL,
+                    geo TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    high_water_mark TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (keyword, geo, timeframe)
+                )
+            """)
+
+    def _connect(self):
+        return connect(self.path)
+
+    def high_water_mark(self, keyword: str, geo: str, timeframe: str):
+        """Returns the newest stored date for the series, or None if nothing is stored yet."""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT high_water_mark FROM series_watermark WHERE keyword = ? AND geo = ? AND timeframe = ?',
+                (keyword, geo, timeframe)
+            ).fetchone()
+        return pd.Timestamp(row[0]) if row else None
+
+    def load(self, keyword: str, geo: str, timeframe: str):
+        """Returns the stored series indexed by date (empty if nothing is stored yet)."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT date, value FROM series_history WHERE keyword = ? AND geo = ? AND timeframe = ? ORDER BY date',
+                (keyword, geo, timeframe)
+            ).fetchall()
+        index = pd.DatetimeIndex([row[0] for row in rows], name='date')
+        return pd.Series([row[1] for row in rows], index=index, name=keyword, dtype=float)
+
+    def save(self, keyword: str, geo: str, timeframe: str, series: pd.Series):
+        """Replaces the stored series and moves its high-water mark, in one transaction."""
+        rows = [(keyword, geo, timeframe, date.strftime('%Y-%m-%d'), float(value)) for date, value in series.items()]
+        with self._connect() as conn:
+            conn.execute(
+                'DELETE FROM series_history WHERE keyword = ? AND geo = ? AND timeframe = ?', (keyword, geo, timeframe)
+            )
+            conn.executemany('INSERT INTO series_history VALUES (?, ?, ?, ?, ?)', rows)
+            conn.execute(
+                'INSERT OR REPLACE INTO series_watermark VALUES (?, ?, ?, ?, ?)',
+                (keyword, geo, timeframe, series.index[-1].strftime('%Y-%m-%d'), time.time())
+            )
+
+
+def _step_days(index: pd.DatetimeIndex):
+    """Returns the spacing of a date index in days (1 for daily, 7 for weekly data)."""
+    if len(index) < 2:
+        return 1
+    return max(1, int(pd.Series(index).diff().dt.days.median()))
+
+
+def _fold_into_steps(tail: pd.Series, origin: pd.Timestamp, step: int):
+    """Averages a finer-grained tail into buckets of `step` days that line up with `origin`."""
+    if _step_days(tail.index) >= step:
+        return tail
+    offsets = (tail.index - origin).days // step
+    buckets = origin + pd.to_timedelta(offsets * step, unit='D')
+    return tail.groupby(buckets).mean().rename_axis('date')
+
+
+def splice_tail(history: pd.Series, tail: pd.Series):
+    """
+    Splices a freshly fetched tail onto the stored history.
+
+    Google rescales every request to its own 0-100 range, so the tail is first multiplied by
+    the ratio of the history to the tail over the dates they share. The overlapping history is
+    then replaced by the rescaled tail, and the whole series is rescaled to a maximum of 100.
+
+    Args:
+        history (pandas.Series): The stored series.
+        tail (pandas.Series): The new tail, already at the history's resolution.
+
+    Returns:
+        pandas.Series: The combined series.
+    """
+    # The newest stored point was likely still partial when it was fetched, so we skip it
+    overlap = history.index[:-1].intersection(tail.index)
+    history_total, tail_total = history[overlap].sum(), tail[overlap].sum()
+    if len(overlap) and history_total > 0 and tail_total > 0:
+        ratio = history_total / tail_total
+    else:
+        print(f"    - No usable overlap for '{history.name}'; the new tail is spliced unscaled.")
+        ratio = 1.0
+
+    combined = pd.concat([history[history.index < tail.index[0]], tail * ratio])
+    peak = combined.max()
+    if peak > 0:
+        combined = combined * (100.0 / peak)
+    return combined.round(2).rename(history.name)
+
+
+def fetch_incremental(keyword: str, timeframe: str = 'today 12-m', geo: str = '', history: SeriesHistory = None,
+                      pytrends=None, overlap_days: int = DEFAULT_OVERLAP_DAYS, priority: int = BACKGROUND):
+    """
+    Brings a keyword's stored history up to date by fetching only a short overlapping tail.
+
+    The first call pulls the full `timeframe` window. Later calls request just the window
+    from `overlap_days` before the high-water mark to today, fold it into the history's
+    resolution and splice it on (see `splice_tail`), so the history keeps growing past the
+    original window without wider queries.
+
+    Args:
+        keyword (str): The keyword to search.
+        timeframe (str): The window for the first full pull; it also fixes the resolution.
+        geo (str): The Google Trends geo code ('' for worldwide).
+        history (SeriesHistory, optional): Where the history lives. Defaults to the shared cache file.
+        pytrends (TrendReq, optional): An existing session to reuse.
+        overlap_days (int): How far before the high-water mark the tail request starts.
+        priority (int): The scheduler priority of the upstream requests.
+
+    Returns:
+        pandas.DataFrame: The full history indexed by date with one column named after the keyword,
+                          or an empty DataFrame if Google has no data for it.
+    """
+    history = history or SeriesHistory()
+    if pytrends is None:
+        # Local import: fetch_google builds on this module
+        from data_collection.fetch_google import LazyTrendReq
+        pytrends = LazyTrendReq()
+    mark = history.high_water_mark(keyword, geo, timeframe)
+    today = pd.Timestamp.today().normalize()
+    stored = history.load(keyword, geo, timeframe) if mark is not None else None
+
+    if stored is not None and len(stored) and (today - mark).days <= MAX_TAIL_DAYS:
+        step = _step_days(stored.index)
+        start = mark - pd.Timedelta(days=math.ceil(overlap_days / step) * step)
+        tail_timeframe = f"{start:%Y-%m-%d} {today:%Y-%m-%d}"
+        print(f"    - Fetching tail {tail_timeframe} for '{keyword}'")
+        tail_df = trends_request(pytrends, [keyword], 'interest_over_time', tail_timeframe, geo, priority=priority)
+        if tail_df.empty:
+            return stored.to_frame()
+        tail = _fold_into_steps(tail_df[keyword].astype(float), start, step)
+        series = splice_tail(stored, tail)
+    else:
+        interest_df = trends_request(pytrends, [keyword], 'interest_over_time', timeframe, geo, priority=priority)
+        if interest_df.empty:
+            return pd.DataFrame()
+        series = interest_df[keyword].astype(float)
+
+    history.save(keyword, geo, timeframe, series)
+    return series.to_frame()
@@ -0,0 +1,107 @@
+import re
+import unicodedata
+from collections import Counter
+
+from data_collection.catalog import plural_terms
+
+# Words are runs of letters and digits; everything else (spaces, punctuation, emoji) separates them.
+_WORD_RE = re.compile(r'[^\W_]+')
+
+# Other ways people write catalog terms. Accents and case are already handled by normalization.
+DEFAULT_ALIASES = {
+    "Y2K Fashion": ["Y2K", "Y2K style", "Y2K aesthetic"],
+    "Old Money Aesthetic": ["old money", "old money style"],
+    "Quiet Luxury": ["stealth wealth"],
+    "New Balance 550": ["NB 550", "NB550", "New Balance 550s"],
+    "Patek Philippe": ["Patek"],
+    "Audemars Piguet": ["Audemars"],
+    "Classic Menswear": ["classic mens wear"],
+    "Balletcore": ["ballet core"],
+    "Cottagecore": ["cottage core"],
+    "Gorpcore": ["gorp core"],
+}
+
+
+def tokenize(text: str):
+    """
+    Normalizes text and splits it into words.
+
+    Accents are stripped (NFKD, then combining marks dropped), case is folded, and anything
+    that isn't a letter or digit separates words, so "Aimé Leon-Dore" becomes
+    ['aime', 'leon', 'dore'].
+    """
+    if not text:
+        return []
+    if not text.isascii():
+        text = ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+    return _WORD_RE.findall(text.casefold())
+
+
+class KeywordMatcher:
+    """
+    Finds every catalog term mentioned in a document in a single pass.
+
+    All terms and their aliases are compiled once into a trie over normalized words. Matching
+    walks the trie from each word of the document, so the cost depends on the document length
+    (times the length of the longest term, a few words), not on how many terms there are.
+    Matches always fall on word boundaries: "Beige" matches "beige blazer" but not "beiged".
+
+    Args:
+        terms (list): The canonical terms to look for.
+        aliases (dict, optional): Maps a canonical term to alternative spellings. Defaults to
+                                  DEFAULT_ALIASES (entries for terms not in `terms` are ignored).
+        plurals (list, optional): The terms that also match with an 's' added to their last word.
+                                  Defaults to the catalog's generic items (see `plural_terms`), so
+                                  "tote bags" counts for "Tote Bag" but "jeans" never counts for
+                                  the brand "With Jean". Pass an empty list to match exact spellings only.
+    """
+
+    def __init__(self, terms: list, aliases: dict = None, plurals: list = None):
+        self.terms = list(dict.fromkeys(terms))
+        aliases = DEFAULT_ALIASES if aliases is None else aliases
+        plurals = set(plural_terms() if plurals is None else plurals)
+        self._root = {}
+
+        for term in self.terms:
+            for spelling in [term] + list(aliases.get(term, [])):
+                words = tokenize(spelling)
+                if not words:
+                    continue
+                self._add(words, term)
+                if term in plurals and not words[-1].endswith('s') and not words[-1].isdigit():
+                    self._add(words[:-1] + [words[-1] + 's'], term)
+
+    def _add(self, words: list, term: str):
+        node = self._root
+        for word in words:
+            node = node.setdefault(word, {})
+        # The None key marks the end of a spelling and holds its canonical term
+        node[None] = term
+
+    def find(self, text: str):
+        """Returns the canonical terms mentioned in the text, in order of first mention."""
+        words = tokenize(text)
+        root = self._root
+        found = {}
+        for start in range(len(words)):
+            node = root.get(words[start])
+            position = start + 1
+            while node is not None:
+                term = node.get(None)
+                if term is not None:
+                    found[term] = True
+                node = node.get(words[position]) if position < len(words) else None
+                position += 1
+        return list(found)
+
+    def tag(self, documents):
+        """Yields the list of matched terms for each document."""
+        for document in documents:
+            yield self.find(document)
+
+    def count(self, documents):
+        """Counts how many documents mention each term (a document counts once per term)."""
+        counts = Counter()
+        for terms in self.tag(documents):
+            counts.update(terms)
+        return counts
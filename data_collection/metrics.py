@@ -0,0 +1,200 @@
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# How many recent durations each span keeps for its p50/p99.
+SPAN_WINDOW = 1024
+DEFAULT_METRICS_PORT = int(os.environ.get('TRENDS_METRICS_PORT', '9108'))
+
+
+def _label_key(labels: dict):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: tuple, extra: tuple = ()):
+    pairs = key + extra
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+
+class Metrics:
+    """
+    A small, thread-safe registry of counters and timing spans.
+
+    Counters are monotonically increasing totals such as cache hits or upstream requests by
+    status. Spans time a stage of work; each (name, labels) keeps its count, total and
+    maximum, plus the most recent durations for percentiles. Gauges are read on export from
+    registered callables, which is how existing `stats` dicts (the request scheduler's,
+    SingleFlight's) show up without being copied.
+
+    Everything can be exported as Prometheus text (`to_prometheus`) or as a dict
+    (`snapshot`, `write_json`).
+    """
+
+    def __init__(self, span_window: int = SPAN_WINDOW):
+        self.span_window = span_window
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._spans = {}
+        self._gauges = {}
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Adds `amount` to the counter with these labels."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Records one duration of the span with these labels."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            span = self._spans.get(key)
+            if span is None:
+                span = self._spans[key] = {'count': 0, 'sum': 0.0, 'max': 0.0,
+                                           'recent': deque(maxlen=self.span_window)}
+            span['count'] += 1
+            span['sum'] += seconds
+            span['max'] = max(span['max'], seconds)
+            span['recent'].append(seconds)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **labels):
+        """Times the block as one observation of the span; a block that raises is recorded with `error="true"`."""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.observe(name, time.perf_counter() - start, error='true', **labels)
+            raise
+        self.observe(name, time.perf_counter() - start, **labels)
+
+    def register_gauges(self, prefix: str, read):
+        """Exports every numeric value of the dict returned by `read()` as a gauge named `<prefix>_<key>`."""
+        with self._lock:
+            self._gauges[prefix] = read
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._spans.clear()
+
+    def snapshot(self):
+        """Returns every counter, span and gauge as plain JSON-friendly data."""
+        with self._lock:
+            counters = list(self._counters.items())
+            spans = [(key, dict(span, recent=np.array(span['recent']))) for key, span in self._spans.items()]
+            gauges = list(self._gauges.items())
+
+        result = {'timestamp': time.time(), 'counters': [], 'spans': [], 'gauges': []}
+        for (name, labels), value in counters:
+            result['counters'].append({'name': name, 'labels': dict(labels), 'value': value})
+        for (name, labels), span in spans:
+            recent = span['recent']
+            result['spans'].append({
+                'name': name,
+                'labels': dict(labels),
+                'count': span['count'],
+                'sum_seconds': span['sum'],
+                'mean_ms': span['sum'] / span['count'] * 1000,
+                'max_ms': span['max'] * 1000,
+                'p50_ms': float(np.percentile(recent, 50)) * 1000,
+                'p99_ms': float(np.percentile(recent, 99)) * 1000,
+            })
+        for prefix, read in gauges:
+            try:
+                values = read()
+            except Exception:
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)):
+                    result['gauges'].append({'name': f'{prefix}_{key}', 'labels': {}, 'value': value})
+        return result
+
+    def to_prometheus(self, namespace: str = 'trends'):
+        """Renders the metrics in the Prometheus text exposition format."""
+        data = self.snapshot()
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f'# TYPE {name} {kind}')
+
+        for counter in sorted(data['counters'], key=lambda item: item['name']):
+            name = f"{namespace}_{counter['name']}"
+            header(name, 'counter')
+            lines.append(f"{name}{_format_labels(_label_key(counter['labels']))} {counter['value']}")
+        for span in sorted(data['spans'], key=lambda item: item['name']):
+            name = f"{namespace}_{span['name']}_seconds"
+            header(name, 'summary')
+            labels = _label_key(span['labels'])
+            for quantile, value in (('0.5', span['p50_ms']), ('0.99', span['p99_ms'])):
+                lines.append(f"{name}{_format_labels(labels, (('quantile', quantile),))} {value / 1000:.6f}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {span['sum_seconds']:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {span['count']}")
+        for gauge in sorted(data['gauges'], key=lambda item: item['name']):
+            name = f"{namespace}_{gauge['name']}"
+            header(name, 'gauge')
+            lines.append(f"{name} {gauge['value']}")
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self, path: str):
+        """Writes the snapshot to a JSON file through a temporary name, so readers never see half a file."""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(temp_path, path)
+
+
+_default_metrics = Metrics()
+
+
+def get_metrics():
+    """Returns the process-wide metrics registry every module records into."""
+    return _default_metrics
+
+
+def serve_metrics(port: int = DEFAULT_METRICS_PORT, host: str = '127.0.0.1', metrics: Metrics = None):
+    """
+    Serves the metrics over HTTP from a background thread.
+
+    `/metrics` returns Prometheus text and `/metrics.json` the JSON snapshot. The server only
+    listens on localhost unless another `host` is given.
+
+    Returns:
+        ThreadingHTTPServer: The running server (call `shutdown()` to stop it).
+    """
+    metrics = metrics or get_metrics()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = metrics.to_prometheus().encode(), 'text/plain; version=0.0.4'
+            elif self.path == '/metrics.json':
+                body, content_type = json.dumps(metrics.snapshot()).encode(), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes every few seconds would flood the console
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving metrics on http://{host}:{server.server_port}/metrics")
+    return server
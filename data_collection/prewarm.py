@@ -0,0 +1,212 @@
+import argparse
+import time
+
+from analysis.snapshots import SnapshotStore, build_snapshot, prepare_frames
+from data_collection.catalog import all_terms
+from data_collection.fetch_google import REGION_GEO, fetch_google_trends_data
+from data_collection.metrics import DEFAULT_METRICS_PORT, get_metrics, serve_metrics
+from data_collection.regions import RegionMatrix, refresh_region_matrix
+from data_collection.trend_cache import TrendCache
+from data_collection.trend_store import TrendStore
+
+# --- CONFIGURATION ---
+# The window the dashboard analyzes; cache entries only help it under this key.
+TIMEFRAME = 'today 12-m'
+# Entries that expire within this many seconds are refreshed.
+DEFAULT_REFRESH_AHEAD = 600
+# How long the collector sleeps at most between passes.
+DEFAULT_INTERVAL = 300
+# Terms refreshed per fetch call, so progress is written to the cache as we go.
+DEFAULT_BATCH_SIZE = 10
+# A term whose refresh fails is retried after this many seconds, doubling per failure up to the maximum.
+RETRY_BACKOFF = 60
+MAX_RETRY_BACKOFF = 6 * 3600
+
+
+def _expires_at(term: str, cache: TrendCache):
+    """Returns when a term's dashboard series expires; 0 if it is missing. Regions come from the region matrix."""
+    return cache.expiry(term, TIMEFRAME, '', 'TIME') or 0.0
+
+
+def _next_attempt(term: str, cache: TrendCache, refresh_ahead: float, failures: dict):
+    """Returns when a term is next due: `refresh_ahead` before it expires, but not before its failure backoff ends."""
+    return max(_expires_at(term, cache) - refresh_ahead, failures.get(term, (0, 0.0))[1])
+
+
+def due_terms(terms: list, cache: TrendCache, refresh_ahead: float = DEFAULT_REFRESH_AHEAD, failures: dict = None):
+    """
+    Returns the terms whose entries expire within `refresh_ahead` seconds, stalest first.
+
+    Terms in `failures` (see `record_failures`) are left out until their backoff has passed.
+    """
+    now = time.time()
+    failures = failures or {}
+    expiries = {term: _expires_at(term, cache) for term in terms}
+    due = [term for term in terms if _next_attempt(term, cache, refresh_ahead, failures) <= now]
+    return sorted(due, key=expiries.get)
+
+
+def record_failures(terms: list, previous_expiries: dict, cache: TrendCache, failures: dict):
+    """
+    Backs off the terms whose cache entry a refresh did not rewrite, and clears the ones it did.
+
+    A failed term is retried after RETRY_BACKOFF seconds, doubling with every further
+    failure up to MAX_RETRY_BACKOFF, so a term Google keeps rejecting costs a request every
+    few hours instead of one per loop.
+
+    Args:
+        terms (list): The terms that were just refreshed.
+        previous_expiries (dict): Each term's expiry before the refresh.
+        cache (TrendCache): The shared cache.
+        failures (dict): Maps failing terms to (consecutive failures, earliest next attempt); updated in place.
+    """
+    now = time.time()
+    for term in terms:
+        if _expires_at(term, cache) > previous_expiries.get(term, 0.0):
+            failures.pop(term, None)
+            continue
+        count = failures.get(term, (0, 0.0))[0] + 1
+        delay = min(MAX_RETRY_BACKOFF, RETRY_BACKOFF * 2 ** (count - 1))
+        failures[term] = (count, now + delay)
+        print(f"  - Refreshing '{term}' failed {count} time(s) in a row; retrying in {delay:.0f}s.")
+
+
+def materialize_snapshots(terms: list, cache: TrendCache, snapshots: SnapshotStore, regions: RegionMatrix = None):
+    """
+    Rebuilds the analysis snapshot of every term whose cached series is newer than its snapshot.
+
+    Snapshots are built only from what is already cached and from the region matrix, so
+    this never calls Google. Each snapshot expires together with the series it was built from.
+
+    Returns:
+        list: The terms whose snapshots were rebuilt.
+    """
+    built = []
+    for term in terms:
+        expires_at = _expires_at(term, cache)
+        if expires_at <= time.time() or (snapshots.expiry(term) or 0.0) >= expires_at:
+            continue
+        interest_df = cache.get(term, TIMEFRAME, '', 'TIME')
+        if regions is not None and term in regions:
+            region_df = regions.keyword_frame(term)
+        else:
+            region_df = cache.get(term, TIMEFRAME, REGION_GEO, 'REGION')
+        if interest_df is None or interest_df.empty:
+            continue
+        interest_df, region_df = prepare_frames(term, interest_df, region_df)
+        snapshots.put(build_snapshot(term, interest_df, region_df), expires_at=expires_at)
+        built.append(term)
+    if built:
+        print(f"Materialized {len(built)} analysis snapshots.")
+    return built
+
+
+@get_metrics().span('prewarm_pass')
+def prewarm_once(terms: list = None, cache: TrendCache = None, refresh_ahead: float = DEFAULT_REFRESH_AHEAD,
+                 batch_size: int = DEFAULT_BATCH_SIZE, store: TrendStore = None, snapshots: SnapshotStore = None,
+                 failures: dict = None):
+    """
+    Refreshes every catalog term whose dashboard entries are missing or about to expire.
+
+    Terms are refreshed stalest first, `batch_size` at a time, through
+    `fetch_google_trends_data` with incremental series and a forced refresh, so the
+    dashboard finds a fresh entry for them in the shared trend cache. Regional data comes
+    from the region matrix, rebuilt in batched payloads once it is a day old. Each refreshed
+    batch is then materialized into analysis snapshots the dashboard renders from directly.
+
+    Args:
+        terms (list, optional): The terms to keep warm. Defaults to the whole catalog.
+        cache (TrendCache, optional): The shared cache. Defaults to the standard cache file.
+        refresh_ahead (float): Refresh entries that expire within this many seconds.
+        batch_size (int): How many terms each fetch call covers.
+        store (TrendStore, optional): Also upsert the fetched rows into this columnar store.
+        snapshots (SnapshotStore, optional): Where snapshots are written. Defaults to the standard cache file.
+        failures (dict, optional): Failure backoff state kept between passes (see `record_failures`).
+
+    Returns:
+        list: The terms that were refreshed.
+    """
+    cache = cache or TrendCache()
+    snapshots = snapshots or SnapshotStore(cache.path)
+    terms = terms or all_terms()
+    started = time.time()
+    regions = refresh_region_matrix(terms, cache=cache)
+    if store is not None and regions.meta.get('built_at', 0) >= started:
+        # Only a matrix rebuilt in this pass has new rows for the store
+        store.upsert(regions.to_long())
+
+    failures = {} if failures is None else failures
+    due = due_terms(terms, cache, refresh_ahead, failures)
+    print(f"{len(due)} terms due for a refresh.")
+
+    for i in range(0, len(due), batch_size):
+        batch = due[i:i + batch_size]
+        previous_expiries = {term: _expires_at(term, cache) for term in batch}
+        trends_df = fetch_google_trends_data(batch, timeframe=TIMEFRAME, incremental=True, refresh=True, cache=cache)
+        record_failures(batch, previous_expiries, cache, failures)
+        if store is not None and not trends_df.empty:
+            store.upsert(trends_df)
+        materialize_snapshots(batch, cache, snapshots, regions)
+
+    # Terms that were fresh already but have no current snapshot (e.g. after a version bump)
+    materialize_snapshots([term for term in terms if term not in due], cache, snapshots, regions)
+    return due
+
+
+def run_forever(terms: list = None, interval: float = DEFAULT_INTERVAL, refresh_ahead: float = DEFAULT_REFRESH_AHEAD,
+                batch_size: int = DEFAULT_BATCH_SIZE, store: TrendStore = None, metrics_file: str = None):
+    """
+    Keeps the catalog warm, sleeping until the next entry is due (at most `interval` seconds).
+
+    With `metrics_file`, the collector's metrics are written there as JSON after every pass.
+    """
+    cache = TrendCache()
+    snapshots = SnapshotStore(cache.path)
+    terms = terms or all_terms()
+    failures = {}
+
+    while True:
+        prewarm_once(terms, cache, refresh_ahead, batch_size, store, snapshots, failures)
+        if metrics_file:
+            get_metrics().write_json(metrics_file)
+        next_attempt = min(_next_attempt(term, cache, refresh_ahead, failures) for term in terms)
+        sleep_for = min(interval, max(1.0, next_attempt - time.time()))
+        print(f"Sleeping {sleep_for:.0f}s until the next refresh is due.")
+        time.sleep(sleep_for)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keeps the dashboard's trend cache warm for every catalog term.")
+    parser.add_argument('--once', action='store_true', help="Run a single pass and exit.")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help="Longest sleep between passes, in seconds.")
+    parser.add_argument('--refresh-ahead', type=float, default=DEFAULT_REFRESH_AHEAD,
+                        help="Refresh entries that expire within this many seconds.")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Terms per fetch call.")
+    parser.add_argument('--no-store', action='store_true', help="Don't write fetched rows to the columnar trend store.")
+    parser.add_argument('--metrics-port', type=int, nargs='?', const=DEFAULT_METRICS_PORT,
+                        help=f"Serve Prometheus metrics on this local port (default {DEFAULT_METRICS_PORT}).")
+    parser.add_argument('--metrics-file', help="Write the collector's metrics to this JSON file after every pass.")
+    parser.add_argument('terms', nargs='*', help="Terms to keep warm (defaults to the whole catalog).")
+    args = parser.parse_args()
+
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+
+    store = None
+    if not args.no_store:
+        try:
+            store = TrendStore()
+        except ImportError as e:
+            print(f"Not writing to the trend store: {e}")
+
+    if args.once:
+        prewarm_once(args.terms or None, refresh_ahead=args.refresh_ahead, batch_size=args.batch_size, store=store)
+        if args.metrics_file:
+            get_metrics().write_json(args.metrics_file)
+    else:
+        run_forever(args.terms or None, args.interval, args.refresh_ahead, args.batch_size, store, args.metrics_file)
+
+
+# Run from the project root with: python -m data_collection.prewarm
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_collection.catalog import all_terms
+from data_collection.fetch_google import REGION_GEO, LazyTrendReq, _chunk_keywords, fetch_interest_by_region
+from data_collection.metrics import get_metrics
+from data_collection.scheduler import BACKGROUND, RateLimitedError, trends_request
+from data_collection.trend_cache import TrendCache
+
+# --- CONFIGURATION ---
+DEFAULT_REGION_DIR = os.environ.get(
+    'TREND_REGION_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+)
+TIMEFRAME = 'today 12-m'
+# Regional breakdowns move slowly, so the collector rebuilds the matrix about once a day.
+DEFAULT_MAX_AGE = 24 * 3600
+# How many entries each precomputed ranking keeps; longer queries are sorted on the fly.
+INDEX_DEPTH = 25
+
+
+def region_matrix_path(geo: str = REGION_GEO, resolution: str = 'REGION', directory: str = DEFAULT_REGION_DIR):
+    return os.path.join(directory, f'region_matrix_{geo or "world"}_{resolution.lower()}.npz')
+
+
+def _nan_last_order(values: np.ndarray, axis: int):
+    """Argsorts descending along `axis`, with missing values at the end."""
+    return np.argsort(np.where(np.isnan(values), -np.inf, -values), axis=axis, kind='stable')
+
+
+class RegionMatrix:
+    """
+    A keyword x region matrix of interest, with its rankings precomputed for in-memory queries.
+
+    Values share one scale: in every batched payload each keyword's regional value is
+    divided by the anchor's value in the same region, and that ratio is multiplied by the
+    anchor's own single-term breakdown. Keywords from different payloads can then be ranked
+    against each other within a region, and each row still reads as the keyword's own
+    regional profile.
+
+    Two inverse indexes are built once, when the matrix is created or loaded:
+
+    - for every region, its keywords ordered by interest ("top keywords in Texas");
+    - for every keyword, its regions ordered by location quotient: the keyword's share of
+      all catalog interest in that region divided by its share nationally. A quotient above
+      1 means the keyword over-indexes there. The anchor cancels out of the regional share.
+
+    Queries up to INDEX_DEPTH results are then array lookups.
+
+    Args:
+        keywords (list): The row labels.
+        regions (list): The region names (column labels).
+        values (numpy.ndarray): A (keywords x regions) array, NaN where there is no value.
+        codes (list, optional): Region codes ('US-CA', DMA numbers), aligned with `regions`.
+        meta (dict, optional): How the matrix was built (geo, resolution, timeframe, anchor, built_at).
+    """
+
+    def __init__(self, keywords: list, regions: list, values: np.ndarray, codes: list = None, meta: dict = None):
+        self.keywords = list(keywords)
+        self.regions = list(regions)
+        self.codes = list(codes) if codes is not None else list(regions)
+        self.values = np.asarray(values, dtype=np.float32)
+        self.meta = meta or {}
+        self._keyword_index = {keyword: i for i, keyword in enumerate(self.keywords)}
+        self._region_index = {region: j for j, region in enumerate(self.regions)}
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            regional_share = self.values / np.nansum(self.values, axis=0, keepdims=True)
+            national_share = np.nansum(self.values, axis=1, keepdims=True) / np.nansum(self.values)
+            self.location_quotient = (regional_share / national_share).astype(np.float32)
+
+        self._top_keywords = _nan_last_order(self.values, axis=0)[:INDEX_DEPTH].T
+        self._over_indexed = _nan_last_order(self.location_quotient, axis=1)[:, :INDEX_DEPTH]
+
+    def __contains__(self, keyword):
+        return keyword in self._keyword_index
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def top_keywords(self, region: str, n: int = 10):
+        """Returns the region's `n` highest-interest keywords as (keyword, value) pairs."""
+        j = self._region_index[region]
+        column = self.values[:, j]
+        order = self._top_keywords[j] if n <= INDEX_DEPTH else _nan_last_order(column, axis=0)
+        return [(self.keywords[i], float(column[i])) for i in order[:n] if not np.isnan(column[i])]
+
+    def over_indexing_regions(self, keyword: str, n: int = 10, min_quotient: float = 1.0):
+        """Returns up to `n` regions where the keyword over-indexes, as (region, location quotient) pairs."""
+        i = self._keyword_index[keyword]
+        row = self.location_quotient[i]
+        order = self._over_indexed[i] if n <= INDEX_DEPTH else _nan_last_order(row, axis=0)
+        return [(self.regions[j], float(row[j])) for j in order[:n] if row[j] >= min_quotient]
+
+    def keyword_frame(self, keyword: str):
+        """
+        Returns one keyword's regional interest shaped like an `interest_by_region` frame.
+
+        The column is rescaled so its highest region is 100, like a single-keyword breakdown,
+        and sorted highest first, so `head(n)` gives the top regions. A 'geoCode' column
+        carries the region codes for maps.
+        """
+        row = self.values[self._keyword_index[keyword]].astype(float)
+        peak = np.nanmax(row) if np.isfinite(row).any() else 0.0
+        scaled = np.round(row * (100.0 / peak), 2) if peak > 0 else row
+        frame = pd.DataFrame({'geoCode': self.codes, keyword: scaled},
+                             index=pd.Index(self.regions, name='geoName'))
+        return frame.dropna(subset=[keyword]).sort_values(keyword, ascending=False, kind='stable')
+
+    def merge(self, other: 'RegionMatrix'):
+        """
+        Returns a matrix with the rows of both, `other`'s rows winning for keywords in both.
+
+        Both must be built against the same anchor, so their values share a scale. Regions
+        are aligned by name, and the result takes `other`'s metadata.
+        """
+        if not len(other):
+            return self
+        mine = pd.DataFrame(self.values, index=self.keywords, columns=self.regions)
+        theirs = pd.DataFrame(other.values, index=other.keywords, columns=other.regions)
+        wide = pd.concat([mine.drop(index=other.keywords, errors='ignore'), theirs])
+        codes = dict(zip(self.regions, self.codes)) | dict(zip(other.regions, other.codes))
+        return RegionMatrix(wide.index, wide.columns, wide.to_numpy(dtype=float),
+                            [codes[region] for region in wide.columns], dict(other.meta))
+
+    def to_long(self):
+        """Returns every keyword's rescaled regional interest as long-format 'regional_interest' rows, dated today."""
+        frames = []
+        for keyword in self.keywords:
+            frame = self.keyword_frame(keyword)
+            frames.append(pd.DataFrame({'trend_keyword': keyword, 'value': frame[keyword].to_numpy(),
+                                        'region': frame.index.to_numpy()}))
+        long_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['trend_keyword', 'value', 'region'])
+        long_df.insert(0, 'date', pd.Timestamp.today().normalize())
+        long_df['source'] = 'Google Trends'
+        long_df['metric_type'] = 'regional_interest'
+        long_df.insert(0, 'id', range(len(long_df)))
+        return long_df[['id', 'date', 'trend_keyword', 'source', 'metric_type', 'value', 'region']]
+
+    def save(self, path: str):
+        """Writes the matrix as a compressed .npz through a temporary file."""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + '.tmp.npz'
+        np.savez_compressed(temp_path, keywords=np.array(self.keywords, dtype=str),
+                            regions=np.array(self.regions, dtype=str), codes=np.array(self.codes, dtype=str),
+                            values=self.values, meta=np.array(json.dumps(self.meta)))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            return cls(data['keywords'].tolist(), data['regions'].tolist(), data['values'],
+                       data['codes'].tolist(), json.loads(str(data['meta'])))
+
+
+def _region_columns(region_df: pd.DataFrame, keywords: list):
+    """Splits an interest_by_region frame into its keyword values and its region codes."""
+    codes = region_df['geoCode'] if 'geoCode' in region_df.columns else pd.Series(region_df.index, index=region_df.index)
+    return region_df[[keyword for keyword in keywords if keyword in region_df.columns]].astype(float), codes
+
+
+def fetch_regions_batched(keywords: list, anchor: str = None, timeframe: str = TIMEFRAME, geo: str = REGION_GEO,
+                          resolution: str = 'REGION', cache: TrendCache = None, pytrends=None,
+                          priority: int = BACKGROUND):
+    """
+    Fetches regional interest for many keywords in shared-anchor payloads of five terms.
+
+    Every payload's values are divided by the anchor's value in the same region. These
+    ratios are cached per keyword under the resolution '<resolution>@<anchor>', so a rebuild
+    only sends the keywords without a fresh entry. The matrix multiplies them by the anchor's
+    own breakdown, fetched (and cached) as a single-term payload.
+
+    Args:
+        keywords (list): The keywords to break down.
+        anchor (str, optional): The term shared by every payload. Defaults to the first keyword;
+                                a broad term searched everywhere keeps the fewest regions empty.
+        timeframe (str): The Google Trends timeframe to query.
+        geo (str): The area to break down, e.g. 'US'.
+        resolution (str): 'REGION' (states), 'DMA' (metro areas) or 'CITY'.
+        cache (TrendCache, optional): The cache to read through.
+        pytrends (TrendReq, optional): An existing session to reuse.
+        priority (int): The scheduler priority of the upstream requests.
+
+    Returns:
+        RegionMatrix: One row per keyword that had data; empty if the anchor's breakdown is rate limited.
+    """
+    anchor = anchor or keywords[0]
+    pytrends = pytrends or LazyTrendReq()
+    try:
+        profile = fetch_interest_by_region(anchor, timeframe, geo, resolution, cache=cache, pytrends=pytrends,
+                                           priority=priority)
+    except RateLimitedError as e:
+        print(f"    - Skipping the region matrix, no breakdown for the anchor '{anchor}': {e}")
+        return RegionMatrix([], [], np.empty((0, 0)))
+    cache_resolution = f'{resolution}@{anchor}'
+    series, codes = {}, None
+
+    for keyword in dict.fromkeys([anchor] + keywords):
+        cached = cache.get(keyword, timeframe, geo, cache_resolution) if cache is not None else None
+        if cached is not None:
+            series[keyword] = cached[keyword]
+            codes = cached['geoCode'] if codes is None else codes
+
+    missing = [keyword for keyword in keywords if keyword not in series]
+    for group in _chunk_keywords(missing, anchor) if missing else []:
+        try:
+            region_df = trends_request(pytrends, group, 'interest_by_region', timeframe, geo, priority=priority,
+                                       resolution=resolution, inc_low_vol=True, inc_geo_code=True)
+        except RateLimitedError as e:
+            print(f"    - Skipping regions for batch {group}: {e}")
+            continue
+        values, group_codes = _region_columns(region_df, group)
+        if anchor not in values.columns:
+            continue
+        ratios = values.div(values[anchor].where(values[anchor] > 0), axis=0)
+        codes = group_codes if codes is None else codes
+        for keyword in ratios.columns:
+            # The anchor is 1 wherever it has interest; keep its first entry
+            if keyword in series:
+                continue
+            series[keyword] = ratios[keyword]
+            if cache is not None:
+                cache.put(keyword, timeframe, geo, cache_resolution,
+                          pd.DataFrame({keyword: ratios[keyword], 'geoCode': group_codes}))
+
+    found = [keyword for keyword in keywords if keyword in series]
+    if not found:
+        return RegionMatrix([], [], np.empty((0, 0)))
+    wide = pd.concat([series[keyword] for keyword in found], axis=1)
+    if anchor in profile.columns:
+        wide = wide.mul(profile[anchor].astype(float).reindex(wide.index), axis=0)
+    wide = wide.dropna(axis=1, how='all')
+    meta = {'geo': geo, 'resolution': resolution, 'timeframe': timeframe, 'anchor': anchor, 'built_at': time.time()}
+    return RegionMatrix(wide.columns, wide.index, wide.to_numpy(dtype=float).T,
+                        codes.reindex(wide.index).astype(str).tolist(), meta)
+
+
+@get_metrics().span('region_matrix_build')
+def refresh_region_matrix(terms: list = None, geo: str = REGION_GEO, resolution: str = 'REGION',
+                          max_age: float = DEFAULT_MAX_AGE, anchor: str = None, cache: TrendCache = None,
+                          path: str = None, pytrends=None):
+    """
+    Rebuilds and saves the region matrix if the saved one is missing, too old or lacks terms.
+
+    The saved matrix is shared, so its other keywords are never dropped. While it is fresh,
+    only the missing terms are fetched and merged in; once it is too old, its keywords are
+    rebuilt together with `terms`. Unless another `anchor` is given, the saved matrix's
+    anchor is reused so the rows stay on one scale.
+
+    Returns:
+        RegionMatrix: The current matrix, covering `terms` and every keyword it held before.
+    """
+    terms = terms or all_terms()
+    path = path or region_matrix_path(geo, resolution)
+    saved = RegionMatrix.load(path) if os.path.exists(path) else None
+    if saved is not None and anchor in (None, saved.meta.get('anchor')):
+        anchor = saved.meta.get('anchor')
+        fresh = time.time() - saved.meta.get('built_at', 0) < max_age
+        missing = [term for term in terms if term not in saved]
+        if fresh and not missing:
+            return saved
+        if fresh:
+            print(f"Adding {len(missing)} terms to the {geo} {resolution} matrix...")
+            added = fetch_regions_batched(missing, anchor, geo=geo, resolution=resolution,
+                                          cache=cache or TrendCache(), pytrends=pytrends)
+            matrix = saved.merge(added)
+            # The matrix is as old as its oldest rows
+            matrix.meta['built_at'] = saved.meta.get('built_at', 0)
+            if len(added):
+                matrix.save(path)
+            return matrix
+    if saved is not None:
+        terms = list(dict.fromkeys(saved.keywords + list(terms)))
+
+    print(f"Building the {geo} {resolution} matrix for {len(terms)} terms...")
+    matrix = fetch_regions_batched(terms, anchor, geo=geo, resolution=resolution, cache=cache or TrendCache(),
+                                   pytrends=pytrends)
+    if len(matrix):
+        matrix.save(path)
+    return matrix if len(matrix) or saved is None else saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Builds the keyword x region interest matrix for the catalog.")
+    parser.add_argument('--geo', default=REGION_GEO, help="The area to break down.")
+    parser.add_argument('--resolution', default='REGION', choices=['REGION', 'DMA', 'CITY'], help="Region level.")
+    parser.add_argument('--anchor', help="The term shared by every payload (defaults to the first term).")
+    parser.add_argument('--force', action='store_true', help="Rebuild even if the saved matrix is fresh.")
+    parser.add_argument('terms', nargs='*', help="Terms to include (defaults to the whole catalog).")
+    args = parser.parse_args()
+
+    matrix = refresh_region_matrix(args.terms or None, args.geo, args.resolution,
+                                   max_age=0 if args.force else DEFAULT_MAX_AGE, anchor=args.anchor)
+    if len(matrix) and matrix.regions:
+        region = matrix.regions[0]
+        print(f"\n--- Top terms in {region} ---")
+        for keyword, value in matrix.top_keywords(region, 5):
+            print(f"  {keyword}: {value:.2f}")
+
+
+# Run from the project root with: python -m data_collection.regions
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from data_collection.metrics import get_metrics
+
+# --- Priorities (lower runs first) ---
+INTERACTIVE = 0
+BACKGROUND = 10
+
+# --- Default limits, overridable through the environment ---
+DEFAULT_RATE = float(os.environ.get('TRENDS_RATE_PER_SECOND', '1.0'))
+DEFAULT_BURST = int(os.environ.get('TRENDS_BURST', '5'))
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# Tokens one trends_request takes: building the payload is a request of its own, then the query.
+CALL_COST = 2
+
+
+class RateLimitedError(Exception):
+    """Raised when an upstream call still fails after its retries, or the retry budget is spent."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def status_of(exc: Exception):
+    """Returns the HTTP status behind a pytrends/requests error, or None if there is none."""
+    response = getattr(exc, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status is None and type(exc).__name__ == 'TooManyRequestsError':
+        status = 429
+    return status
+
+
+def is_retryable(exc: Exception):
+    """Rate limits, server errors and dropped connections are worth retrying; anything else is not."""
+    status = status_of(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    return isinstance(exc, (OSError, TimeoutError))
+
+
+class TokenBucket:
+    """
+    A token bucket that refills at `rate` tokens per second up to `capacity` tokens.
+
+    `pause` empties the bucket and blocks refills for a while, which is how a 429 response
+    slows every caller down at once rather than just the request that hit it. Asking for
+    more tokens than the bucket holds raises ValueError, since it could never be paid in full.
+    """
+
+    def __init__(self, rate: float, capacity: int, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _check_cost(self, cost: float):
+        if cost > self.capacity:
+            raise ValueError(f"A cost of {cost} tokens can never be paid from a bucket of capacity {self.capacity}.")
+
+    def _refill(self, now):
+        start = max(self.updated, self.paused_until)
+        if now > start:
+            self.tokens = min(self.capacity, self.tokens + (now - start) * self.rate)
+        self.updated = max(now, self.updated)
+
+    def wait_time(self, cost: float = 1):
+        """Returns how many seconds until `cost` tokens are available (0 if they are now)."""
+        self._check_cost(cost)
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            pause = max(0.0, self.paused_until - now)
+            return pause + max(0.0, cost - self.tokens) / self.rate
+
+    def try_acquire(self, cost: float = 1):
+        """Takes `cost` tokens if they are available and returns whether it did."""
+        self._check_cost(cost)
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            if now < self.paused_until or self.tokens < cost:
+                return False
+            self.tokens -= cost
+            return True
+
+    def pause(self, seconds: float):
+        """Empties the bucket and stops refilling for `seconds`."""
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            self.tokens = 0.0
+            self.paused_until = max(self.paused_until, now + seconds)
+
+
+class _Job:
+    def __init__(self, fn, args, kwargs, priority, cost):
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+        self.priority = priority
+        self.cost = cost
+        self.attempts = 0
+        self.future = Future()
+
+
+class RequestScheduler:
+    """
+    Runs every upstream Google Trends call through one rate limiter.
+
+    Calls are queued by priority, so interactive dashboard requests jump ahead of background
+    collection, and each call waits for tokens from a shared token bucket. A call that fails
+    with a 429, a 5xx or a dropped connection is retried with jittered exponential backoff;
+    a 429 also pauses the bucket for everyone. Retries are limited per call (`max_retries`)
+    and overall by a retry budget that holds at most `retry_budget` retries and refills by
+    `retry_ratio` for every call made, so a sustained outage cannot turn into a retry storm.
+
+    Args:
+        rate (float): Sustained tokens per second; a trends_request call takes CALL_COST tokens.
+        burst (int): How many tokens may be spent back-to-back after an idle period. It must
+                     cover at least one call (CALL_COST), or ValueError is raised.
+        max_retries (int): Retries per call before giving up.
+        base_delay (float): The first backoff ceiling in seconds; it doubles on every retry.
+        max_delay (float): The largest backoff in seconds.
+        retry_ratio (float): Retry budget earned per call made.
+        retry_budget (int): The most retries that can be banked.
+        workers (int): How many calls may run at the same time.
+        clock (callable): Monotonic clock, replaceable in tests.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST, max_retries: int = 5,
+                 base_delay: float = 2.0, max_delay: float = 120.0, retry_ratio: float = 0.2,
+                 retry_budget: int = 10, workers: int = 1, clock=time.monotonic):
+        if burst < CALL_COST:
+            raise ValueError(f"A burst of {burst} cannot pay for one call, which costs {CALL_COST} tokens.")
+        self.bucket = TokenBucket(rate, burst, clock=clock)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_ratio = retry_ratio
+        self.max_retry_budget = retry_budget
+        self.retry_budget = float(retry_budget)
+        self.stats = {'calls': 0, 'succeeded': 0, 'failed': 0, 'retries': 0, 'throttled': 0}
+        self._queue = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._workers = [threading.Thread(target=self._run, daemon=True) for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, fn, *args, priority: int = BACKGROUND, cost: float = 1, **kwargs):
+        """Queues `fn(*args, **kwargs)` and returns a Future for its result."""
+        # Checked here, since the worker thread that pays for the job has no caller to raise to
+        self.bucket._check_cost(cost)
+        job = _Job(fn, args, kwargs, priority, cost)
+        with self._condition:
+            self.stats['calls'] += 1
+            self.retry_budget = min(self.max_retry_budget, self.retry_budget + self.retry_ratio)
+        self._enqueue(job)
+        return job.future
+
+    def call(self, fn, *args, priority: int = BACKGROUND, cost: float = 1, **kwargs):
+        """Runs `fn(*args, **kwargs)` through the scheduler and waits for its result."""
+        return self.submit(fn, *args, priority=priority, cost=cost, **kwargs).result()
+
+    def _enqueue(self, job):
+        with self._condition:
+            heapq.heappush(self._queue, (job.priority, next(self._sequence), job))
+            self._condition.notify()
+
+    def _next_job(self):
+        """Blocks until the most urgent queued job can be paid for, then takes it off the queue."""
+        with self._condition:
+            while True:
+                if not self._queue:
+                    self._condition.wait()
+                    continue
+                job = self._queue[0][2]
+                if self.bucket.try_acquire(job.cost):
+                    heapq.heappop(self._queue)
+                    return job
+                # Wake up early if a more urgent job arrives while we wait for tokens
+                self._condition.wait(timeout=self.bucket.wait_time(job.cost))
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            job.attempts += 1
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+            except Exception as exc:
+                get_metrics().inc('upstream_requests_total', status=status_of(exc) or 'error')
+                self._handle_failure(job, exc)
+            else:
+                get_metrics().inc('upstream_requests_total', status='ok')
+                with self._condition:
+                    self.stats['succeeded'] += 1
+                job.future.set_result(result)
+
+    def _handle_failure(self, job, exc):
+        status = status_of(exc)
+        with self._condition:
+            if status == 429:
+                self.stats['throttled'] += 1
+            can_retry = is_retryable(exc) and job.attempts <= self.max_retries and self.retry_budget >= 1
+            if can_retry:
+                self.retry_budget -= 1
+                self.stats['retries'] += 1
+                get_metrics().inc('upstream_retries_total', status=status or 'error')
+            else:
+                self.stats['failed'] += 1
+
+        if not can_retry:
+            if status in RETRYABLE_STATUSES:
+                job.future.set_exception(RateLimitedError(
+                    f"Google Trends kept failing with HTTP {status} after {job.attempts} attempts.", status=status
+                ))
+            else:
+                job.future.set_exception(exc)
+            return
+
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (job.attempts - 1))
+        delay = ceiling * random.uniform(0.5, 1.0)
+        if status == 429:
+            # Everyone backs off, not just this call
+            self.bucket.pause(delay)
+            self._enqueue(job)
+        else:
+            timer = threading.Timer(delay, self._enqueue, args=(job,))
+            timer.daemon = True
+            timer.start()
+
+
+def trends_request(pytrends, keywords: list, query: str, timeframe: str, geo: str = '',
+                   priority: int = BACKGROUND, **query_kwargs):
+    """
+    Builds a pytrends payload and runs one query on it as a single scheduled call.
+
+    The payload and the query are retried together, because a pytrends session only holds
+    the most recent payload.
+
+    Args:
+        pytrends (TrendReq): The session to use.
+        keywords (list): The payload keywords (at most five).
+        query (str): The TrendReq method to call, e.g. 'interest_over_time'.
+        timeframe (str): The Google Trends timeframe to query.
+        geo (str): The Google Trends geo code ('' for worldwide).
+        priority (int): INTERACTIVE for dashboard requests, BACKGROUND for collection.
+        **query_kwargs: Passed on to the query method.
+
+    Returns:
+        The query's result, usually a DataFrame.
+    """
+    metrics = get_metrics()
+
+    def request():
+        # One attempt at the upstream call, as opposed to the whole call with queueing and retries
+        with metrics.span('upstream_request', query=query):
+            pytrends.build_payload(keywords, cat=0, timeframe=timeframe, geo=geo, gprop='')
+            return getattr(pytrends, query)(**query_kwargs)
+
+    # Building the payload is a request of its own, so each call costs two tokens
+    with metrics.span('scheduled_request', query=query):
+        return get_scheduler().call(request, priority=priority, cost=CALL_COST)
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Returns the process-wide scheduler that all pytrends calls share."""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RequestScheduler()
+        return _default_scheduler
+
+
+# The scheduler's own counters are exported as gauges once it exists
+get_metrics().register_gauges('scheduler', lambda: _default_scheduler.stats if _default_scheduler else {})
+
+
+def set_scheduler(scheduler: RequestScheduler):
+    """Replaces the process-wide scheduler, e.g. with one configured for a worker's share of the rate."""
+    global _default_scheduler
+    with _default_lock:
+        _default_scheduler = scheduler
@@ -0,0 +1,51 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the function. Everyone who asks for the same key while
+    that call is still in flight waits for it and gets the same result, or the same
+    exception. Once the call finishes the key is released, so later calls run again
+    (caching the result is the caller's job).
+
+    `stats` counts every call, how many actually ran, how many were coalesced onto a call
+    already in flight, and how many runs raised.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.stats = {'calls': 0, 'executions': 0, 'coalesced': 0, 'errors': 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """Runs `fn(*args, **kwargs)` unless a call for `key` is already in flight, then returns its result."""
+        with self._lock:
+            self.stats['calls'] += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.stats['executions'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as exc:
+            with self._lock:
+                self.stats['errors'] += 1
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
@@ -0,0 +1,133 @@
+import contextlib
+import io
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from data_collection.metrics import get_metrics
+
+# --- CONFIGURATION ---
+# The cache lives next to the project so the dashboard and the collector share one file.
+DEFAULT_CACHE_PATH = os.environ.get(
+    'TREND_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'trend_cache.sqlite')
+)
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# A hit only rewrites an entry's last-access time once it is this old, so most reads stay read-only.
+ACCESS_RESOLUTION_SECONDS = 60
+
+
+@contextlib.contextmanager
+def connect(path: str):
+    """Opens a SQLite connection for one transaction, commits or rolls it back, and always closes it."""
+    with contextlib.closing(sqlite3.connect(path, timeout=30)) as conn, conn:
+        yield conn
+
+
+class TrendCache:
+    """
+    A persistent, size-bounded cache of Google Trends frames stored in SQLite.
+
+    Entries are keyed by (keyword, timeframe, geo, resolution). `resolution` is 'TIME' for an
+    interest-over-time series, 'TIME@<anchor>' for an anchor-relative series from a batched
+    payload, and the pytrends resolution ('REGION', 'DMA', 'CITY', ...) for regional frames.
+
+    Every entry carries its own TTL. Reads refresh the entry's last-access time (at most once
+    per ACCESS_RESOLUTION_SECONDS, so cache hits rarely write), and when the total payload
+    size goes over `max_bytes` the least recently used entries are evicted.
+    Each write runs in a single SQLite transaction, so readers never see a half-written entry.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES,
+                 default_ttl: int = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS series_cache (
+                    keyword TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    geo TEXT NOT NULL,
+                    resolution TEXT NOT NULL,
+                    payload BLOB NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (keyword, timeframe, geo, resolution)
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_series_cache_access ON series_cache (last_access)')
+
+    def _connect(self):
+        # A fresh connection per call keeps the cache safe to use from Streamlit's session threads
+        return connect(self.path)
+
+    def get(self, keyword: str, timeframe: str, geo: str = '', resolution: str = 'TIME', allow_stale: bool = False):
+        """
+        Returns the cached frame for the key, or None if it is missing or expired.
+
+        Args:
+            allow_stale (bool): Return an expired entry instead of None.
+        """
+        now = time.time()
+        key = (keyword, timeframe, geo, resolution)
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT payload, expires_at, last_access FROM series_cache '
+                'WHERE keyword = ? AND timeframe = ? AND geo = ? AND resolution = ?', key
+            ).fetchone()
+            if row is None or (row[1] <= now and not allow_stale):
+                get_metrics().inc('cache_requests_total', cache='trend_cache',
+                                  result='miss' if row is None else 'expired')
+                return None
+            if now - row[2] >= ACCESS_RESOLUTION_SECONDS:
+                conn.execute(
+                    'UPDATE series_cache SET last_access = ? '
+                    'WHERE keyword = ? AND timeframe = ? AND geo = ? AND resolution = ?', (now,) + key
+                )
+        get_metrics().inc('cache_requests_total', cache='trend_cache', result='hit')
+        return pd.read_json(io.StringIO(row[0]), orient='table')
+
+    def put(self, keyword: str, timeframe: str, geo: str, resolution: str, frame: pd.DataFrame, ttl: int = None):
+        """Stores a frame under the key, replacing any previous entry, then enforces the size bound."""
+        now = time.time()
+        ttl = self.default_ttl if ttl is None else ttl
+        payload = frame.to_json(orient='table', date_format='iso')
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO series_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (keyword, timeframe, geo, resolution, payload, len(payload), now, now + ttl, now)
+            )
+            self._evict(conn)
+
+    def expiry(self, keyword: str, timeframe: str, geo: str = '', resolution: str = 'TIME'):
+        """Returns the entry's expiry as a Unix timestamp, or None if it is not cached."""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT expires_at FROM series_cache '
+                'WHERE keyword = ? AND timeframe = ? AND geo = ? AND resolution = ?',
+                (keyword, timeframe, geo, resolution)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _evict(self, conn):
+        """Drops least recently used entries until the cache fits in `max_bytes`."""
+        total = conn.execute('SELECT COALESCE(SUM(size_bytes), 0) FROM series_cache').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute('SELECT rowid, size_bytes FROM series_cache ORDER BY last_access').fetchall()
+        doomed = []
+        for rowid, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((rowid,))
+            total -= size
+        conn.executemany('DELETE FROM series_cache WHERE rowid = ?', doomed)
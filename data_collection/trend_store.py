@@ -0,0 +1,197 @@
+import os
+import re
+import time
+import uuid
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is only needed for the columnar store
+    pa = ds = pq = None
+
+from data_collection.metrics import get_metrics
+
+# --- CONFIGURATION ---
+DEFAULT_STORE_PATH = os.environ.get(
+    'TREND_STORE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'trend_store')
+)
+
+# Our long-format schema, as produced by fetch_google_trends_data
+COLUMNS = ['id', 'date', 'trend_keyword', 'source', 'metric_type', 'value', 'region']
+# A row is identified by these columns; upserts replace rows with the same key
+KEY_COLUMNS = ['date', 'trend_keyword', 'source', 'metric_type', 'region']
+
+
+def _source_key(source: str):
+    """Turns a source name like 'Google Trends' into a directory-safe partition value."""
+    return re.sub(r'[^a-z0-9]+', '_', source.lower()).strip('_')
+
+
+def _normalize(frame: pd.DataFrame):
+    """Coerces a long-format frame to the store's column types and gives every row a stable id."""
+    frame = frame[[column for column in COLUMNS if column != 'id']].copy()
+    frame['date'] = pd.to_datetime(frame['date']).astype('datetime64[ns]')
+    frame['value'] = frame['value'].astype(float)
+    for column in ('trend_keyword', 'source', 'metric_type', 'region'):
+        frame[column] = frame[column].astype(str)
+    # The id is a hash of the row key, so the same data point keeps its id across upserts
+    frame.insert(0, 'id', pd.util.hash_pandas_object(frame[KEY_COLUMNS], index=False).to_numpy().view('int64'))
+    return frame
+
+
+class TrendStore:
+    """
+    A local columnar store for long-format trend data, kept as partitioned Parquet files.
+
+    Files are laid out as `<root>/source_key=<source>/month=<YYYY-MM>/part-<id>.parquet`, so
+    reads filtered by source or date range skip whole directories, and filters on keyword,
+    metric type or region are pushed down to Parquet row-group statistics.
+
+    `append` adds rows as a new file. `upsert` rewrites only the partitions it touches, with
+    one row per (date, keyword, source, metric_type, region) and the newest values winning.
+    Each rewrite lands in a new file that is renamed into place before the old files are
+    removed, so a crash never leaves a partition half-written, but until they are gone the
+    partition holds both the old and the merged rows. File names sort by write time, and
+    `read` returns each key of a multi-file partition once, from the newest file holding it.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        if pa is None:
+            raise ImportError("The trend store needs pyarrow. Install it with: pip install pyarrow")
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _partitions(self, frame: pd.DataFrame):
+        """Splits rows by their (source, month) partition directory."""
+        # Group on the raw source and month, and only format the few distinct keys
+        months = frame['date'].dt.to_period('M')
+        for (source, month), rows in frame.groupby([frame['source'], months], sort=False):
+            yield os.path.join(self.path, f'source_key={_source_key(source)}', f'month={month}'), rows
+
+    def _write_file(self, directory: str, rows: pd.DataFrame):
+        """Writes rows to a new Parquet file in the directory via a temporary name and returns its path."""
+        os.makedirs(directory, exist_ok=True)
+        # Names sort by write time, which is how reads pick the newest copy of a key
+        final_path = os.path.join(directory, f'part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet')
+        temp_path = final_path + '.tmp'
+        rows = rows.sort_values(['trend_keyword', 'date'])
+        pq.write_table(pa.Table.from_pandas(rows, preserve_index=False), temp_path)
+        os.replace(temp_path, final_path)
+        return final_path
+
+    def append(self, frame: pd.DataFrame):
+        """Adds rows without checking for existing keys. Returns the number of rows written."""
+        if frame.empty:
+            return 0
+        frame = _normalize(frame)
+        for directory, rows in self._partitions(frame):
+            self._write_file(directory, rows)
+        return len(frame)
+
+    def upsert(self, frame: pd.DataFrame):
+        """
+        Inserts rows, replacing any stored rows with the same key. Returns the number of rows written.
+
+        Each touched partition is merged into a new file before its old files are removed;
+        readers in between see the merged rows win over the old ones.
+        """
+        if frame.empty:
+            return 0
+        frame = _normalize(frame)
+        for directory, rows in self._partitions(frame):
+            # Oldest file first, so the newest stored copy of a key is the one kept
+            old_files = [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                         if name.endswith('.parquet')] if os.path.isdir(directory) else []
+            if old_files:
+                stored = pq.read_table(old_files).to_pandas()[COLUMNS]
+                rows = pd.concat([stored, rows], ignore_index=True).drop_duplicates(subset=KEY_COLUMNS, keep='last')
+            self._write_file(directory, rows)
+            for old_file in old_files:
+                os.remove(old_file)
+        get_metrics().inc('rows_stored_total', len(frame))
+        return len(frame)
+
+    def read(self, keywords: list = None, start=None, end=None, source: str = None, metric_type: str = None,
+             region: str = None, columns: list = None):
+        """
+        Reads rows that match every given filter.
+
+        Args:
+            keywords (list, optional): Only these keywords.
+            start, end (optional): An inclusive date range (anything pandas can parse).
+            source (str, optional): Only this source, e.g. 'Google Trends'.
+            metric_type (str, optional): Only this metric type.
+            region (str, optional): Only this region, e.g. 'global'.
+            columns (list, optional): The columns to load (defaults to the full schema).
+
+        Returns:
+            pandas.DataFrame: The matching rows in our long-format schema, sorted by keyword and date.
+        """
+        columns = columns or COLUMNS
+        if not any(name.startswith('source_key=') for name in os.listdir(self.path)):
+            return pd.DataFrame(columns=columns)
+
+        dataset = ds.dataset(self.path, format='parquet', partitioning='hive')
+        conditions = []
+        if source is not None:
+            conditions.append(ds.field('source_key') == _source_key(source))
+        if start is not None:
+            start = pd.Timestamp(start)
+            conditions += [ds.field('month') >= start.strftime('%Y-%m'), ds.field('date') >= start]
+        if end is not None:
+            end = pd.Timestamp(end)
+            conditions += [ds.field('month') <= end.strftime('%Y-%m'), ds.field('date') <= end]
+        if keywords is not None:
+            conditions.append(ds.field('trend_keyword').isin(list(keywords)))
+        if metric_type is not None:
+            conditions.append(ds.field('metric_type') == metric_type)
+        if region is not None:
+            conditions.append(ds.field('region') == region)
+
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+
+        # Several files in one partition can hold the same key (an append, or an upsert that
+        # has not removed the files it replaced yet); those keys are read from the newest file.
+        directories = [os.path.dirname(path) for path in dataset.files]
+        shared = len(set(directories)) < len(directories)
+        load = list(dict.fromkeys(columns + KEY_COLUMNS + ['__filename'])) if shared else columns
+
+        table = dataset.to_table(columns=load, filter=expression)
+        frame = table.to_pandas()
+        if shared:
+            frame = frame.sort_values('__filename', kind='stable')
+            frame = frame.drop_duplicates(subset=KEY_COLUMNS, keep='last')[columns]
+        sort_by = [column for column in ('trend_keyword', 'date') if column in frame.columns]
+        return frame.sort_values(sort_by, ignore_index=True) if sort_by else frame
+
+
+def sync_to_sheets(worksheet, store: TrendStore, batch_size: int = 500, **filters):
+    """
+    Appends rows from the store to a Google Sheet in batches.
+
+    Uses one `append_rows` call per `batch_size` rows instead of one `append_row` call per
+    row, which keeps large exports inside the Sheets API quotas.
+
+    Args:
+        worksheet (gspread.Worksheet): The sheet to append to (see test_database.py for how to open one).
+        store (TrendStore): The store to export from.
+        batch_size (int): Rows per API call.
+        **filters: Passed on to `TrendStore.read` to pick which rows to export.
+
+    Returns:
+        int: The number of rows appended.
+    """
+    frame = store.read(**filters)
+    if frame.empty:
+        return 0
+    frame['date'] = frame['date'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    rows = frame[COLUMNS].astype(object).values.tolist()
+    for i in range(0, len(rows), batch_size):
+        worksheet.append_rows(rows[i:i + batch_size], value_input_option='USER_ENTERED')
+    return len(rows)
@@ -1,9 +1,29 @@
+import os
+
 import streamlit as st
 import pandas as pd
-from pytrends.request import TrendReq
-import time
-from statsmodels.tsa.holtwinters import SimpleExpSmoothing
-import plotly.graph_objects as go
+
+from analysis.downsample import DEFAULT_MAX_POINTS, downsample_series
+from analysis.forecast import forecast_batch
+from analysis.lifecycle import classify_lifecycle_bulk
+from analysis.snapshots import SnapshotStore, build_snapshot, prepare_frames
+from data_collection.catalog import TREND_CATEGORIES, all_terms
+from data_collection.fetch_google import (LazyTrendReq, fetch_interest_batched, fetch_interest_by_region,
+                                          fetch_interest_over_time)
+from data_collection.incremental import SeriesHistory
+from data_collection.metrics import get_metrics, serve_metrics
+from data_collection.regions import RegionMatrix, region_matrix_path
+from data_collection.scheduler import INTERACTIVE, RateLimitedError
+from data_collection.trend_cache import TrendCache
+
+# Compare mode overlays at most this many terms (Google fits four of them per payload next to the anchor).
+MAX_COMPARE_TERMS = 12
+# Traces longer than this are drawn with WebGL.
+WEBGL_MIN_POINTS = 500
+# Set TRENDS_ADMIN_PANEL=1 to show request and timing metrics in the sidebar.
+SHOW_ADMIN_PANEL = os.environ.get('TRENDS_ADMIN_PANEL') == '1'
+
+metrics = get_metrics()
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -67,78 +87,192 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# --- Keyword Data ---
-TREND_CATEGORIES = {
-    "Women's Fashion": {
-        "Core Aesthetics": ["Cottagecore", "Quiet Luxury", "Y2K Fashion", "Balletcore", "Old Money Aesthetic"],
-        "Apparel Pieces": ["Cargo Pants", "Wide Leg Jeans", "Blazer", "Slip Dress", "Corset Top"],
-        "Brands": ["Skims", "Reformation", "Ganni", "Aritzia", "With Jean"],
-        "Luxury Brands": ["Gucci", "Chanel", "Dior", "Prada", "Louis Vuitton", "Hermes"],
-        "Accessories": ["Tote Bag", "Ballet Flats", "Statement Necklace", "Chunky Loafers", "Claw Clip"],
-        "Colors": ["Hot Pink", "Lilac", "Chocolate Brown", "Sage Green", "Beige"],
-    },
-    "Men's Fashion": {
-        "Core Aesthetics": ["Gorpcore", "Workwear", "Streetwear", "Classic Menswear", "Minimalism"],
-        "Apparel Pieces": ["Cargo Shorts", "Linen Shirt", "Overshirt", "Pleated Trousers", "Polo Shirt"],
-        "Brands": ["Carhartt", "Aimé Leon Dore", "Patagonia", "Fear of God", "Stone Island"],
-        "Luxury Brands": ["Rolex", "Audemars Piguet", "Patek Philippe", "Gucci", "Louis Vuitton"],
-        "Accessories": ["Tote Bag", "Crossbody Bag", "New Balance 550", "Vintage Watch", "Beanie"],
-        "Colors": ["Olive Green", "Navy Blue", "Cream", "Burnt Orange", "Gray"],
-    }
-}
-
 # --- Functions ---
+# Plotly and statsmodels are imported inside the functions that use them, so the first paint doesn't wait on them.
+
+@st.cache_resource
+def get_trend_cache():
+    """Opens the persistent trend cache shared with the data collector."""
+    return TrendCache()
+
+@st.cache_resource
+def get_series_history():
+    """Opens the stored keyword histories that incremental fetches build on."""
+    return SeriesHistory()
+
+@st.cache_resource
+def get_snapshot_store():
+    """Opens the analysis snapshots the data collector materializes."""
+    return SnapshotStore()
+
+@st.cache_resource(max_entries=1)
+def _load_region_matrix(path, mtime):
+    return RegionMatrix.load(path)
+
+def get_region_matrix():
+    """Returns the keyword x state matrix the data collector builds, reloaded when the file changes; None before the first build."""
+    path = region_matrix_path()
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    return _load_region_matrix(path, mtime)
+
+@st.cache_resource
+def start_metrics_server():
+    """Serves /metrics for Prometheus when TRENDS_METRICS_PORT is set; the server is shared by all sessions."""
+    if 'TRENDS_METRICS_PORT' not in os.environ:
+        return None
+    try:
+        return serve_metrics(int(os.environ['TRENDS_METRICS_PORT']))
+    except OSError as e:
+        print(f"Could not start the metrics server: {e}")
+        return None
 
 @st.cache_data(ttl=3600)
-def fetch_trends_data(keyword):
-    """Fetches interest over time and regional interest for a single keyword."""
+def fetch_trends_data(keyword, include_regions=True):
+    """Fetches interest over time and, unless the region matrix covers the keyword, regional interest for a single keyword."""
     print(f"Fetching new data for '{keyword}'...")
     try:
-        pytrends = TrendReq(hl='en-US', tz=360)
-        
-        pytrends.build_payload([keyword], cat=0, timeframe='today 12-m', geo='', gprop='')
-        interest_df = pytrends.interest_over_time()
-        
-        pytrends.build_payload([keyword], cat=0, timeframe='today 12-m', geo='US', gprop='')
-        region_df = pytrends.interest_by_region(resolution='REGION', inc_low_vol=True, inc_geo_code=False)
-        
-        time.sleep(1)
+        # st.cache_data already runs one computation per key; the fetch layer coalesces the upstream
+        # misses that different keys (single view, compare, collector) share
+        with metrics.span('dashboard_fetch'):
+            cache, pytrends = get_trend_cache(), LazyTrendReq()
+            interest_df = fetch_interest_over_time(keyword, 'today 12-m', '', cache=cache, pytrends=pytrends,
+                                                   history=get_series_history(), priority=INTERACTIVE)
+            region_df = None
+            if include_regions:
+                region_df = fetch_interest_by_region(keyword, 'today 12-m', 'US', cache=cache, pytrends=pytrends,
+                                                     priority=INTERACTIVE)
         
         if interest_df.empty: return None, None
             
-        interest_df = interest_df.drop(columns=['isPartial'], errors='ignore')
-        interest_df = interest_df.rename(columns={keyword: 'interest'})
-        
-        return interest_df, region_df.sort_values(by=keyword, ascending=False)
+        return prepare_frames(keyword, interest_df, region_df)
+    except RateLimitedError as e:
+        metrics.inc('errors_total', stage='dashboard_fetch', error='RateLimitedError')
+        st.error(f"Google Trends is rate limiting us right now (HTTP {e.status}) and retries did not get through. Please wait a few minutes and try again.")
+        return None, None
     except Exception as e:
+        metrics.inc('errors_total', stage='dashboard_fetch', error=type(e).__name__)
         st.error(f"Could not fetch data for '{keyword}'. This can happen if the term has low search volume or if you've made too many requests recently. Please wait a few minutes and try again.")
         return None, None
 
-def get_lifecycle_stage(data: pd.DataFrame):
-    if data.empty or len(data) < 30:
-        return "Not Enough Data", "Need at least 30 days of data to analyze."
-
-    analysis_period = data.tail(90) if len(data) >= 90 else data
-    last_30_days = data.tail(30)
-    peak_value = data['interest'].max()
-    current_value = last_30_days['interest'].mean()
-    
-    if current_value < peak_value * 0.4: stage, emoji = "Fading", "📉"
-    elif current_value >= peak_value * 0.85: stage, emoji = "Peaking", "🏔️"
-    elif current_value > analysis_period['interest'].mean(): stage, emoji = "Rising", "📈"
-    else: stage, emoji = "Stable", "📊"
-    
-    provisional_note = " (Provisional)" if len(data) < 90 else ""
-    return f"{emoji} {stage}{provisional_note}", f"Interest is {stage.lower()}."
-
-def generate_forecast(data: pd.DataFrame):
-    if data.empty or len(data) < 10: return None
-    model = SimpleExpSmoothing(data['interest'], initialization_method="estimated").fit()
-    forecast = model.forecast(4)
-    last_date = data.index[-1]
-    forecast_dates = pd.date_range(start=last_date, periods=5, freq='W')[1:]
-    forecast_df = pd.DataFrame({'date': forecast_dates, 'forecast': forecast}).set_index('date')
-    return forecast_df
+def load_analysis(keyword):
+    """Returns the keyword's analysis snapshot, only fetching and recomputing it when none is fresh."""
+    store = get_snapshot_store()
+    snapshot = store.get(keyword)
+    if snapshot is None:
+        matrix = get_region_matrix()
+        in_matrix = matrix is not None and keyword in matrix
+        interest_df, region_df = fetch_trends_data(keyword, include_regions=not in_matrix)
+        if interest_df is None: return None
+        if in_matrix:
+            region_df = matrix.keyword_frame(keyword)
+        snapshot = build_snapshot(keyword, interest_df, region_df)
+        store.put(snapshot)
+    return snapshot
+
+@st.cache_data(ttl=3600)
+def fetch_compare_data(keywords):
+    """Fetches several keywords in shared-anchor payloads, so their series share one 0-100 scale."""
+    keywords = list(keywords)
+    try:
+        return fetch_interest_batched(keywords, None, 'today 12-m', '', cache=get_trend_cache(),
+                                      pytrends=LazyTrendReq(), priority=INTERACTIVE)
+    except Exception as e:
+        metrics.inc('errors_total', stage='compare_fetch', error=type(e).__name__)
+        st.error(f"Could not fetch data for the {len(keywords)} selected terms. Please wait a few minutes and try again.")
+        return None
+
+def line_trace(series, name, **kwargs):
+    """Returns a line trace for a date-indexed series, downsampled and on WebGL when it is long."""
+    import plotly.graph_objects as go
+    series = downsample_series(series, DEFAULT_MAX_POINTS)
+    trace_type = go.Scattergl if len(series) > WEBGL_MIN_POINTS else go.Scatter
+    return trace_type(x=series.index, y=series.values, mode='lines', name=name, **kwargs)
+
+@st.cache_data(ttl=3600)
+def build_history_figure(keyword, built_at, _history, _forecast):
+    """Builds the history and forecast chart once per snapshot (the frames aren't hashed, `built_at` keys them)."""
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    fig.add_trace(line_trace(_history['interest'], 'Actual Interest', line=dict(color='#4A90E2', width=3)))
+    if _forecast is not None:
+        fig.add_trace(go.Scatter(x=_forecast.index, y=_forecast['forecast'], mode='lines', name='Forecast', line=dict(color='#E57373', dash='dash')))
+
+    fig.update_layout(
+        title=dict(text="12-Month History & 4-Week Forecast", font=dict(size=16)),
+        xaxis_title=None, yaxis_title="Relative Search Interest",
+        legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.01),
+        margin=dict(l=0, r=20, t=40, b=0),
+        plot_bgcolor='white', paper_bgcolor='white',
+        font=dict(color='#333')
+    )
+    return fig
+
+@st.cache_data(ttl=3600)
+def build_region_figure(keyword, built_at, _top_regions):
+    """Builds the top-5 regions chart once per snapshot."""
+    import plotly.graph_objects as go
+    top_5_regions = _top_regions.head(5)
+    region_fig = go.Figure(go.Bar(
+        x=top_5_regions[keyword],
+        y=top_5_regions.index,
+        orientation='h',
+        marker=dict(color='#4A90E2', opacity=0.8)
+    ))
+    region_fig.update_layout(
+        title=dict(text="Top 5 US States", font=dict(size=16)),
+        xaxis_title="Relative Interest", yaxis_title=None,
+        margin=dict(l=0, r=0, t=40, b=0),
+        plot_bgcolor='white', paper_bgcolor='white',
+        yaxis=dict(autorange="reversed"),
+        font=dict(color='#333')
+    )
+    return region_fig
+
+@st.cache_data(ttl=3600)
+def build_region_map(keyword, built_at, _regions):
+    """Builds a US state choropleth of the keyword's interest from its region matrix row."""
+    import plotly.graph_objects as go
+    states = _regions[_regions['geoCode'].str.startswith('US-')]
+    map_fig = go.Figure(go.Choropleth(
+        locations=states['geoCode'].str[3:],
+        z=states[keyword],
+        text=states.index,
+        locationmode='USA-states',
+        colorscale='Blues',
+        colorbar=dict(title="Interest")
+    ))
+    map_fig.update_layout(
+        geo=dict(scope='usa', bgcolor='white'),
+        margin=dict(l=0, r=0, t=10, b=0),
+        paper_bgcolor='white',
+        font=dict(color='#333')
+    )
+    return map_fig
+
+def build_compare_figure(panel, forecasts):
+    """Overlays every compared term's history and dashed forecast, one color per term."""
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    palette = ['#4A90E2', '#E57373', '#81C784', '#FFB74D', '#BA68C8', '#4DB6AC',
+               '#F06292', '#A1887F', '#7986CB', '#DCE775', '#90A4AE', '#FF8A65']
+    for i, keyword in enumerate(panel.columns):
+        color = palette[i % len(palette)]
+        fig.add_trace(line_trace(panel[keyword], keyword, legendgroup=keyword, line=dict(color=color, width=2)))
+        keyword_forecast = forecasts[forecasts['trend_keyword'] == keyword].set_index('date')['forecast']
+        if not keyword_forecast.empty:
+            fig.add_trace(line_trace(keyword_forecast, f"{keyword} (forecast)", legendgroup=keyword,
+                                     showlegend=False, line=dict(color=color, dash='dash')))
+    fig.update_layout(
+        title=dict(text="12-Month History & 4-Week Forecast (Shared Scale)", font=dict(size=16)),
+        xaxis_title=None, yaxis_title="Relative Search Interest",
+        margin=dict(l=0, r=20, t=40, b=0),
+        plot_bgcolor='white', paper_bgcolor='white',
+        font=dict(color='#333')
+    )
+    return fig
 
 # --- UI Layout ---
 
@@ -157,28 +291,69 @@ sub_category = st.sidebar.selectbox(
     list(TREND_CATEGORIES[main_category].keys())
 )
 
-selected_keyword = st.sidebar.selectbox(
-    f"Select a Term from '{sub_category}':",
-    TREND_CATEGORIES[main_category][sub_category]
-)
+compare_mode = st.sidebar.toggle("Compare Terms", help="Overlay several terms on one chart and one shared scale.")
 
+if compare_mode:
+    compare_keywords = st.sidebar.multiselect(
+        f"Select up to {MAX_COMPARE_TERMS} Terms:",
+        all_terms(),
+        default=TREND_CATEGORIES[main_category][sub_category][:MAX_COMPARE_TERMS],
+        max_selections=MAX_COMPARE_TERMS
+    )
+else:
+    selected_keyword = st.sidebar.selectbox(
+        f"Select a Term from '{sub_category}':",
+        TREND_CATEGORIES[main_category][sub_category]
+    )
+
+if compare_mode:
+    if st.sidebar.button("Compare Trends") and compare_keywords:
+        with st.spinner(f"Fetching and comparing {len(compare_keywords)} terms..."):
+            panel = fetch_compare_data(tuple(compare_keywords))
+
+        if panel is not None and not panel.empty:
+            st.header(f"Comparing {len(panel.columns)} Terms")
+            missing = [keyword for keyword in compare_keywords if keyword not in panel.columns]
+            if missing:
+                st.warning(f"No data for: {', '.join(missing)}")
+
+            with metrics.span('analysis', stage='compare'):
+                stages = classify_lifecycle_bulk(panel)
+                forecasts = forecast_batch(panel)
+                next_forecast = forecasts.groupby('trend_keyword')['forecast'].first()
+
+            with metrics.span('render', chart='compare'):
+                st.plotly_chart(build_compare_figure(panel, forecasts), use_container_width=True)
+
+            current = panel.ffill().iloc[-1]
+            summary = pd.DataFrame({
+                'Lifecycle Stage': [f"{stage.emoji} {stage.value}{' (Provisional)' if provisional else ''}"
+                                    for stage, provisional in zip(stages['stage'], stages['provisional'])],
+                'Current Interest': current.reindex(stages.index).round(1),
+                "Next Week's Forecast": next_forecast.reindex(stages.index).round(1),
+            }, index=stages.index.rename('Term'))
+            change = (summary["Next Week's Forecast"] / summary['Current Interest'] - 1) * 100
+            summary['Change'] = [f"{round(value, 1)}%" if pd.notna(value) and interest > 0 else "N/A"
+                                 for value, interest in zip(change, summary['Current Interest'])]
+            st.dataframe(summary, use_container_width=True)
+    else:
+        st.info(f"Select up to {MAX_COMPARE_TERMS} terms and click 'Compare Trends' to overlay them.")
 # --- UPDATED: Added a button to trigger the analysis ---
-if st.sidebar.button("Analyze Trend"):
+elif st.sidebar.button("Analyze Trend"):
     # --- Main Content ---
-    with st.spinner(f"Fetching and analyzing data for '{selected_keyword}'..."):
-        interest_data, region_data = fetch_trends_data(selected_keyword)
+    with st.spinner(f"Fetching and analyzing data for '{selected_keyword}'..."), metrics.span('dashboard_load'):
+        snapshot = load_analysis(selected_keyword)
 
-    if interest_data is not None:
+    if snapshot is not None:
         st.header(f"Analysis for: **{selected_keyword}**")
         st.markdown(f"Category: `{main_category} > {sub_category}`")
 
-        stage, stage_desc = get_lifecycle_stage(interest_data)
-        forecast_data = generate_forecast(interest_data)
+        interest_data, forecast_data, region_data = snapshot['history'], snapshot['forecast'], snapshot['top_regions']
         
         st.markdown("---")
         col1, col2 = st.columns(2)
         with col1:
-            st.metric("Trend Lifecycle Stage", stage, help=stage_desc)
+            st.metric("Trend Lifecycle Stage", snapshot['stage'], help=snapshot['stage_desc'])
         with col2:
             if forecast_data is not None:
                 current_interest = interest_data['interest'].iloc[-1]
@@ -191,43 +366,59 @@ if st.sidebar.button("Analyze Trend"):
 
         with chart_col:
             st.subheader("Interest Over Time")
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=interest_data.index, y=interest_data['interest'], mode='lines', name='Actual Interest', line=dict(color='#4A90E2', width=3)))
-            if forecast_data is not None:
-                fig.add_trace(go.Scatter(x=forecast_data.index, y=forecast_data['forecast'], mode='lines', name='Forecast', line=dict(color='#E57373', dash='dash')))
-
-            fig.update_layout(
-                title=dict(text="12-Month History & 4-Week Forecast", font=dict(size=16)),
-                xaxis_title=None, yaxis_title="Relative Search Interest",
-                legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.01),
-                margin=dict(l=0, r=20, t=40, b=0),
-                plot_bgcolor='white', paper_bgcolor='white',
-                font=dict(color='#333')
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            with metrics.span('render', chart='history'):
+                fig = build_history_figure(selected_keyword, snapshot['built_at'], interest_data, forecast_data)
+                st.plotly_chart(fig, use_container_width=True)
         
         with region_col:
             st.subheader("Regional Hotspots")
             if region_data is not None and not region_data.empty:
-                top_5_regions = region_data.head(5)
-                
-                region_fig = go.Figure(go.Bar(
-                    x=top_5_regions[selected_keyword],
-                    y=top_5_regions.index,
-                    orientation='h',
-                    marker=dict(color='#4A90E2', opacity=0.8)
-                ))
-                region_fig.update_layout(
-                    title=dict(text="Top 5 US States", font=dict(size=16)),
-                    xaxis_title="Relative Interest", yaxis_title=None,
-                    margin=dict(l=0, r=0, t=40, b=0),
-                    plot_bgcolor='white', paper_bgcolor='white',
-                    yaxis=dict(autorange="reversed"),
-                    font=dict(color='#333')
-                )
-                st.plotly_chart(region_fig, use_container_width=True)
+                with metrics.span('render', chart='regions'):
+                    region_fig = build_region_figure(selected_keyword, snapshot['built_at'], region_data)
+                    st.plotly_chart(region_fig, use_container_width=True)
             else:
                 st.warning("No regional data available.")
+
+            matrix = get_region_matrix()
+            if matrix is not None and selected_keyword in matrix:
+                over_indexed = matrix.over_indexing_regions(selected_keyword, n=5, min_quotient=1.1)
+                if over_indexed:
+                    st.caption("Over-indexes in: " + ", ".join(f"{region} ({quotient:.1f}x)" for region, quotient in over_indexed))
+                if matrix.meta.get('resolution') == 'REGION':
+                    with metrics.span('render', chart='region_map'):
+                        st.plotly_chart(build_region_map(selected_keyword, matrix.meta.get('built_at'),
+                                                         matrix.keyword_frame(selected_keyword)),
+                                        use_container_width=True)
 else:
     st.info("Select a term and click 'Analyze Trend' to begin.")
 
+# --- Regional Explorer ---
+# Answered from the region matrix in memory; outside the button branch so picking a state keeps it open.
+region_matrix = get_region_matrix()
+if region_matrix is not None and region_matrix.regions:
+    with st.expander("Top Terms by State"):
+        state = st.selectbox("State:", region_matrix.regions)
+        top_terms = pd.DataFrame(region_matrix.top_keywords(state, 10), columns=['Term', 'Relative Interest'])
+        st.dataframe(top_terms.round(2), hide_index=True, use_container_width=True)
+
+# --- Metrics ---
+start_metrics_server()
+
+if SHOW_ADMIN_PANEL:
+    with st.sidebar.expander("Admin: Metrics"):
+        metrics_data = metrics.snapshot()
+        if metrics_data['spans']:
+            st.markdown("**Timings**")
+            spans = pd.DataFrame(metrics_data['spans'])
+            spans['labels'] = spans['labels'].map(lambda labels: ', '.join(f"{k}={v}" for k, v in labels.items()))
+            st.dataframe(spans[['name', 'labels', 'count', 'mean_ms', 'p50_ms', 'p99_ms', 'max_ms']].round(1),
+                         hide_index=True)
+        if metrics_data['counters']:
+            st.markdown("**Counters**")
+            counters = pd.DataFrame(metrics_data['counters'])
+            counters['labels'] = counters['labels'].map(lambda labels: ', '.join(f"{k}={v}" for k, v in labels.items()))
+            st.dataframe(counters[['name', 'labels', 'value']], hide_index=True)
+        if metrics_data['gauges']:
+            st.markdown("**Scheduler & Request Sharing**")
+            st.dataframe(pd.DataFrame(metrics_data['gauges'])[['name', 'value']], hide_index=True)
+
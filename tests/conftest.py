@@ -0,0 +1,64 @@
+import os
+import tempfile
+
+# Every cache, store and matrix the modules open by default lands in a scratch directory.
+# Set before the project modules are imported, since they read these at import time.
+_SCRATCH = tempfile.mkdtemp(prefix='trend-tests-')
+os.environ['TREND_CACHE_PATH'] = os.path.join(_SCRATCH, 'trend_cache.sqlite')
+os.environ['TREND_STORE_PATH'] = os.path.join(_SCRATCH, 'trend_store')
+os.environ['TREND_REGION_DIR'] = _SCRATCH
+os.environ['REDDIT_CURSOR_PATH'] = os.path.join(_SCRATCH, 'reddit_cursors.json')
+
+import pytest
+
+import data_collection.fetch_google as fetch_google
+import data_collection.regions as regions
+from benchmarks.fakes import FakeTrendReq
+from data_collection.scheduler import RequestScheduler, get_scheduler, set_scheduler
+from data_collection.trend_cache import TrendCache
+
+
+@pytest.fixture(autouse=True)
+def fast_scheduler():
+    """Runs upstream calls without rate limiting and with millisecond backoffs."""
+    previous = get_scheduler()
+    set_scheduler(RequestScheduler(rate=1e9, burst=10 ** 6, base_delay=0.001, max_delay=0.01, retry_budget=10 ** 6))
+    yield
+    set_scheduler(previous)
+
+
+class FakeClock:
+    """A monotonic clock that only moves when a test advances it."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TrendCache(str(tmp_path / 'cache.sqlite'))
+
+
+@pytest.fixture
+def fake_trends():
+    return FakeTrendReq()
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Routes every session the pipeline opens on its own to one fake, which tests can make fail."""
+    fake = FakeTrendReq()
+    monkeypatch.setattr(fetch_google, 'LazyTrendReq', lambda: fake)
+    monkeypatch.setattr(regions, 'LazyTrendReq', lambda: fake)
+    return fake
@@ -0,0 +1,30 @@
+import argparse
+
+from benchmarks.run_benchmarks import run_case
+
+
+def _options(**overrides):
+    options = dict(max_calls=20, repeats=1, latency=0.0, error_rate=0.0, seed=0, memory=True)
+    options.update(overrides)
+    return argparse.Namespace(**options)
+
+
+def test_capped_sizes_are_labelled_as_extrapolated():
+    record = run_case('get_lifecycle_stage', 50, _options())
+    assert record['keywords'] == 50
+    assert record['covered_keywords'] == 20
+    assert record['extrapolated']
+    assert record['projected_seconds'] > record['seconds']
+
+
+def test_uncapped_sizes_run_in_full():
+    record = run_case('get_lifecycle_stage', 50, _options(max_calls=0))
+    assert record['covered_keywords'] == 50 and record['calls'] == 50
+    assert not record['extrapolated'] and record['projected_seconds'] is None
+
+
+def test_memory_pass_does_not_count_upstream_requests():
+    timed_only = run_case('fetch_google_trends_data', 20, _options(memory=False))
+    with_memory = run_case('fetch_google_trends_data', 20, _options())
+    assert with_memory['peak_memory_mb'] is not None
+    assert with_memory['upstream_requests'] == timed_only['upstream_requests'] > 0
@@ -0,0 +1,65 @@
+import sqlite3
+
+from benchmarks.fakes import FakeTrendReq
+from data_collection.catalog import all_terms
+from data_collection.discovery import DiscoveryStore, discover
+from data_collection.scheduler import get_scheduler
+
+SEEDS = ['Skims', 'Ganni', 'Aritzia']
+
+
+class FailingSeed(FakeTrendReq):
+    """Fails the related queries of one keyword with a non-retryable error."""
+
+    def __init__(self, failing: str, **kwargs):
+        super().__init__(**kwargs)
+        self.failing = failing
+
+    def related_queries(self):
+        if self.failing in self.kw_list:
+            self.requests += 1
+            raise ValueError("bad response")
+        return super().related_queries()
+
+
+def _crawled(store):
+    with sqlite3.connect(store.path) as conn:
+        return {seed for seed, in conn.execute('SELECT seed FROM discovery_seeds')}
+
+
+def test_failed_seeds_are_not_marked_crawled(cache):
+    store = DiscoveryStore(cache.path)
+    discover(SEEDS, budget=20, top_n=0, store=store, cache=cache, pytrends=FailingSeed('Ganni'))
+    assert _crawled(store) == {'Skims', 'Aritzia'}
+    # The failed seed is the stalest one, so the next pass tries it first
+    assert store.stalest_seeds(SEEDS, 1) == ['Ganni']
+
+
+def test_rate_limited_pass_stops_and_marks_nothing(cache):
+    store = DiscoveryStore(cache.path)
+    throttled = FakeTrendReq(error_rate=1.0)
+    scored = discover(SEEDS, budget=20, store=store, cache=cache, pytrends=throttled)
+    assert _crawled(store) == set()
+    assert not scored['fetched_now'].any()
+    # Only the first seed's attempts went upstream
+    assert throttled.requests == get_scheduler().max_retries + 1
+
+
+def test_budget_counts_every_upstream_request(cache, fake_trends):
+    store = DiscoveryStore(cache.path)
+    scored = discover(all_terms(), budget=11, top_n=5, store=store, cache=cache, pytrends=fake_trends)
+    # Each call is a payload plus a query: three seeds crawled and two candidates fetched
+    assert fake_trends.requests == 10
+    assert len(_crawled(store)) == 3
+    assert scored['fetched_now'].sum() == 2
+
+
+def test_fetched_candidates_are_kept_in_the_store(cache, fake_trends):
+    store = DiscoveryStore(cache.path)
+    scored = discover(SEEDS, budget=20, top_n=2, store=store, cache=cache, pytrends=fake_trends)
+    fetched = scored.loc[scored['fetched_now'], 'candidate']
+    assert len(fetched) == 2
+    for candidate in fetched:
+        series = store.series(candidate)
+        assert list(series.columns) == ['interest']
+        assert len(series) == 30
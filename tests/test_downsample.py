@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.downsample import downsample_series, lttb
+
+
+@pytest.mark.parametrize('n, threshold', [(10, 3), (100, 7), (1000, 100), (5000, 999), (101, 100)])
+def test_keeps_the_ends_and_exactly_threshold_increasing_points(n, threshold):
+    rng = np.random.default_rng(n)
+    x = np.arange(n, dtype=float)
+    kept = lttb(x, rng.normal(size=n), threshold)
+
+    assert len(kept) == threshold
+    assert kept[0] == 0 and kept[-1] == n - 1
+    assert np.all(np.diff(kept) > 0)
+
+
+@pytest.mark.parametrize('position', [1, 417, 998])
+def test_a_single_spike_survives(position):
+    y = np.zeros(1000)
+    y[position] = 100.0
+    kept = lttb(np.arange(1000, dtype=float), y, 50)
+    assert position in kept
+
+
+def test_short_series_are_left_alone():
+    assert list(lttb(np.arange(5.0), np.arange(5.0), 10)) == [0, 1, 2, 3, 4]
+    assert list(lttb(np.arange(5.0), np.arange(5.0), 2)) == [0, 1, 2, 3, 4]
+
+
+def test_downsample_series_drops_missing_points_and_keeps_dates():
+    dates = pd.date_range('2020-01-01', periods=3000, freq='D')
+    series = pd.Series(np.sin(np.arange(3000) / 50.0), index=dates)
+    series.iloc[::7] = np.nan
+
+    sampled = downsample_series(series, max_points=500)
+    assert len(sampled) == 500
+    assert sampled.notna().all()
+    assert sampled.index[0] == series.dropna().index[0] and sampled.index[-1] == dates[-1]
+    assert sampled.index.is_monotonic_increasing
@@ -0,0 +1,49 @@
+import pytest
+
+from benchmarks.fakes import FakeTrendReq
+from data_collection.fetch_google import (MAX_TERMS_PER_PAYLOAD, _chunk_keywords, fetch_google_trends_data,
+                                          fetch_interest_batched)
+
+KEYWORDS = [f'term {i}' for i in range(9)]
+
+
+def test_chunks_share_the_anchor_and_fit_a_payload():
+    groups = _chunk_keywords(KEYWORDS, 'term 0')
+    assert all(group[0] == 'term 0' and len(group) <= MAX_TERMS_PER_PAYLOAD for group in groups)
+    assert sorted({keyword for group in groups for keyword in group}) == sorted(KEYWORDS)
+
+
+def test_batched_fetch_returns_every_keyword_on_one_scale(cache, fake_trends):
+    wide_df = fetch_interest_batched(KEYWORDS, cache=cache, pytrends=fake_trends)
+    assert list(wide_df.columns) == KEYWORDS
+    assert wide_df.max().max() == pytest.approx(100)
+    # Two payloads (build_payload + query each) for the anchor plus eight keywords
+    assert fake_trends.requests == 4
+
+
+def test_batched_fetch_reads_through_the_cache(cache, fake_trends):
+    fetch_interest_batched(KEYWORDS, cache=cache, pytrends=fake_trends)
+    second = FakeTrendReq()
+    fetch_interest_batched(KEYWORDS, cache=cache, pytrends=second)
+    assert second.requests == 0
+
+
+def test_batched_refresh_skips_the_cache(cache, fake_trends):
+    fetch_interest_batched(KEYWORDS, cache=cache, pytrends=fake_trends)
+    second = FakeTrendReq()
+    fetch_interest_batched(KEYWORDS, cache=cache, pytrends=second, refresh=True)
+    assert second.requests == 4
+
+
+def test_fetch_google_trends_data_forwards_refresh_in_batched_mode(fake_trends):
+    fetch_google_trends_data(KEYWORDS, timeframe='today 12-m', batched=True, pytrends=fake_trends)
+    second = FakeTrendReq()
+    long_df = fetch_google_trends_data(KEYWORDS, timeframe='today 12-m', batched=True, refresh=True, pytrends=second)
+    assert second.requests > 0
+    assert set(long_df['trend_keyword']) == set(KEYWORDS)
+
+
+def test_batched_and_incremental_are_rejected(fake_trends):
+    with pytest.raises(ValueError):
+        fetch_google_trends_data(KEYWORDS, batched=True, incremental=True, pytrends=fake_trends)
+    assert fake_trends.requests == 0
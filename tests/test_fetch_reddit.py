@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import pytest
+
+from data_collection.fetch_reddit import PAGE_SIZE, AsyncPrawClient, CursorStore, RecordedRedditClient, fetch_reddit_data
+
+
+def _recording(tmp_path, times):
+    items = [{'id': f'c{i}', 'created_utc': t, 'text': 'loving these ballet flats', 'score': 1}
+             for i, t in enumerate(times)]
+    path = tmp_path / 'recording.json'
+    path.write_text(json.dumps({'fashion': {'submissions': [], 'comments': items}}), encoding='utf-8')
+    return str(path)
+
+
+def _pull(recording, cursors):
+    """Returns how many recorded comments one pull of two items counted."""
+    frame = fetch_reddit_data(['Ballet Flats'], ['fashion'], RecordedRedditClient(recording), cursors, limit=2,
+                              requests_per_minute=1e6)
+    return frame.loc[frame['metric_type'] == 'mentions', 'value'].sum() if not frame.empty else 0
+
+
+def test_cursor_stops_at_the_newest_item_read(tmp_path):
+    recording = _recording(tmp_path, [100.0, 200.0, 300.0, 400.0, 500.0])
+    cursors = CursorStore(str(tmp_path / 'cursors.json'))
+
+    assert _pull(recording, cursors) == 2
+    assert cursors.get('fashion', 'comments') == 200.0
+    # The items past the limit are read by the following pulls instead of being skipped
+    assert _pull(recording, cursors) + _pull(recording, cursors) == 3
+    assert _pull(recording, cursors) == 0
+    assert cursors.get('fashion', 'comments') == 500.0
+
+
+def test_window_does_not_split_a_shared_timestamp(tmp_path):
+    recording = _recording(tmp_path, [100.0, 200.0, 200.0, 300.0])
+    cursors = CursorStore(str(tmp_path / 'cursors.json'))
+    assert _pull(recording, cursors) == 1
+    assert cursors.get('fashion', 'comments') == 100.0
+    assert _pull(recording, cursors) == 2
+
+
+class _Item:
+    def __init__(self, i, created_utc):
+        self.id, self.created_utc, self.body, self.score = f'c{i}', created_utc, 'ballet flats', 1
+
+
+class _Listing:
+    """An asyncpraw listing stand-in that counts how many items were pulled from it."""
+
+    def __init__(self, items):
+        self.items, self.pulled = items, 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.pulled >= len(self.items):
+            raise StopAsyncIteration
+        self.pulled += 1
+        return self.items[self.pulled - 1]
+
+
+def _praw_client(listing):
+    class Subreddit:
+        def comments(self, limit):
+            listing.items = listing.items[:limit]
+            return listing
+
+    class Reddit:
+        async def subreddit(self, name):
+            return Subreddit()
+
+    client = object.__new__(AsyncPrawClient)
+    client.reddit = Reddit()
+    return client
+
+
+@pytest.mark.parametrize('newer, pages', [(0, 1), (50, 1), (100, 2), (250, 3), (1500, 10)])
+def test_every_page_read_is_paid_for(newer, pages):
+    # Newest first: `newer` items after the cursor at 10000, then older ones
+    listing = _Listing([_Item(i, 20000 - i) for i in range(newer)] + [_Item(newer + i, 5000 - i) for i in range(5)])
+    paid = []
+
+    async def pay():
+        # Paid before the page is fetched: nothing from that page has been pulled yet
+        assert listing.pulled == len(paid) * PAGE_SIZE
+        paid.append(1)
+
+    items = asyncio.run(_praw_client(listing).listing('fashion', 'comments', 10000.0, 500, pay))
+    assert len(paid) == pages
+    assert len(items) == min(newer, 500)
+
+
+def test_recorded_listings_pay_for_the_pages_reddit_would_send(tmp_path):
+    recording = _recording(tmp_path, [float(t) for t in range(1, 251)])
+    paid = []
+
+    async def pay():
+        paid.append(1)
+
+    client = RecordedRedditClient(recording)
+    asyncio.run(client.listing('fashion', 'comments', 0.0, 20, pay))
+    asyncio.run(client.listing('fashion', 'comments', 240.0, 20, pay))
+    assert len(paid) == 3 + 1
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.forecast import MIN_POINTS, forecast_batch
+
+
+def _synthetic_panel(n_series=6, length=60, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2024-01-07', periods=length, freq='W-SUN')
+    walks = 50 + np.cumsum(rng.normal(0, 3, (length, n_series)), axis=0)
+    noisy = walks + rng.normal(0, 4, (length, n_series))
+    return pd.DataFrame(np.clip(noisy, 0, 100), index=dates, columns=[f'trend-{i}' for i in range(n_series)])
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_vectorized_matches_statsmodels_ses(seed):
+    panel = _synthetic_panel(seed=seed)
+    fast = forecast_batch(panel).groupby('trend_keyword').first()
+    slow = forecast_batch(panel, method='statsmodels').groupby('trend_keyword').first()
+
+    # The grid only tries alphas 0.05 apart, so the fits agree closely rather than exactly
+    assert np.allclose(fast['forecast'], slow.loc[fast.index, 'forecast'], atol=0.5)
+    assert np.allclose(fast['alpha'], slow.loc[fast.index, 'alpha'], atol=0.05)
+
+
+def test_horizon_and_freq_follow_each_series_last_date():
+    panel = _synthetic_panel(n_series=2, length=20).asfreq('D')
+    panel = panel.dropna(how='all')
+    panel.iloc[-3:, 1] = np.nan
+
+    forecasts = forecast_batch(panel, horizon=3, freq='D')
+    assert len(forecasts) == 6
+    for keyword, rows in forecasts.groupby('trend_keyword'):
+        last = panel[keyword].last_valid_index()
+        assert list(rows['date']) == list(pd.date_range(last, periods=4, freq='D')[1:])
+        assert rows['forecast'].nunique() == 1
+
+
+def test_short_series_are_skipped():
+    panel = _synthetic_panel(n_series=2, length=MIN_POINTS)
+    panel.iloc[0, 1] = np.nan
+
+    forecasts = forecast_batch(panel)
+    assert set(forecasts['trend_keyword']) == {'trend-0'}
+
+    empty = forecast_batch(panel[['trend-1']])
+    assert empty.empty and list(empty.columns) == ['trend_keyword', 'date', 'forecast', 'alpha', 'method']
+
+
+def test_long_input_defaults_to_search_interest():
+    panel = _synthetic_panel(n_series=1, length=20)
+    google = panel.stack().rename('value').rename_axis(['date', 'trend_keyword']).reset_index().assign(
+        source='Google Trends', metric_type='search_interest', region='global')
+    reddit = google.assign(source='Reddit', metric_type='mentions', value=1000.0)
+    rows = pd.concat([google, reddit], ignore_index=True)
+
+    assert forecast_batch(rows)['forecast'].equals(forecast_batch(panel)['forecast'])
@@ -0,0 +1,36 @@
+import pandas as pd
+
+from analysis.fusion import fuse_sources
+
+WEEKS = pd.date_range('2026-01-04', periods=4, freq='W-SUN')
+
+
+def _rows(source, metric_type, dates, values):
+    return pd.DataFrame({'date': dates, 'trend_keyword': 'Skims', 'source': source, 'metric_type': metric_type,
+                         'value': values, 'region': 'global'})
+
+
+def test_google_weeks_line_up_with_the_reddit_days_they_cover():
+    # Google dates each week by its Sunday; the Reddit mentions fall on the Wednesday of the same week
+    google = _rows('Google Trends', 'search_interest', WEEKS, [10, 20, 30, 40])
+    reddit = _rows('Reddit', 'mentions', WEEKS + pd.Timedelta(days=3), [1, 2, 3, 4])
+    fused = fuse_sources(pd.concat([google, reddit], ignore_index=True))
+
+    assert list(fused['date']) == list(WEEKS)
+    # Both sources rise together, so the composite spans the full 0-100 range in the same weeks
+    assert list(fused['value']) == [0.0, 33.33, 66.67, 100.0]
+
+
+def test_a_sunday_and_the_following_saturday_share_a_week():
+    reddit = _rows('Reddit', 'mentions', [WEEKS[0], WEEKS[0] + pd.Timedelta(days=6)], [1, 1])
+    fused = fuse_sources(reddit, method='rank')
+    assert list(fused['date']) == [WEEKS[0]]
+
+
+def test_ids_follow_the_output_order():
+    later = _rows('Google Trends', 'search_interest', WEEKS, [10, 20, 30, 40]).assign(trend_keyword='Skims')
+    earlier = _rows('Google Trends', 'search_interest', WEEKS, [40, 30, 20, 10]).assign(trend_keyword='Barn jacket')
+    fused = fuse_sources(pd.concat([later, earlier], ignore_index=True), chunk_size=1)
+
+    assert list(fused['trend_keyword']) == ['Barn jacket'] * 4 + ['Skims'] * 4
+    assert list(fused['id']) == list(range(8))
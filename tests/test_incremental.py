@@ -0,0 +1,79 @@
+import pandas as pd
+import pytest
+
+from data_collection.incremental import MAX_TAIL_DAYS, SeriesHistory, _fold_into_steps, fetch_incremental, splice_tail
+
+
+@pytest.fixture
+def history(tmp_path):
+    return SeriesHistory(str(tmp_path / 'history.sqlite'))
+
+
+def _weekly(end: pd.Timestamp, values):
+    index = pd.date_range(end=end, periods=len(values), freq='7D', name='date')
+    return pd.Series(values, index=index, name='Skims', dtype=float)
+
+
+def test_splice_rescales_the_tail_by_the_overlap():
+    history = _weekly(pd.Timestamp('2026-03-01'), [20, 40, 60, 80, 50])
+    # Google rescaled the new request: the shared weeks come back at half the stored values
+    tail = pd.Series([30, 40, 25, 45], index=history.index[2:].append(pd.DatetimeIndex(['2026-03-08'])),
+                     name='Skims', dtype=float)
+    combined = splice_tail(history, tail)
+
+    assert list(combined.index) == list(history.index) + [pd.Timestamp('2026-03-08')]
+    # Overlap (excluding the partial last stored point) is 60+80 vs 30+40, a ratio of 2
+    assert list(combined) == [round(v * 100 / 90, 2) for v in [20, 40, 60, 80, 50, 90]]
+
+
+def test_daily_tail_folds_into_weeks_on_the_origin():
+    origin = pd.Timestamp('2026-03-01')
+    tail = pd.Series(range(14), index=pd.date_range(origin, periods=14, freq='D', name='date'), dtype=float)
+    folded = _fold_into_steps(tail, origin, 7)
+    assert list(folded.index) == [origin, origin + pd.Timedelta(days=7)]
+    assert list(folded) == [3.0, 10.0]
+
+
+def test_weekly_tail_is_left_alone():
+    tail = _weekly(pd.Timestamp('2026-03-01'), [1, 2, 3])
+    assert _fold_into_steps(tail, tail.index[0], 7) is tail
+
+
+def test_fetch_requests_a_tail_from_the_high_water_mark(history, fake_trends):
+    mark = pd.Timestamp.today().normalize() - pd.Timedelta(days=10)
+    history.save('Skims', '', 'today 12-m', _weekly(mark, range(10, 62)))
+
+    frame = fetch_incremental('Skims', history=history, pytrends=fake_trends)
+
+    start = mark - pd.Timedelta(days=28)
+    assert fake_trends.timeframe == f"{start:%Y-%m-%d} {pd.Timestamp.today():%Y-%m-%d}"
+    # The daily tail comes back folded into the stored weekly steps
+    new = frame.index[frame.index > mark]
+    assert len(new) and all((date - start).days % 7 == 0 for date in new)
+    assert frame['Skims'].max() == pytest.approx(100)
+    assert history.high_water_mark('Skims', '', 'today 12-m') == frame.index[-1]
+
+
+def test_fetch_falls_back_to_a_full_pull_after_a_long_gap(history, fake_trends):
+    mark = pd.Timestamp.today().normalize() - pd.Timedelta(days=MAX_TAIL_DAYS + 7)
+    history.save('Skims', '', 'today 12-m', _weekly(mark, range(1, 53)))
+
+    frame = fetch_incremental('Skims', history=history, pytrends=fake_trends)
+    assert fake_trends.timeframe == 'today 12-m'
+    assert len(frame) == 52
+
+
+def test_first_fetch_pulls_the_full_window(history, fake_trends):
+    frame = fetch_incremental('Skims', history=history, pytrends=fake_trends)
+    assert fake_trends.timeframe == 'today 12-m'
+    assert history.high_water_mark('Skims', '', 'today 12-m') == frame.index[-1]
+
+
+def test_history_without_a_high_water_mark_is_pulled_in_full(history, fake_trends):
+    mark = pd.Timestamp.today().normalize() - pd.Timedelta(days=10)
+    history.save('Skims', '', 'today 12-m', _weekly(mark, range(10, 62)))
+    with history._connect() as conn:
+        conn.execute('DELETE FROM series_watermark')
+
+    fetch_incremental('Skims', history=history, pytrends=fake_trends)
+    assert fake_trends.timeframe == 'today 12-m'
@@ -0,0 +1,27 @@
+from data_collection.catalog import all_terms
+from data_collection.keyword_matcher import KeywordMatcher
+
+MATCHER = KeywordMatcher(all_terms())
+
+
+def test_generic_items_match_in_the_plural():
+    assert MATCHER.find("Two tote bags and a pair of chunky loafers") == ['Tote Bag', 'Chunky Loafers']
+    assert MATCHER.find("blazers are back") == ['Blazer']
+
+
+def test_brands_do_not_match_a_plural_common_word():
+    assert MATCHER.find("pair it with jeans") == []
+    assert MATCHER.find("With Jean just dropped a new dress") == ['With Jean']
+    assert MATCHER.find("gannis and hermeses") == []
+    assert MATCHER.find("rolexes and pradas everywhere") == []
+
+
+def test_colors_and_aesthetics_match_exact_spellings_only():
+    assert MATCHER.find("beiges and creams") == []
+    assert MATCHER.find("beige and cream") == ['Beige', 'Cream']
+
+
+def test_plurals_can_be_chosen_per_term():
+    matcher = KeywordMatcher(['Gucci', 'Tote Bag'], plurals=['Gucci'])
+    assert matcher.find("guccis and tote bags") == ['Gucci']
+    assert KeywordMatcher(['Tote Bag'], plurals=[]).find("tote bags") == []
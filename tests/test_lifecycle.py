@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.lifecycle import LifecycleStage, classify_lifecycle_bulk, get_lifecycle_stage
+
+# Around the 30- and 90-point edges, plus a short series and a long one
+LENGTHS = [12, 29, 30, 31, 60, 89, 90, 91, 150]
+SHAPES = {
+    'rising': lambda t: 10 + 80 * t,
+    'fading': lambda t: 90 - 85 * t,
+    'peaking': lambda t: 40 + 60 * t ** 4,
+    'humped': lambda t: 20 + 70 * np.sin(np.pi * t),
+    'flat': lambda t: 50 + 0 * t,
+}
+
+
+def _ragged_panel(seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2025-01-01', periods=max(LENGTHS), freq='D')
+    columns = {}
+    for shape, curve in SHAPES.items():
+        for length in LENGTHS:
+            values = curve(np.linspace(0, 1, length)) + rng.normal(0, 3, length)
+            # Each series starts on its own date and ends on the last one
+            columns[f'{shape}-{length}'] = pd.Series(np.clip(values, 0, None), index=dates[-length:])
+    return pd.DataFrame(columns, index=dates)
+
+
+def _label(row):
+    if row['stage'] is LifecycleStage.NOT_ENOUGH_DATA:
+        return row['stage'].value
+    return f"{row['stage'].emoji} {row['stage'].value}{' (Provisional)' if row['provisional'] else ''}"
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_bulk_agrees_with_the_per_series_rules(seed):
+    panel = _ragged_panel(seed)
+    stages = classify_lifecycle_bulk(panel)
+
+    for keyword in panel.columns:
+        series = panel[keyword].dropna()
+        expected, _ = get_lifecycle_stage(pd.DataFrame({'interest': series}))
+        assert _label(stages.loc[keyword]) == expected, keyword
+        assert stages.loc[keyword, 'n_points'] == len(series)
+
+    seen = set(stages['stage'])
+    assert {LifecycleStage.NOT_ENOUGH_DATA, LifecycleStage.FADING, LifecycleStage.PEAKING} <= seen
+
+
+def test_provisional_between_30_and_90_points():
+    stages = classify_lifecycle_bulk(_ragged_panel())
+    assert stages.loc['flat-29', 'stage'] is LifecycleStage.NOT_ENOUGH_DATA
+    assert not stages.loc['flat-29', 'provisional']
+    assert stages.loc['flat-30', 'provisional'] and stages.loc['flat-89', 'provisional']
+    assert not stages.loc['flat-90', 'provisional']
+
+
+def test_long_input_defaults_to_search_interest():
+    dates = pd.date_range('2025-01-05', periods=40, freq='W-SUN')
+    google = pd.DataFrame({'date': dates, 'trend_keyword': 'Skims', 'source': 'Google Trends',
+                           'metric_type': 'search_interest', 'value': np.linspace(100, 10, 40), 'region': 'global'})
+    reddit = google.assign(source='Reddit', metric_type='mentions', value=500.0)
+    rows = pd.concat([google, reddit], ignore_index=True)
+
+    stages = classify_lifecycle_bulk(rows)
+    assert stages.loc['Skims', 'peak'] == 100
+    assert stages.loc['Skims', 'n_points'] == 40
+    assert classify_lifecycle_bulk(rows, metric_type='mentions').loc['Skims', 'peak'] == 500
@@ -0,0 +1,40 @@
+import time
+
+from data_collection.prewarm import RETRY_BACKOFF, TIMEFRAME, due_terms, prewarm_once
+from data_collection.trend_cache import TrendCache
+
+TERMS = ['ballet flats', 'barn jacket']
+
+
+def test_prewarm_fills_the_cache_it_is_given(cache, upstream):
+    refreshed = prewarm_once(TERMS, cache=cache)
+    assert refreshed == sorted(TERMS)
+    assert all(cache.expiry(term, TIMEFRAME, '', 'TIME') for term in TERMS)
+    assert all(TrendCache().expiry(term, TIMEFRAME, '', 'TIME') is None for term in TERMS)
+
+
+def test_failed_terms_back_off(cache, upstream):
+    upstream.error_rate = 1.0
+    failures = {}
+    prewarm_once(TERMS, cache=cache, failures=failures)
+    assert set(failures) == set(TERMS)
+    assert all(count == 1 and retry_at > 0 for count, retry_at in failures.values())
+    # Still missing from the cache, but not due again until the backoff passes
+    assert due_terms(TERMS, cache, failures=failures) == []
+
+    requests = upstream.requests
+    assert prewarm_once(TERMS, cache=cache, failures=failures) == []
+    assert upstream.requests == requests
+
+
+def test_backoff_doubles_and_clears_on_success(cache, upstream):
+    upstream.error_rate = 1.0
+    failures = {term: (1, 0.0) for term in TERMS}
+    prewarm_once(TERMS, cache=cache, failures=failures)
+    assert all(count == 2 for count, _ in failures.values())
+    assert min(retry_at for _, retry_at in failures.values()) >= time.time() + RETRY_BACKOFF
+
+    upstream.error_rate = 0.0
+    failures = {term: (2, 0.0) for term in TERMS}
+    prewarm_once(TERMS, cache=cache, failures=failures)
+    assert failures == {}
@@ -0,0 +1,32 @@
+from data_collection.regions import RegionMatrix, fetch_regions_batched, refresh_region_matrix
+
+TERMS = ['Skims', 'Ganni', 'Aritzia', 'Reformation', 'Hot Pink', 'Lilac']
+
+
+def test_keyword_frame_lists_the_top_regions_first(cache, fake_trends):
+    matrix = fetch_regions_batched(TERMS, cache=cache, pytrends=fake_trends)
+    for keyword in TERMS:
+        frame = matrix.keyword_frame(keyword)
+        assert frame[keyword].is_monotonic_decreasing
+        assert frame[keyword].iloc[0] == 100
+        assert list(frame.head(10).index) == list(frame[keyword].nlargest(10, keep='first').index)
+
+
+def test_refresh_merges_new_terms_into_the_saved_matrix(cache, fake_trends, tmp_path):
+    path = str(tmp_path / 'matrix.npz')
+    refresh_region_matrix(TERMS[:4], cache=cache, path=path, pytrends=fake_trends)
+    before = RegionMatrix.load(path)
+
+    matrix = refresh_region_matrix(['Hot Pink'], cache=cache, path=path, pytrends=fake_trends)
+    assert set(matrix.keywords) == set(TERMS[:4]) | {'Hot Pink'}
+    assert set(RegionMatrix.load(path).keywords) == set(matrix.keywords)
+    assert matrix.meta['anchor'] == before.meta['anchor'] == TERMS[0]
+    # The rows already in the matrix keep their values
+    assert list(matrix.keyword_frame('Ganni')['Ganni']) == list(before.keyword_frame('Ganni')['Ganni'])
+
+
+def test_stale_matrix_is_rebuilt_with_its_own_keywords(cache, fake_trends, tmp_path):
+    path = str(tmp_path / 'matrix.npz')
+    refresh_region_matrix(TERMS[:4], cache=cache, path=path, pytrends=fake_trends)
+    matrix = refresh_region_matrix(['Lilac'], max_age=0, cache=cache, path=path, pytrends=fake_trends)
+    assert set(matrix.keywords) == set(TERMS[:4]) | {'Lilac'}
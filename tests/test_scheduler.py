@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.fakes import FakeTooManyRequests, FakeTrendReq
+from data_collection.scheduler import (BACKGROUND, CALL_COST, INTERACTIVE, RateLimitedError, RequestScheduler,
+                                       TokenBucket, set_scheduler, trends_request)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_bucket_refills_at_its_rate(clock):
+    bucket = TokenBucket(rate=2.0, capacity=4, clock=clock)
+    assert bucket.try_acquire(4)
+    assert not bucket.try_acquire(1)
+    assert bucket.wait_time(2) == pytest.approx(1.0)
+    clock.advance(1.0)
+    assert bucket.try_acquire(2)
+
+
+def test_costs_above_the_burst_are_rejected(clock):
+    with pytest.raises(ValueError):
+        TokenBucket(rate=1.0, capacity=1, clock=clock).try_acquire(CALL_COST)
+    with pytest.raises(ValueError):
+        RequestScheduler(burst=CALL_COST - 1, clock=clock)
+    scheduler = RequestScheduler(burst=CALL_COST, clock=clock)
+    with pytest.raises(ValueError):
+        scheduler.submit(lambda: None, cost=CALL_COST + 1)
+
+
+def test_interactive_calls_jump_the_background_queue(clock):
+    scheduler = RequestScheduler(rate=1.0, burst=100, clock=clock)
+    started, release, order = threading.Event(), threading.Event(), []
+
+    def blocker():
+        started.set()
+        release.wait(5)
+
+    first = scheduler.submit(blocker)
+    started.wait(5)
+    # Both are queued while the only worker is busy; the interactive one runs first
+    later = [scheduler.submit(order.append, 'background', priority=BACKGROUND),
+             scheduler.submit(order.append, 'interactive', priority=INTERACTIVE)]
+    release.set()
+    for future in [first] + later:
+        future.result(timeout=5)
+    assert order == ['interactive', 'background']
+
+
+def test_a_429_pauses_every_caller(clock):
+    scheduler = RequestScheduler(rate=1.0, burst=10, base_delay=0.2, max_delay=0.2, clock=clock)
+    attempts = []
+
+    def throttled_once():
+        attempts.append(clock())
+        if len(attempts) == 1:
+            raise FakeTooManyRequests()
+        return 'ok'
+
+    future = scheduler.submit(throttled_once)
+    _wait_for(lambda: scheduler.stats['retries'] == 1)
+    _wait_for(lambda: scheduler.bucket.paused_until > clock())
+    # The bucket is empty and paused, so no other call can start either
+    assert not scheduler.bucket.try_acquire(1)
+    assert scheduler.bucket.wait_time(1) >= 0.1
+    assert not future.done()
+
+    clock.advance(5.0)
+    assert future.result(timeout=5) == 'ok'
+    assert scheduler.stats['throttled'] == 1
+
+
+def test_retries_run_out_with_a_rate_limited_error():
+    # On the real clock with millisecond backoffs, so the 429 pauses end on their own
+    scheduler = RequestScheduler(rate=1e6, burst=100, max_retries=3, base_delay=0.001, max_delay=0.001,
+                                 retry_budget=100)
+    set_scheduler(scheduler)
+    fake = FakeTrendReq(error_rate=1.0)
+    with pytest.raises(RateLimitedError) as raised:
+        trends_request(fake, ['Skims'], 'interest_over_time', 'today 12-m')
+    assert raised.value.status == 429
+    # Every attempt fails on its first request, building the payload
+    assert fake.requests == 4
+    assert scheduler.stats['retries'] == 3 and scheduler.stats['failed'] == 1
+
+
+def test_an_empty_retry_budget_stops_retrying():
+    scheduler = RequestScheduler(rate=1e6, burst=100, max_retries=5, base_delay=0.001, max_delay=0.001,
+                                 retry_ratio=0.0, retry_budget=1)
+    set_scheduler(scheduler)
+    fake = FakeTrendReq(error_rate=1.0)
+    with pytest.raises(RateLimitedError):
+        trends_request(fake, ['Skims'], 'interest_over_time', 'today 12-m')
+    assert fake.requests == 2
+    with pytest.raises(RateLimitedError):
+        trends_request(fake, ['Skims'], 'interest_over_time', 'today 12-m')
+    assert fake.requests == 3
+    assert scheduler.stats['retries'] == 1
+
+
+def test_non_retryable_errors_pass_straight_through(clock):
+    scheduler = RequestScheduler(rate=1.0, burst=10, clock=clock)
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise KeyError('no such widget')
+
+    with pytest.raises(KeyError):
+        scheduler.call(broken)
+    assert len(calls) == 1
+    assert scheduler.stats['retries'] == 0 and scheduler.stats['failed'] == 1
@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fakes import FakeTrendReq
+from data_collection.fetch_google import fetch_interest_by_region, fetch_interest_over_time
+from data_collection.singleflight import SingleFlight
+
+
+def test_errors_reach_every_waiter_and_release_the_key():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError('boom')
+
+    for _ in range(2):
+        try:
+            flight.do('key', fail)
+        except RuntimeError:
+            pass
+    assert flight.stats['executions'] == 2 and flight.stats['errors'] == 2
+
+
+def test_concurrent_misses_share_one_upstream_fetch(cache):
+    fake = FakeTrendReq(latency=0.05)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        frames = list(pool.map(lambda _: fetch_interest_over_time('Skims', cache=cache, pytrends=fake), range(4)))
+    # One build_payload and one query
+    assert fake.requests == 2
+    assert all(frame is frames[0] for frame in frames)
+
+
+def test_regions_are_coalesced_per_resolution(cache):
+    fake = FakeTrendReq(latency=0.05)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda resolution: fetch_interest_by_region('Skims', resolution=resolution, cache=cache,
+                                                                 pytrends=fake), ['REGION', 'REGION', 'DMA', 'DMA']))
+    assert fake.requests == 4
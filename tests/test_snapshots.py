@@ -0,0 +1,90 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import snapshots as snapshots_module
+from analysis.snapshots import SnapshotStore, build_snapshot, prepare_frames
+from data_collection.prewarm import TIMEFRAME, materialize_snapshots
+from data_collection.fetch_google import REGION_GEO
+
+KEYWORD = 'ballet flats'
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path / 'snapshots.sqlite'))
+
+
+def _interest(periods=52):
+    dates = pd.date_range('2024-07-07', periods=periods, freq='W-SUN', name='date')
+    return pd.DataFrame({KEYWORD: np.linspace(20, 80, periods).round()}, index=dates)
+
+
+def _regions():
+    return pd.DataFrame({KEYWORD: [40, 100, 70]}, index=pd.Index(['Texas', 'California', 'Ohio'], name='geoName'))
+
+
+def test_round_trip_keeps_every_frame(store):
+    interest_df, region_df = prepare_frames(KEYWORD, _interest(), _regions())
+    snapshot = build_snapshot(KEYWORD, interest_df, region_df)
+    store.put(snapshot)
+
+    loaded = store.get(KEYWORD)
+    pd.testing.assert_frame_equal(loaded['history'], snapshot['history'], check_freq=False, check_index_type=False)
+    pd.testing.assert_frame_equal(loaded['forecast'], snapshot['forecast'], check_freq=False, check_index_type=False)
+    assert list(loaded['top_regions'].index) == ['California', 'Ohio', 'Texas']
+    assert (loaded['stage'], loaded['stage_desc']) == (snapshot['stage'], snapshot['stage_desc'])
+    assert loaded['expires_at'] == pytest.approx(snapshot['built_at'] + store.default_ttl)
+
+
+@pytest.mark.parametrize('top_regions', [None, pd.DataFrame()])
+def test_round_trip_without_regions(store, top_regions):
+    snapshot = build_snapshot(KEYWORD, *prepare_frames(KEYWORD, _interest(), None))
+    store.put(dict(snapshot, top_regions=top_regions))
+
+    loaded = store.get(KEYWORD)
+    assert loaded is not None
+    assert loaded['top_regions'] is None if top_regions is None else loaded['top_regions'].empty
+
+
+def test_short_history_stores_no_forecast(store):
+    snapshot = build_snapshot(KEYWORD, *prepare_frames(KEYWORD, _interest(periods=6), None))
+    store.put(snapshot)
+    assert store.get(KEYWORD)['forecast'] is None
+
+
+def test_version_bump_is_a_miss(store, monkeypatch):
+    store.put(build_snapshot(KEYWORD, *prepare_frames(KEYWORD, _interest(), None)))
+    monkeypatch.setattr(snapshots_module, 'SNAPSHOT_VERSION', snapshots_module.SNAPSHOT_VERSION + 1)
+    assert store.get(KEYWORD) is None
+    assert store.expiry(KEYWORD) is None
+
+
+def test_expired_snapshot_is_a_miss_unless_stale_is_allowed(store):
+    snapshot = build_snapshot(KEYWORD, *prepare_frames(KEYWORD, _interest(), None))
+    store.put(snapshot, expires_at=time.time() - 1)
+    assert store.get(KEYWORD) is None
+    assert store.get(KEYWORD, allow_stale=True)['keyword'] == KEYWORD
+
+
+def test_materialized_snapshot_expires_with_its_cache_entry(cache, store):
+    cache.put(KEYWORD, TIMEFRAME, '', 'TIME', _interest(), ttl=3600)
+    cache.put(KEYWORD, TIMEFRAME, REGION_GEO, 'REGION', _regions(), ttl=3600)
+
+    assert materialize_snapshots([KEYWORD, 'barn jacket'], cache, store) == [KEYWORD]
+    assert store.expiry(KEYWORD) == cache.expiry(KEYWORD, TIMEFRAME, '', 'TIME')
+    assert list(store.get(KEYWORD)['top_regions'].index) == ['California', 'Ohio', 'Texas']
+    # Nothing newer in the cache, so nothing to rebuild
+    assert materialize_snapshots([KEYWORD], cache, store) == []
+
+    cache.put(KEYWORD, TIMEFRAME, '', 'TIME', _interest(), ttl=7200)
+    assert materialize_snapshots([KEYWORD], cache, store) == [KEYWORD]
+    assert store.expiry(KEYWORD) == cache.expiry(KEYWORD, TIMEFRAME, '', 'TIME')
+
+
+def test_expired_cache_entry_is_not_materialized(cache, store):
+    cache.put(KEYWORD, TIMEFRAME, '', 'TIME', _interest(), ttl=-1)
+    assert materialize_snapshots([KEYWORD], cache, store) == []
+    assert store.expiry(KEYWORD) is None
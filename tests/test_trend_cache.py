@@ -0,0 +1,60 @@
+import sqlite3
+import time
+
+import pandas as pd
+import pytest
+
+from data_collection import trend_cache
+from data_collection.trend_cache import TrendCache, connect
+
+
+def _frame(keyword, size=10):
+    index = pd.date_range('2025-01-05', periods=size, freq='W', name='date')
+    return pd.DataFrame({keyword: range(size)}, index=index)
+
+
+def _last_access(cache, keyword):
+    with connect(cache.path) as conn:
+        return conn.execute('SELECT last_access FROM series_cache WHERE keyword = ?', (keyword,)).fetchone()[0]
+
+
+def test_round_trip(cache):
+    cache.put('Skims', 'today 12-m', '', 'TIME', _frame('Skims'))
+    pd.testing.assert_frame_equal(cache.get('Skims', 'today 12-m'), _frame('Skims'), check_freq=False, check_index_type=False)
+
+
+def test_expired_entries_are_misses_unless_stale_is_allowed(cache):
+    cache.put('Skims', 'today 12-m', '', 'TIME', _frame('Skims'), ttl=-1)
+    assert cache.get('Skims', 'today 12-m') is None
+    assert cache.get('Skims', 'today 12-m', allow_stale=True) is not None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(trend_cache, 'ACCESS_RESOLUTION_SECONDS', 0)
+    size = len(_frame('a').to_json(orient='table', date_format='iso'))
+    cache = TrendCache(str(tmp_path / 'cache.sqlite'), max_bytes=size * 2)
+    cache.put('a', 'today 12-m', '', 'TIME', _frame('a'))
+    cache.put('b', 'today 12-m', '', 'TIME', _frame('b'))
+    time.sleep(0.01)
+    cache.get('a', 'today 12-m')
+    cache.put('c', 'today 12-m', '', 'TIME', _frame('c'))
+    assert cache.get('b', 'today 12-m') is None
+    assert cache.get('a', 'today 12-m') is not None
+
+
+def test_hits_only_touch_the_access_time_once_it_is_old(cache, monkeypatch):
+    cache.put('Skims', 'today 12-m', '', 'TIME', _frame('Skims'))
+    written = _last_access(cache, 'Skims')
+    cache.get('Skims', 'today 12-m')
+    assert _last_access(cache, 'Skims') == written
+
+    monkeypatch.setattr(trend_cache, 'ACCESS_RESOLUTION_SECONDS', 0)
+    cache.get('Skims', 'today 12-m')
+    assert _last_access(cache, 'Skims') > written
+
+
+def test_connections_are_closed(tmp_path):
+    with connect(str(tmp_path / 'db.sqlite')) as conn:
+        conn.execute('CREATE TABLE t (x)')
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute('SELECT 1')
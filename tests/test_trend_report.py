@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from data_collection.regions import RegionMatrix, region_matrix_path
+from data_collection.scheduler import CALL_COST, DEFAULT_BURST, DEFAULT_RATE, RequestScheduler
+from trend_report import build_region_matrix, worker_limits
+
+
+def _shared_keywords():
+    path = region_matrix_path()
+    return RegionMatrix.load(path).keywords if os.path.exists(path) else None
+
+
+def test_ad_hoc_terms_get_a_report_scoped_matrix(upstream, tmp_path):
+    before = _shared_keywords()
+    path = build_region_matrix(['mob wife aesthetic', 'jorts'], str(tmp_path))
+    assert os.path.dirname(path) == str(tmp_path)
+    assert RegionMatrix.load(path).keywords == ['mob wife aesthetic', 'jorts']
+    assert _shared_keywords() == before
+
+
+def test_catalog_terms_refresh_the_shared_matrix(upstream, tmp_path):
+    path = build_region_matrix(['Skims', 'Ganni'], str(tmp_path))
+    assert path == region_matrix_path()
+    assert {'Skims', 'Ganni'} <= set(RegionMatrix.load(path).keywords)
+    assert not os.listdir(tmp_path)
+
+
+def _calls_in(schedulers, clock, seconds, step=0.01):
+    """Counts the calls the schedulers' buckets pay for when every one always has a call waiting."""
+    calls = 0
+    while clock.now <= seconds:
+        for scheduler in schedulers:
+            while scheduler.bucket.try_acquire(CALL_COST):
+                calls += 1
+        clock.advance(step)
+    return calls
+
+
+@pytest.mark.parametrize('workers', [1, 2, 3, 4, 8])
+def test_workers_together_keep_one_schedulers_rate(clock, workers):
+    single = _calls_in([RequestScheduler(DEFAULT_RATE, DEFAULT_BURST, clock=clock)], clock, 100)
+    clock.now = 0.0
+    rate, burst = worker_limits(workers)
+    assert burst >= CALL_COST
+    pool = [RequestScheduler(rate, burst, clock=clock) for _ in range(workers)]
+    combined = _calls_in(pool, clock, 100)
+    # Only the whole-call bursts can add a few calls on top of the shared rate
+    assert combined <= single + workers
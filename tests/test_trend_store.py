@@ -0,0 +1,61 @@
+import os
+
+import pandas as pd
+import pytest
+
+from data_collection.trend_store import TrendStore
+
+
+def _rows(value: float, keywords=('ballet flats', 'barn jacket')):
+    dates = pd.date_range('2026-01-04', periods=3, freq='W-SUN')
+    return pd.DataFrame([
+        {'date': date, 'trend_keyword': keyword, 'source': 'Google Trends', 'metric_type': 'search_interest',
+         'value': value, 'region': 'global'}
+        for keyword in keywords for date in dates
+    ])
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TrendStore(str(tmp_path / 'store'))
+
+
+def _partition_files(store):
+    return sorted(os.path.join(root, name) for root, _, names in os.walk(store.path)
+                  for name in names if name.endswith('.parquet'))
+
+
+def test_upsert_replaces_rows_with_the_same_key(store):
+    store.upsert(_rows(10))
+    store.upsert(_rows(20, keywords=('ballet flats',)))
+    frame = store.read()
+    assert len(frame) == 6
+    assert frame.groupby('trend_keyword')['value'].first().to_dict() == {'ballet flats': 20, 'barn jacket': 10}
+    assert len(_partition_files(store)) == 1
+
+
+def test_read_during_an_upsert_sees_each_key_once(store, monkeypatch):
+    store.upsert(_rows(10))
+    seen = []
+    remove = os.remove
+
+    def read_before_removing(path):
+        # The merged file is in place and the old one is still there
+        seen.append(store.read())
+        remove(path)
+
+    monkeypatch.setattr(os, 'remove', read_before_removing)
+    store.upsert(_rows(20))
+    assert len(seen) == 1
+    assert len(seen[0]) == 6
+    assert set(seen[0]['value']) == {20}
+
+
+def test_upsert_keeps_the_newest_appended_value(store):
+    store.append(_rows(1, keywords=('ballet flats',)))
+    store.append(_rows(2, keywords=('ballet flats',)))
+    store.upsert(_rows(5, keywords=('barn jacket',)))
+    frame = store.read()
+    assert len(frame) == 6
+    assert set(frame.loc[frame['trend_keyword'] == 'ballet flats', 'value']) == {2}
+    assert len(_partition_files(store)) == 1
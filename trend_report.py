@@ -0,0 +1,419 @@
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from analysis.snapshots import SnapshotStore, build_snapshot, prepare_frames
+from data_collection.catalog import TREND_CATEGORIES, all_terms
+from data_collection.fetch_google import REGION_GEO, fetch_interest_by_region, fetch_interest_over_time
+from data_collection.incremental import SeriesHistory
+from data_collection.regions import RegionMatrix, refresh_region_matrix, region_matrix_path
+from data_collection.scheduler import (CALL_COST, DEFAULT_BURST, DEFAULT_RATE, RateLimitedError, RequestScheduler,
+                                      set_scheduler)
+from data_collection.trend_cache import TrendCache
+
+# --- CONFIGURATION ---
+TIMEFRAME = 'today 12-m'
+DEFAULT_WORKERS = 4
+# Each worker has at most this many keywords queued, so a large catalog is never held in memory at once.
+QUEUE_PER_WORKER = 2
+DEFAULT_REPORT_PORT = int(os.environ.get('TRENDS_REPORT_PORT', '8765'))
+# Parquet rows are buffered and written as one row group per this many keywords.
+PARQUET_ROW_GROUP = 500
+FORMATS = ('jsonl', 'csv', 'parquet')
+
+# One row per keyword, the same columns in every format
+COLUMNS = [
+    'keyword', 'category', 'status', 'error', 'stage', 'points', 'current_interest', 'peak_interest',
+    'forecast_next', 'forecast_last', 'forecast_change_pct', 'top_regions', 'over_indexes_in', 'built_at',
+]
+FLOAT_COLUMNS = {'current_interest', 'peak_interest', 'forecast_next', 'forecast_last', 'forecast_change_pct'}
+
+
+# --- Keyword Selection ---
+
+def catalog_paths(categories: dict = None):
+    """Returns each catalog term's first 'Category/Sub-Category' path."""
+    paths = {}
+    for main_category, sub_categories in (categories or TREND_CATEGORIES).items():
+        for sub_category, terms in sub_categories.items():
+            for term in terms:
+                paths.setdefault(term, f"{main_category}/{sub_category}")
+    return paths
+
+
+def catalog_subtree(path: str):
+    """
+    Returns the part of TREND_CATEGORIES under a 'Category' or 'Category/Sub-Category' path.
+
+    Raises:
+        ValueError: If the path does not name a category.
+    """
+    main_category, _, sub_category = path.partition('/')
+    if main_category not in TREND_CATEGORIES:
+        raise ValueError(f"Unknown category '{main_category}'. Choose from: {', '.join(TREND_CATEGORIES)}")
+    sub_categories = TREND_CATEGORIES[main_category]
+    if not sub_category:
+        return {main_category: sub_categories}
+    if sub_category not in sub_categories:
+        raise ValueError(f"Unknown sub-category '{sub_category}'. Choose from: {', '.join(sub_categories)}")
+    return {main_category: {sub_category: sub_categories[sub_category]}}
+
+
+def read_keyword_file(path: str):
+    """Reads one keyword per line, skipping blank lines and '#' comments."""
+    with open(path, encoding='utf-8') as f:
+        lines = (line.strip() for line in f)
+        return list(dict.fromkeys(line for line in lines if line and not line.startswith('#')))
+
+
+def select_terms(categories: list = None, keyword_file: str = None, terms: list = None):
+    """Returns the report's keywords: the named catalog subtrees, file and terms, or the whole catalog."""
+    selected = []
+    for path in categories or []:
+        selected += all_terms(catalog_subtree(path))
+    if keyword_file:
+        selected += read_keyword_file(keyword_file)
+    selected += terms or []
+    return list(dict.fromkeys(selected)) if selected else all_terms()
+
+
+# --- Worker ---
+# Every pool process opens its own cache handles once, and takes its share of the upstream rate.
+
+_worker = {}
+
+
+def worker_limits(workers: int):
+    """
+    Returns each pool process's (rate, burst) share of the upstream limit.
+
+    The rate is split evenly. Every burst still covers one whole call (CALL_COST tokens), so
+    with many workers their bursts add up to a little more than one scheduler's; the
+    sustained rate is the same.
+    """
+    return DEFAULT_RATE / workers, max(CALL_COST, DEFAULT_BURST // workers)
+
+
+def _init_worker(rate: float, burst: int, matrix_path: str, regions: bool):
+    set_scheduler(RequestScheduler(rate=rate, burst=burst))
+    _worker['cache'] = TrendCache()
+    _worker['history'] = SeriesHistory()
+    _worker['snapshots'] = SnapshotStore()
+    _worker['regions'] = regions
+    _worker['matrix'] = RegionMatrix.load(matrix_path) if matrix_path and os.path.exists(matrix_path) else None
+
+
+def _row(keyword: str, status: str, error: str = None):
+    return dict({column: None for column in COLUMNS}, keyword=keyword, status=status, error=error)
+
+
+def report_row(keyword: str, snapshot: dict, matrix: RegionMatrix = None):
+    """Flattens a keyword's analysis snapshot into one report row."""
+    interest = snapshot['history']['interest']
+    forecast = snapshot['forecast']
+    current = float(interest.iloc[-1])
+    forecast_next = float(forecast['forecast'].iloc[0]) if forecast is not None else None
+    top_regions = snapshot['top_regions']
+    over_indexed = matrix.over_indexing_regions(keyword, 5, min_quotient=1.1) if matrix is not None and keyword in matrix else []
+    return dict(
+        _row(keyword, 'ok'),
+        stage=snapshot['stage'],
+        points=len(interest),
+        current_interest=round(current, 2),
+        peak_interest=round(float(interest.max()), 2),
+        forecast_next=round(forecast_next, 2) if forecast_next is not None else None,
+        forecast_last=round(float(forecast['forecast'].iloc[-1]), 2) if forecast is not None else None,
+        forecast_change_pct=round((forecast_next / current - 1) * 100, 1) if forecast_next is not None and current > 0 else None,
+        top_regions=', '.join(top_regions.index[:5]) if top_regions is not None and not top_regions.empty else '',
+        over_indexes_in=', '.join(region for region, _ in over_indexed),
+        built_at=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(snapshot['built_at'])),
+    )
+
+
+def analyze_keyword(keyword: str, refresh: bool = False):
+    """
+    Runs fetch -> lifecycle -> forecast -> regions for one keyword inside a pool worker.
+
+    A fresh snapshot from the collector or an earlier report is reused as is. Otherwise the
+    series is fetched through the shared trend cache, regions come from the region matrix
+    (or one upstream call for a keyword it doesn't cover), and the new snapshot is stored
+    for the dashboard.
+
+    Returns:
+        dict: The keyword's report row; failures come back as rows with a non-'ok' status.
+    """
+    cache, snapshots, matrix = _worker['cache'], _worker['snapshots'], _worker['matrix']
+    snapshot = None if refresh else snapshots.get(keyword)
+    try:
+        if snapshot is None:
+            interest_df = fetch_interest_over_time(keyword, TIMEFRAME, '', cache=cache, history=_worker['history'],
+                                                   refresh=refresh)
+            if interest_df.empty:
+                return _row(keyword, 'no_data', "Google Trends has no data for this term.")
+            if matrix is not None and keyword in matrix:
+                region_df = matrix.keyword_frame(keyword)
+            elif _worker['regions']:
+                region_df = fetch_interest_by_region(keyword, TIMEFRAME, REGION_GEO, cache=cache, refresh=refresh)
+            else:
+                region_df = None
+            snapshot = build_snapshot(keyword, *prepare_frames(keyword, interest_df, region_df))
+            snapshots.put(snapshot, expires_at=cache.expiry(keyword, TIMEFRAME, '', 'TIME'))
+    except RateLimitedError as e:
+        return _row(keyword, 'rate_limited', str(e))
+    except Exception as e:
+        return _row(keyword, 'error', f"{type(e).__name__}: {e}")
+    return report_row(keyword, snapshot, matrix)
+
+
+# --- Pipeline ---
+
+def build_region_matrix(terms: list, directory: str):
+    """
+    Brings the report's region matrix up to date and returns its path, or None if it failed.
+
+    A report on catalog terms refreshes the shared matrix the dashboard reads. A report on
+    any other keywords builds its own matrix in `directory`, so ad-hoc terms never end up
+    in the catalog matrix.
+    """
+    catalog = set(all_terms())
+    shared = all(term in catalog for term in terms)
+    path = region_matrix_path() if shared else region_matrix_path(directory=directory)
+    try:
+        refresh_region_matrix(terms, cache=TrendCache(), path=path)
+    except Exception as e:
+        print(f"Could not build the region matrix, falling back to per-keyword regions: {e}")
+        return None
+    return path
+
+
+def run_report(terms: list, workers: int = DEFAULT_WORKERS, regions: bool = True, refresh: bool = False):
+    """
+    Yields one report row per keyword as soon as it is finished, in completion order.
+
+    Regions for all terms are first fetched in batched payloads into the region matrix (see
+    `build_region_matrix`). Then a pool of `workers` processes analyzes the keywords. Each process gets 1/`workers` of the
+    upstream rate, so together they stay within the limit one scheduler would keep, and only
+    `workers * QUEUE_PER_WORKER` keywords are in flight at a time.
+
+    Args:
+        terms (list): The keywords to report on.
+        workers (int): Pool processes.
+        regions (bool): Include regional hotspots.
+        refresh (bool): Ignore fresh snapshots and cache entries and refetch everything.
+    """
+    # A report-scoped matrix only lives as long as the report
+    with tempfile.TemporaryDirectory(prefix='trend-report-') as scratch:
+        matrix_path = build_region_matrix(terms, scratch) if regions else None
+        initargs = (*worker_limits(workers), matrix_path, regions)
+        # Spawned rather than forked: the parent's scheduler thread may hold locks at fork time
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=initargs) as pool:
+            queued = iter(terms)
+            pending = set()
+            while True:
+                for keyword in queued:
+                    pending.add(pool.submit(analyze_keyword, keyword, refresh))
+                    if len(pending) >= workers * QUEUE_PER_WORKER:
+                        break
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+
+# --- Writers ---
+# Every writer takes one row at a time, so results reach the output as each keyword finishes.
+
+class JsonlWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, row: dict):
+        self.stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self.stream.flush()
+
+    def close(self):
+        self.stream.close()
+
+
+class CsvWriter:
+    def __init__(self, stream):
+        self.stream = stream
+        self.writer = csv.DictWriter(stream, fieldnames=COLUMNS)
+        self.writer.writeheader()
+
+    def write(self, row: dict):
+        self.writer.writerow(row)
+        self.stream.flush()
+
+    def close(self):
+        self.stream.close()
+
+
+class ParquetWriter:
+    """Buffers rows and appends them to one Parquet file a row group at a time."""
+
+    def __init__(self, path: str, row_group: int = PARQUET_ROW_GROUP):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet reports need pyarrow. Install it with: pip install pyarrow")
+        self.pa = pa
+        self.schema = pa.schema([(column, pa.float64() if column in FLOAT_COLUMNS else
+                                  pa.int64() if column == 'points' else pa.string()) for column in COLUMNS])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.row_group = row_group
+        self.rows = []
+
+    def _flush(self):
+        if self.rows:
+            self.writer.write_table(self.pa.Table.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    def write(self, row: dict):
+        self.rows.append(row)
+        if len(self.rows) >= self.row_group:
+            self._flush()
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+
+def open_writer(path: str, output_format: str = None):
+    """Opens a writer for `path`, picking the format from the extension unless one is given."""
+    output_format = output_format or os.path.splitext(path)[1].lstrip('.').lower()
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown report format '{output_format}'. Use one of: {', '.join(FORMATS)}")
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    if output_format == 'parquet':
+        return ParquetWriter(path)
+    stream = open(path, 'w', encoding='utf-8', newline='')
+    return CsvWriter(stream) if output_format == 'csv' else JsonlWriter(stream)
+
+
+def write_report(terms: list, path: str, output_format: str = None, **kwargs):
+    """
+    Streams a report on `terms` to a JSONL, CSV or Parquet file.
+
+    Returns:
+        dict: How many keywords ended in each status.
+    """
+    writer = open_writer(path, output_format)
+    paths = catalog_paths()
+    counts = {}
+    try:
+        for i, row in enumerate(run_report(terms, **kwargs), start=1):
+            row['category'] = paths.get(row['keyword'], '')
+            writer.write(row)
+            counts[row['status']] = counts.get(row['status'], 0) + 1
+            print(f"[{i}/{len(terms)}] {row['keyword']}: {row['stage'] or row['status']}")
+    finally:
+        writer.close()
+    return counts
+
+
+# --- Local HTTP Mode ---
+
+def serve_reports(port: int = DEFAULT_REPORT_PORT, host: str = '127.0.0.1', **kwargs):
+    """
+    Serves reports over HTTP until interrupted.
+
+    `GET /report?category=Women's Fashion/Brands&keyword=Skims&format=csv` streams the rows
+    as JSONL (the default) or CSV while the keywords finish. Without a category or keyword
+    it reports on the whole catalog. `refresh=1` refetches everything. Reports run one at a
+    time so the workers' share of the upstream rate holds. The server only listens on
+    localhost unless another `host` is given.
+    """
+    report_lock = threading.Lock()
+    paths = catalog_paths()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != '/report':
+                self.send_error(404)
+                return
+            query = parse_qs(url.query)
+            output_format = query.get('format', ['jsonl'])[0]
+            try:
+                if output_format not in ('jsonl', 'csv'):
+                    raise ValueError("Use format=jsonl or format=csv.")
+                terms = select_terms(query.get('category'), terms=query.get('keyword'))
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/csv' if output_format == 'csv' else 'application/x-ndjson')
+            self.end_headers()
+            # No Content-Length: the body ends when the connection closes
+            stream = io.TextIOWrapper(self.wfile, encoding='utf-8', newline='', write_through=True)
+            writer = CsvWriter(stream) if output_format == 'csv' else JsonlWriter(stream)
+            options = dict(kwargs, refresh=query.get('refresh', ['0'])[0] == '1')
+            with report_lock:
+                for row in run_report(terms, **options):
+                    row['category'] = paths.get(row['keyword'], '')
+                    writer.write(row)
+            stream.detach()
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"Serving trend reports on http://{host}:{server.server_port}/report")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Runs fetch, lifecycle, forecast and regions for many terms without the dashboard."
+    )
+    parser.add_argument('terms', nargs='*', help="Terms to report on.")
+    parser.add_argument('--category', action='append',
+                        help="A catalog subtree, e.g. \"Women's Fashion\" or \"Women's Fashion/Brands\" (repeatable).")
+    parser.add_argument('--keywords-file', help="A file with one term per line.")
+    parser.add_argument('--output', help="The report file (.jsonl, .csv or .parquet).")
+    parser.add_argument('--format', choices=FORMATS, help="Override the format implied by --output.")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Pool processes; they split the upstream rate.")
+    parser.add_argument('--no-regions', dest='regions', action='store_false', help="Skip regional hotspots.")
+    parser.add_argument('--refresh', action='store_true', help="Refetch even fresh terms.")
+    parser.add_argument('--serve', type=int, nargs='?', const=DEFAULT_REPORT_PORT, metavar='PORT',
+                        help="Serve reports on localhost instead of writing one.")
+    args = parser.parse_args()
+
+    options = dict(workers=max(1, args.workers), regions=args.regions)
+    if args.serve is not None:
+        serve_reports(args.serve, **options)
+        return
+    if not args.output:
+        parser.error("--output is required unless --serve is given.")
+
+    try:
+        terms = select_terms(args.category, args.keywords_file, args.terms)
+    except ValueError as e:
+        parser.error(str(e))
+
+    start = time.time()
+    counts = write_report(terms, args.output, args.format, refresh=args.refresh, **options)
+    summary = ', '.join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(f"\nWrote {sum(counts.values())} terms to {args.output} in {time.time() - start:.1f}s ({summary}).")
+
+
+# Run from the project root with: python trend_report.py --category "Women's Fashion" --output reports/nightly.parquet
+if __name__ == '__main__':
+    main()